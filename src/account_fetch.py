@@ -0,0 +1,50 @@
+import logging
+
+from concurrency import TokenBucket, call_with_retry, map_in_order
+from config import MAX_WORKERS, REQUESTS_PER_SECOND, REQUEST_BURST
+from extraction_backends import get_backend
+from related_counts import id_key
+from soql_batching import chunk_ids, quote_ids
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on IDs x fields fetched per chunk, so wide SELECT lists get smaller
+# chunks and each response stays a reasonable size.
+MAX_CELLS_PER_CHUNK = 200000
+
+
+def fetch_accounts_by_ids(sf, ids_list, fields, max_workers=MAX_WORKERS, backend=None, rate_limiter=None):
+    """Fetches the given accounts in ID chunks sized by query length and field count.
+
+    IDs are deduplicated (15- and 18-character forms of the same record count once),
+    chunks run concurrently through the extraction backend, and records come back in
+    the order of their first ID in ``ids_list``. ``rate_limiter`` lets other stages share the
+    token bucket.
+    """
+    backend = backend or get_backend()
+    first_seen = {}
+    for record_id in ids_list:
+        first_seen.setdefault(id_key(record_id), record_id)
+    unique_ids = list(first_seen.values())
+
+    template = f"SELECT {', '.join(fields)} FROM Account WHERE Id IN ({{ids}})"
+    chunks = chunk_ids(
+        unique_ids,
+        template,
+        max_length=backend.max_query_length,
+        max_ids=max(1, MAX_CELLS_PER_CHUNK // len(fields)),
+    )
+    logger.info("Fetching %d accounts in %d chunks...", len(unique_ids), len(chunks))
+
+    rate_limiter = rate_limiter or TokenBucket(REQUESTS_PER_SECOND, REQUEST_BURST)
+
+    def fetch_chunk(chunk):
+        query = template.format(ids=quote_ids(chunk))
+        return call_with_retry(lambda: list(backend.iter_records(sf, query)), rate_limiter=rate_limiter)
+
+    records_by_id = {}
+    for records in map_in_order(fetch_chunk, chunks, max_workers=max_workers):
+        for record in records:
+            records_by_id.setdefault(id_key(record['Id']), record)
+
+    return [records_by_id[id_key(record_id)] for record_id in unique_ids if id_key(record_id) in records_by_id]
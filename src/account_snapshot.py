@@ -0,0 +1,242 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from config import SNAPSHOT_FULL_REFRESH, SNAPSHOT_PATH, SNAPSHOT_TTL
+from cpf_cnpj import INDEX_COLUMNS, build_cpfcnpj_index
+from extraction_backends import get_backend
+
+logger = logging.getLogger(__name__)
+
+# Fields kept in the snapshot: the union of what the list/verify/fuzzy matching
+# modules read, plus SystemModstamp for the incremental sync watermark.
+SNAPSHOT_FIELDS = ['Id', 'Name', 'NEO_Cpfcnpj__c', 'BillingStreet', 'BillingCity', 'BillingPostalCode', 'SystemModstamp']
+
+# SystemModstamp is assigned before the transaction commits, so a record can become
+# visible with a timestamp slightly older than the watermark. Re-read this many
+# seconds behind it; re-applying an unchanged record is harmless.
+WATERMARK_OVERLAP = 300
+
+# Pipeline stages run in threads and all bring the snapshot up to date before reading it; one at a
+# time checks and refreshes it, so the others find it current instead of pulling or syncing again.
+_ensure_lock = threading.Lock()
+
+
+@contextmanager
+def connect(path=SNAPSHOT_PATH):
+    """Opens the snapshot database in a transaction, creating its folder and metadata table if needed."""
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS snapshot_meta (key TEXT PRIMARY KEY, value TEXT)")
+            yield conn
+    finally:
+        conn.close()
+
+
+def get_meta(conn, key):
+    row = conn.execute("SELECT value FROM snapshot_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def set_meta(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO snapshot_meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+def snapshot_state(path=SNAPSHOT_PATH):
+    """Returns the snapshot metadata, or None if there is no usable snapshot."""
+    if not os.path.exists(path):
+        return None
+    with connect(path) as conn:
+        state = dict(conn.execute("SELECT key, value FROM snapshot_meta").fetchall())
+    # A snapshot taken with a different field list is treated as missing.
+    if 'full_pulled_at' not in state or state.get('fields') != ','.join(SNAPSHOT_FIELDS):
+        return None
+    return state
+
+
+def snapshot_fingerprint(path=SNAPSHOT_PATH):
+    """Short string that changes whenever accounts are added, changed or removed from the snapshot.
+
+    Built from the row count, the newest SystemModstamp and the last full pull, so it costs one
+    aggregate query instead of a hash of the whole table. None when there is no usable snapshot.
+    """
+    state = snapshot_state(path)
+    if state is None:
+        return None
+    with connect(path) as conn:
+        count, newest = conn.execute('SELECT COUNT(*), MAX("SystemModstamp") FROM accounts').fetchone()
+    return f"{count}:{newest}:{state['full_pulled_at']}"
+
+
+def parse_modstamp(value):
+    """Parses a Salesforce datetime such as 2024-05-01T12:30:00.000+0000."""
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%f%z')
+
+
+def format_soql_datetime(moment):
+    """Formats a datetime as an unquoted SOQL datetime literal in UTC."""
+    return moment.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def write_records(conn, table, records):
+    """Upserts live records into ``table`` and removes deleted ones as they stream in.
+
+    Returns the number of records applied and the newest SystemModstamp seen.
+    """
+    columns = ', '.join(f'"{field}"' for field in SNAPSHOT_FIELDS)
+    placeholders = ', '.join('?' for _ in SNAPSHOT_FIELDS)
+    newest = None
+    count = 0
+    for record in records:
+        count += 1
+        # The Bulk API returns booleans as CSV text.
+        if record.get('IsDeleted') in (True, 'true'):
+            conn.execute(f'DELETE FROM {table} WHERE "Id" = ?', (record['Id'],))
+        else:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})",
+                [record.get(field) for field in SNAPSHOT_FIELDS],
+            )
+        modstamp = record.get('SystemModstamp')
+        if modstamp and (newest is None or parse_modstamp(modstamp) > parse_modstamp(newest)):
+            newest = modstamp
+    return count, newest
+
+
+def rebuild_key_index(conn):
+    """Recomputes the normalized CPF/CNPJ index table from the accounts table, once per snapshot change."""
+    accounts = pd.read_sql_query('SELECT "Id", "NEO_Cpfcnpj__c" FROM accounts', conn)
+    index = build_cpfcnpj_index(accounts['NEO_Cpfcnpj__c'])
+    index.insert(0, 'Id', accounts['Id'])
+    index.to_sql('cpfcnpj_index', conn, if_exists='replace', index=False)
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS cpfcnpj_index_id ON cpfcnpj_index ("Id")')
+    set_meta(conn, 'index_synced_at', get_meta(conn, 'synced_at'))
+
+
+def refresh_snapshot(sf, path=SNAPSHOT_PATH, backend=None):
+    """Pulls the full Account table from Salesforce into the local snapshot.
+
+    The pull runs through the configured extraction backend (REST paging or Bulk API 2.0).
+    """
+    logger.info("Pulling full Account snapshot from Salesforce...")
+    started_at = time.time()
+    query = f"SELECT {', '.join(SNAPSHOT_FIELDS)} FROM Account"
+    # Pages are written to SQLite as they arrive, so memory does not grow with the org size.
+    records = (backend or get_backend()).iter_records(sf, query)
+
+    columns = ', '.join(f'"{field}"' for field in SNAPSHOT_FIELDS)
+    with connect(path) as conn:
+        # Build the new table next to the old one so a failed pull keeps the previous snapshot.
+        conn.execute("DROP TABLE IF EXISTS accounts_new")
+        conn.execute(f'CREATE TABLE accounts_new ({columns}, PRIMARY KEY ("Id"))')
+        count, watermark = write_records(conn, 'accounts_new', records)
+        conn.execute("DROP TABLE IF EXISTS accounts")
+        conn.execute("ALTER TABLE accounts_new RENAME TO accounts")
+        conn.execute("DELETE FROM snapshot_meta")
+        set_meta(conn, 'fields', ','.join(SNAPSHOT_FIELDS))
+        set_meta(conn, 'full_pulled_at', started_at)
+        set_meta(conn, 'synced_at', started_at)
+        if watermark:
+            set_meta(conn, 'watermark', watermark)
+        rebuild_key_index(conn)
+    logger.info("Account snapshot saved to %s (%d accounts).", path, count)
+
+
+def sync_snapshot(sf, path=SNAPSHOT_PATH):
+    """Applies Account changes made since the last sync to the local snapshot.
+
+    Changed records are read with queryAll so deleted accounts come back with
+    ``IsDeleted = true`` and are removed locally. Returns the number of records applied.
+    """
+    with connect(path) as conn:
+        watermark = get_meta(conn, 'watermark')
+    if watermark is None:
+        refresh_snapshot(sf, path)
+        return None
+
+    since = parse_modstamp(watermark) - timedelta(seconds=WATERMARK_OVERLAP)
+    query = (
+        f"SELECT {', '.join(SNAPSHOT_FIELDS)}, IsDeleted FROM Account "
+        f"WHERE SystemModstamp > {format_soql_datetime(since)}"
+    )
+    logger.info("Syncing Account changes since %s...", watermark)
+    started_at = time.time()
+    records = sf.query_all_iter(query, include_deleted=True)
+
+    with connect(path) as conn:
+        count, newest = write_records(conn, 'accounts', records)
+        if newest and parse_modstamp(newest) > parse_modstamp(watermark):
+            set_meta(conn, 'watermark', newest)
+        set_meta(conn, 'synced_at', started_at)
+        rebuild_key_index(conn)
+    logger.info("Applied %d changed accounts to %s.", count, path)
+    return count
+
+
+def ensure_snapshot(sf, path=SNAPSHOT_PATH, max_age=SNAPSHOT_TTL, refresh=False):
+    """Brings the local snapshot up to date before it is read.
+
+    A full pull happens when asked to, when there is no usable snapshot, or when the last
+    full pull is older than ``SNAPSHOT_FULL_REFRESH`` (this also drops accounts purged from
+    the recycle bin, which an incremental sync cannot see). Otherwise the snapshot is synced
+    incrementally once it is older than ``max_age`` seconds. Concurrent callers in the same process
+    wait for each other, so a stale snapshot is refreshed once.
+    """
+    with _ensure_lock:
+        state = snapshot_state(path)
+        now = time.time()
+        if refresh or state is None or now - float(state['full_pulled_at']) > SNAPSHOT_FULL_REFRESH:
+            refresh_snapshot(sf, path)
+        elif now - float(state['synced_at']) > max_age:
+            sync_snapshot(sf, path)
+        else:
+            logger.debug("Using local Account snapshot (%.0fs old).", now - float(state['synced_at']))
+            if state.get('index_synced_at') != state['synced_at']:
+                with connect(path) as conn:
+                    rebuild_key_index(conn)
+
+
+def get_snapshot_frame(sf, path=SNAPSHOT_PATH, max_age=SNAPSHOT_TTL, refresh=False, with_key_index=False):
+    """Returns the Account snapshot as a DataFrame, bringing it up to date first if needed.
+
+    With ``with_key_index=True`` the normalized CPF/CNPJ columns (``cpfcnpj_key``,
+    ``cpfcnpj_type``, ``cnpj_root``) computed for this snapshot are joined in.
+    """
+    ensure_snapshot(sf, path, max_age=max_age, refresh=refresh)
+    query = "SELECT * FROM accounts"
+    if with_key_index:
+        index_columns = ', '.join(f'i."{column}"' for column in INDEX_COLUMNS)
+        query = f'SELECT a.*, {index_columns} FROM accounts a LEFT JOIN cpfcnpj_index i ON i."Id" = a."Id"'
+    with connect(path) as conn:
+        return pd.read_sql_query(query, conn)
+
+
+def get_snapshot_records(sf, path=SNAPSHOT_PATH, max_age=SNAPSHOT_TTL, refresh=False):
+    """Returns the Account snapshot as a list of dicts, like ``sf.query_all(...)['records']``."""
+    ensure_snapshot(sf, path, max_age=max_age, refresh=refresh)
+    with connect(path) as conn:
+        conn.row_factory = sqlite3.Row
+        return [dict(row) for row in conn.execute("SELECT * FROM accounts")]
+
+
+def iter_snapshot_rows(sf, columns=None, path=SNAPSHOT_PATH, max_age=SNAPSHOT_TTL, refresh=False, batch_size=5000):
+    """Yields snapshot rows as tuples in batches from a database cursor, keeping memory flat."""
+    ensure_snapshot(sf, path, max_age=max_age, refresh=refresh)
+    selected = ', '.join(f'"{column}"' for column in columns) if columns else '*'
+    with connect(path) as conn:
+        cursor = conn.execute(f"SELECT {selected} FROM accounts")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from rows
@@ -0,0 +1,136 @@
+"""Parquet interchange between pipeline stages, with Excel kept as an optional export for review."""
+import logging
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import EXPORT_EXCEL
+from report_writer import frame_rows, write_rows
+
+logger = logging.getLogger(__name__)
+
+# Rows buffered per Parquet row group when writing from an iterator
+ROW_GROUP_SIZE = 50000
+
+# Object columns pyarrow can store as they are; anything else (mixed types) is stored as text
+ARROW_NATIVE_TYPES = {'string', 'empty', 'boolean', 'integer', 'floating', 'decimal', 'datetime', 'date', 'bytes'}
+
+
+def artifact_path(path):
+    """Parquet file that stands for ``path`` (``data/x.xlsx`` -> ``data/x.parquet``)."""
+    return os.path.splitext(path)[0] + '.parquet'
+
+
+def arrow_safe(df):
+    """Stores mixed-type object columns (e.g. CPF/CNPJ read as numbers and text) as strings."""
+    mixed = [
+        column for column in df.columns
+        if df[column].dtype == object and pd.api.types.infer_dtype(df[column], skipna=True) not in ARROW_NATIVE_TYPES
+    ]
+    if not mixed:
+        return df
+    df = df.copy()
+    for column in mixed:
+        df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+    return df
+
+
+def is_current(parquet_file, path):
+    """True when the Parquet file exists and is not older than the file it stands for."""
+    if not os.path.exists(parquet_file):
+        return False
+    return not os.path.exists(path) or os.path.getmtime(parquet_file) >= os.path.getmtime(path)
+
+
+def save_artifact(df, path, sheet_name='Sheet1', export_excel=EXPORT_EXCEL, highlights=(), links=()):
+    """Writes ``df`` as the Parquet artifact of ``path``, plus ``path`` itself when exporting to Excel/CSV.
+
+    The export is written first, so the Parquet file is never older than it and :func:`load_artifact`
+    reads the Parquet copy. Returns the Parquet path.
+    """
+    parquet_file = artifact_path(path)
+    folder = os.path.dirname(parquet_file)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    if export_excel and parquet_file != path:
+        write_rows(path, df.columns, frame_rows(df), sheet_name=sheet_name, highlights=highlights, links=links)
+
+    arrow_safe(df).to_parquet(parquet_file, index=False)
+    logger.info("%d rows written to %s", len(df), parquet_file)
+    return parquet_file
+
+
+def save_rows_artifact(path, columns, rows, sheet_name='Sheet1', export_excel=EXPORT_EXCEL):
+    """Streams an iterable of rows into the Parquet artifact of ``path``, one row group at a time.
+
+    The Excel/CSV export, when enabled, is streamed back from the Parquet file. Returns the row count.
+    """
+    parquet_file = artifact_path(path)
+    folder = os.path.dirname(parquet_file)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    columns = list(columns)
+    count = 0
+    writer = None
+    try:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == ROW_GROUP_SIZE:
+                writer = write_row_group(writer, parquet_file, columns, batch)
+                count += len(batch)
+                batch = []
+        if batch or writer is None:
+            writer = write_row_group(writer, parquet_file, columns, batch)
+            count += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    logger.info("%d rows written to %s", count, parquet_file)
+
+    if export_excel and parquet_file != path:
+        write_rows(path, columns, iter_artifact_rows(path), sheet_name=sheet_name)
+        # The export is streamed from the Parquet file, so touch the Parquet file afterwards to keep it current
+        os.utime(parquet_file)
+    return count
+
+
+def write_row_group(writer, parquet_file, columns, batch):
+    """Appends one batch of rows to a Parquet file, opening the writer with the first batch's schema."""
+    table = pa.Table.from_pandas(arrow_safe(pd.DataFrame(batch, columns=columns, dtype=object)), preserve_index=False)
+    if writer is None:
+        # Columns that are empty in the first batch are typed as text so later batches still fit
+        schema = pa.schema([
+            field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in table.schema
+        ])
+        writer = pq.ParquetWriter(parquet_file, schema)
+        table = table.cast(schema)
+    else:
+        table = table.cast(writer.schema)
+    writer.write_table(table)
+    return writer
+
+
+def load_artifact(path, columns=None, **read_excel_kwargs):
+    """Loads a stage's data, from its Parquet artifact (memory-mapped) when it is current, else from ``path``.
+
+    ``columns`` limits what is read in both cases.
+    """
+    parquet_file = artifact_path(path)
+    if is_current(parquet_file, path):
+        logger.debug("Reading %s", parquet_file)
+        return pq.read_table(parquet_file, columns=columns, memory_map=True).to_pandas()
+    logger.debug("No current Parquet artifact for %s, reading the file itself", path)
+    if path.lower().endswith('.csv'):
+        return pd.read_csv(path, usecols=columns)
+    return pd.read_excel(path, usecols=columns, **read_excel_kwargs)
+
+
+def iter_artifact_rows(path, columns=None, batch_size=ROW_GROUP_SIZE):
+    """Yields the rows of a Parquet artifact as tuples, one record batch at a time."""
+    parquet = pq.ParquetFile(artifact_path(path), memory_map=True)
+    for batch in parquet.iter_batches(batch_size=batch_size, columns=columns):
+        yield from zip(*(column.to_pylist() for column in batch.columns))
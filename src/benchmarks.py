@@ -0,0 +1,340 @@
+"""Benchmarks for the pipeline's hot paths, run on a synthetic org through the fake Salesforce client.
+
+Results are appended to data/benchmarks/results.jsonl and compared with the previous run of the
+same benchmark and size, so regressions show up without a live org.
+
+Usage: python benchmarks.py [--sizes 10000 100000 1000000] [--full-scale] [--only check_duplicates ...] [--latency 0.05]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from account_fetch import fetch_accounts_by_ids
+from account_snapshot import get_snapshot_frame
+from artifacts import save_artifact
+from check_duplicates import find_duplicate_groups
+from concurrency import TokenBucket
+from cpf_cnpj import build_cpfcnpj_index
+from describe_cache import select_consolidation_fields
+from fake_salesforce import FakeSalesforce
+from logging_setup import SampledLog, configure_logging
+from reconciliation import reconcile_accounts
+from report_writer import record_link, survivor_highlights, write_frame
+from survivorship import build_golden_records
+from synthetic_org import account_describe, synthetic_account_frame, synthetic_children, synthetic_cnpjs
+
+RESULTS_PATH = 'data/benchmarks/results.jsonl'
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+# Org-scale run, opt-in with --full-scale: ten times the largest default size in memory and run time,
+# too slow to run on every change
+FULL_SCALE_SIZE = 10_000_000
+
+# A timing this much slower than the previous run of the same benchmark is reported as a regression
+REGRESSION_THRESHOLD = 1.2
+
+# Benchmarks that talk to the fake org and take --latency and --workers
+API_BENCHMARKS = {'check_duplicates', 'process_accounts', 'consolidate_accounts', 'verify'}
+
+# The original verify check scans the sheet once per Salesforce account (O(n*m)), so it is only run up to this size
+MAX_BASELINE_ROWS = 20_000
+
+
+def synthetic_accounts(rows, duplicate_rate=0.1, seed=0):
+    """Builds an Account frame where about ``duplicate_rate`` of the rows share a NEO_Cpfcnpj__c."""
+    rng = np.random.default_rng(seed)
+    unique = max(1, int(rows * (1 - duplicate_rate)))
+    keys = synthetic_cnpjs(unique, rng)
+    return pd.DataFrame({
+        'Id': [f"001{i:015d}" for i in range(rows)],
+        'NEO_Cpfcnpj__c': np.concatenate([keys, rng.choice(keys, size=rows - unique)]),
+    })
+
+
+def loop_duplicate_groups(records):
+    """The original dict-of-lists grouping, kept as the baseline to compare against."""
+    cpf_data = {}
+    for account in records:
+        cpf_value = account.get('NEO_Cpfcnpj__c')
+        if cpf_value:
+            cpf_data.setdefault(cpf_value, []).append(account['Id'])
+    duplicates = {cpf: ids for cpf, ids in cpf_data.items() if len(ids) > 1}
+    return pd.DataFrame([(cpf, id) for cpf, ids in duplicates.items() for id in ids], columns=['NEO_Cpfcnpj__c', 'Account ID'])
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def fake_org(accounts, latency=0.0, children=None):
+    """Fake Salesforce holding ``accounts`` (a DataFrame) and optional child records, with paging and latency."""
+    records = {'Account': accounts.astype(object).where(accounts.notna(), None).to_dict('records'), **(children or {})}
+    return FakeSalesforce(records, describes={'Account': account_describe()}, latency=latency, indexed=True)
+
+
+def pull_snapshot(sf, folder, with_key_index=False):
+    """Full Account pull into a fresh snapshot (REST paging, SQLite writes and the CPF/CNPJ index)."""
+    return get_snapshot_frame(sf, path=os.path.join(folder, 'snapshot.sqlite'), with_key_index=with_key_index)
+
+
+def bench_check_duplicates(rows, latency=0.0, workers=8):
+    accounts = synthetic_accounts(rows)
+    sf = fake_org(accounts, latency)
+    with tempfile.TemporaryDirectory() as folder:
+        # The snapshot (and its CPF/CNPJ index) is pulled once per sync, so it is timed separately from the grouping.
+        snapshot, snapshot_frame = timed(pull_snapshot, sf, folder, with_key_index=True)
+    vectorized, groups = timed(find_duplicate_groups, snapshot_frame)
+    records = accounts.to_dict('records')
+    loop, baseline = timed(loop_duplicate_groups, records)
+    assert len(groups) == len(baseline)
+    return {
+        'benchmark': 'check_duplicates', 'rows': rows, 'latency_s': latency, 'workers': workers,
+        'api_calls': sf.api_calls, 'snapshot_s': round(snapshot, 3), 'vectorized_s': round(vectorized, 3),
+        'loop_s': round(loop, 3),
+    }
+
+
+def synthetic_clusters(groups, group_size=3, fields=30, seed=0):
+    """Builds duplicate clusters with random modification dates and partly empty fields."""
+    rng = np.random.default_rng(seed)
+    rows = groups * group_size
+    df = pd.DataFrame({
+        'Id': [f"001{i:015d}" for i in range(rows)],
+        'cluster_id': np.repeat(np.arange(groups), group_size),
+        'LastModifiedDate': pd.to_datetime(rng.integers(1.6e9, 1.7e9, size=rows), unit='s').strftime('%Y-%m-%dT%H:%M:%S.000+0000'),
+    })
+    for field in range(fields):
+        values = rng.integers(0, 1000, size=rows).astype(str).astype(object)
+        values[rng.random(rows) < 0.4] = None
+        df[f"Field_{field}__c"] = values
+    return df
+
+
+def bench_survivorship(rows):
+    groups = max(1, rows // 3)
+    clusters = synthetic_clusters(groups)
+    seconds, (golden, _) = timed(build_golden_records, clusters)
+    assert len(golden) == groups
+    return {'benchmark': 'survivorship', 'groups': groups, 'rows': len(clusters), 'seconds': round(seconds, 3)}
+
+
+def bench_process_accounts(rows, latency=0.0, workers=8):
+    """Related counts for ``rows`` accounts against the fake org (aggregate queries, concurrent chunks)."""
+    from process_accounts import process_accounts
+
+    accounts = synthetic_account_frame(rows)[['Id', 'Name']]
+    children = synthetic_children(accounts['Id'].to_numpy())
+    sf = fake_org(accounts, latency, children)
+    with tempfile.TemporaryDirectory() as folder:
+        output = os.path.join(folder, 'counts.csv')
+        seconds, _ = timed(process_accounts, sf, accounts, output, max_workers=workers, resume=False,
+                           rate_limiter=TokenBucket(None))
+        counted = pd.read_parquet(os.path.join(folder, 'counts.parquet'))
+    assert counted['Contatos'].sum() == len(children['Contact'])
+    return {
+        'benchmark': 'process_accounts', 'rows': rows, 'latency_s': latency, 'workers': workers,
+        'api_calls': sf.api_calls, 'seconds': round(seconds, 3),
+    }
+
+
+def bench_consolidate(rows, latency=0.0, workers=8):
+    """Fetch of the duplicate accounts from the fake org, then clustering plus survivorship with noisy duplicates."""
+    from compare_duplicates import consolidate_accounts
+
+    sf = fake_org(synthetic_account_frame(rows), latency)
+    # The describe is cached on disk between runs, so only the chunked Account fetch is timed
+    fields = select_consolidation_fields(account_describe())
+    ids = [record['Id'] for record in sf.records['Account']]
+    fetch, records = timed(fetch_accounts_by_ids, sf, ids, fields, max_workers=workers, rate_limiter=TokenBucket(None))
+    seconds, golden = timed(consolidate_accounts, pd.DataFrame(records))
+    return {
+        'benchmark': 'consolidate_accounts', 'rows': rows, 'latency_s': latency, 'workers': workers,
+        'api_calls': sf.api_calls, 'clusters': len(golden), 'fetch_s': round(fetch, 3), 'seconds': round(seconds, 3),
+    }
+
+
+def bench_report_writers(rows):
+    """One-pass Excel report (conditional formats and links), CSV and Parquet outputs."""
+    df = synthetic_account_frame(rows)
+    df['Discarded_Account_Ids'] = np.where(np.arange(rows) % 5 == 0, df['Id'] + '; ' + df['Id'], None)
+    links = [record_link('https://example.my.salesforce.com')]
+    with tempfile.TemporaryDirectory() as folder:
+        xlsx, _ = timed(write_frame, os.path.join(folder, 'report.xlsx'), df, highlights=survivor_highlights(), links=links)
+        csv, _ = timed(write_frame, os.path.join(folder, 'report.csv'), df)
+        parquet, _ = timed(save_artifact, df, os.path.join(folder, 'report.xlsx'), export_excel=False)
+    return {
+        'benchmark': 'report_writers', 'rows': rows, 'xlsx_s': round(xlsx, 3), 'csv_s': round(csv, 3),
+        'parquet_s': round(parquet, 3),
+    }
+
+
+def bench_verify(rows, latency=0.0, workers=8):
+    """Reconciliation of a spreadsheet (15-character IDs, some missing) against a snapshot pulled from the fake org."""
+    sf = fake_org(synthetic_account_frame(rows), latency)
+    with tempfile.TemporaryDirectory() as folder:
+        pull, snapshot = timed(pull_snapshot, sf, folder)
+    snapshot = snapshot[['Id', 'Name']]
+    rng = np.random.default_rng(0)
+    sheet_ids = snapshot['Id'].str[:15].sample(frac=0.9, random_state=0).to_numpy()
+    missing = [f"001{i:012d}" for i in range(rows, rows + rows // 20)]
+    sheet = pd.DataFrame({'Account_18_Digit_ID__c': rng.permutation(np.concatenate([sheet_ids, missing]))})
+
+    vectorized, (result, new_accounts) = timed(reconcile_accounts, sheet, snapshot)
+    summary = {
+        'benchmark': 'verify', 'rows': rows, 'latency_s': latency, 'workers': workers, 'api_calls': sf.api_calls,
+        'snapshot_s': round(pull, 3), 'vectorized_s': round(vectorized, 3),
+    }
+    if rows <= MAX_BASELINE_ROWS:
+        def baseline():
+            # The original checks: a dict lookup per row, then a scan of the sheet per Salesforce account
+            salesforce_ids = dict(zip(snapshot['Id'].str[:15], snapshot['Name']))
+            exists = sheet['Account_18_Digit_ID__c'].apply(lambda x: 'Exists' if x in salesforce_ids else 'Does Not Exist')
+            values = sheet['Account_18_Digit_ID__c'].values
+            return exists, {i: n for i, n in salesforce_ids.items() if i not in values}
+        loop, (_, baseline_new) = timed(baseline)
+        assert len(baseline_new) == len(new_accounts)
+        summary['loop_s'] = round(loop, 3)
+    assert len(new_accounts) == len(snapshot) - len(sheet_ids)
+    assert (result['Account Exists'] == 'Exists').sum() == len(sheet_ids)
+    return summary
+
+
+def bench_logging(rows, events=1_000_000):
+    """Cost of logging around the consolidation: run quiet vs. at debug level, and per-row call styles.
+
+    Also times the eager dumps that used to be built whether or not debug was on (the ID list and
+    unique CPF/CNPJ values), and one million disabled per-row debug calls as an f-string vs. sampled.
+    """
+    from compare_duplicates import consolidate_accounts
+
+    logger = logging.getLogger('benchmarks.logging')
+    accounts = synthetic_account_frame(rows)
+    with open(os.devnull, 'w') as devnull:
+        configure_logging(-1, stream=devnull)
+        quiet, golden = timed(consolidate_accounts, accounts.copy())
+        configure_logging(1, stream=devnull)
+        verbose, _ = timed(consolidate_accounts, accounts.copy())
+
+        configure_logging(-1, stream=devnull)
+        keys = build_cpfcnpj_index(accounts['NEO_Cpfcnpj__c'])['cpfcnpj_key']
+        eager, _ = timed(lambda: (f"Loaded IDs: {accounts['Id'].tolist()}", f"Unique values: {keys.unique()}"))
+
+        record = {'Id': accounts['Id'].iloc[0], 'Contatos': 1, 'Casos': 0}
+        def fstring_calls():
+            for _ in range(events):
+                logger.debug(f"Counts for account {record['Id']}: {record}")
+        sampled = SampledLog(logger)
+        def sampled_calls():
+            for _ in range(events):
+                sampled("Counts for account %s: %s", record['Id'], record)
+        fstring, _ = timed(fstring_calls)
+        lazy, _ = timed(sampled_calls)
+    configure_logging(-1)
+    return {
+        'benchmark': 'logging', 'rows': rows, 'quiet_s': round(quiet, 3), 'debug_s': round(verbose, 3),
+        'debug_overhead_pct': round((verbose / quiet - 1) * 100, 1), 'rows_per_second': round(rows / quiet),
+        'eager_dumps_s': round(eager, 3), 'per_row_fstring_s': round(fstring, 3), 'per_row_sampled_s': round(lazy, 3),
+        'clusters': len(golden),
+    }
+
+
+BENCHMARKS = {
+    'check_duplicates': bench_check_duplicates,
+    'survivorship': bench_survivorship,
+    'process_accounts': bench_process_accounts,
+    'consolidate_accounts': bench_consolidate,
+    'report_writers': bench_report_writers,
+    'verify': bench_verify,
+    'logging': bench_logging,
+}
+
+
+def run_info():
+    """Where and on what code the benchmarks ran."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': commit or None,
+        'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count(),
+    }
+
+
+def load_results(path=RESULTS_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def save_results(results, path=RESULTS_PATH):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as file:
+        for result in results:
+            file.write(json.dumps(result) + '\n')
+
+
+def timing_keys(result):
+    return [key for key in result if key.endswith('_s') and key != 'latency_s' or key == 'seconds']
+
+
+def compare_with_previous(result, history, threshold=REGRESSION_THRESHOLD):
+    """Ratios of each timing to the latest earlier run of the same benchmark and size; flags regressions."""
+    previous = [
+        old for old in history
+        if old['benchmark'] == result['benchmark'] and old['rows'] == result['rows']
+        and old.get('latency_s') == result.get('latency_s') and old.get('workers') == result.get('workers')
+    ]
+    if not previous:
+        return {}
+    last = previous[-1]
+    ratios = {key: round(result[key] / last[key], 2) for key in timing_keys(result) if last.get(key)}
+    return {'vs_commit': last.get('commit'), 'ratios': ratios,
+            'regressions': [key for key, ratio in ratios.items() if ratio > threshold]}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the pipeline benchmarks on synthetic data.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Account counts to run")
+    parser.add_argument('--full-scale', action='store_true', help=f"Also run {FULL_SCALE_SIZE:,} accounts")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="Benchmarks to run (default: all)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Simulated API latency in seconds")
+    parser.add_argument('--workers', type=int, default=8, help="Concurrent API calls against the fake org")
+    parser.add_argument('--results', default=RESULTS_PATH, help="JSON Lines file the results are appended to")
+    parser.add_argument('--no-save', action='store_true', help="Do not store the results")
+    args = parser.parse_args()
+
+    configure_logging(-1)
+    history = load_results(args.results)
+    info = run_info()
+    results = []
+    regressions = 0
+    sizes = list(args.sizes)
+    if args.full_scale and FULL_SCALE_SIZE not in sizes:
+        sizes.append(FULL_SCALE_SIZE)
+    for rows in sizes:
+        for name in args.only or BENCHMARKS:
+            kwargs = {'latency': args.latency, 'workers': args.workers} if name in API_BENCHMARKS else {}
+            result = {**BENCHMARKS[name](rows, **kwargs), **info}
+            comparison = compare_with_previous(result, history)
+            regressions += len(comparison.get('regressions', []))
+            print(json.dumps({**{k: v for k, v in result.items() if k not in info}, **comparison}))
+            results.append(result)
+
+    if not args.no_save:
+        save_results(results, args.results)
+        print(f"Results appended to {args.results}")
+    if regressions:
+        print(f"{regressions} timings regressed by more than {int((REGRESSION_THRESHOLD - 1) * 100)}%")
@@ -1,24 +1,26 @@
 # Example of how to describe the Account object
 from simple_salesforce import Salesforce
+import json
 import os
 
 from config import USERNAME, PASSWORD, SECURITY_TOKEN, DOMAIN
+from describe_cache import get_account_describe
 
 # Connect to Salesforce
 sf = Salesforce(username=USERNAME, password=PASSWORD, security_token=SECURITY_TOKEN, domain=DOMAIN)
 
 # Describe the Account object
-account_description = sf.Account.describe()
+account_description = get_account_describe(sf)  # Cached on disk per org and API version
 
 # Create the "data" folder if it doesn't exist
 output_folder = 'data'
 os.makedirs(output_folder, exist_ok=True)
 
 # Output file path
-output_file_path = os.path.join(output_folder, 'account_description.txt')
+output_file_path = os.path.join(output_folder, 'account_description.json')
 
-# Save the description to a text file
+# Save the description to a JSON file
 with open(output_file_path, 'w') as file:
-    file.write(str(account_description))
+    json.dump(account_description, file, indent=2)
 
 print(f"Account description saved to {output_file_path}")
@@ -1,26 +1,59 @@
+import numpy as np
 import pandas as pd
+from account_snapshot import get_snapshot_frame
+from cpf_cnpj import build_cpfcnpj_index
+from artifacts import save_artifact
 
-def check_duplicates(sf, salesforce_accounts):
+KEY_COLUMN = 'cpfcnpj_key'
+OUTPUT_FILE = 'data/duplicated_accounts.xlsx'
+
+def find_duplicate_groups(accounts_df, key_column=KEY_COLUMN):
+    """Returns every account whose normalized key appears more than once, with a group ID and group size.
+
+    ``key_column`` is a column of the CPF/CNPJ index: ``cpfcnpj_key`` for exact matches or
+    ``cnpj_root`` to group a company's branches. A single hash pass (factorize) labels every
+    key, so there is no per-account Python loop and it scales to millions of rows. Groups
+    are numbered in order of first appearance.
+    """
+    if key_column not in accounts_df.columns:
+        accounts_df = accounts_df.join(build_cpfcnpj_index(accounts_df['NEO_Cpfcnpj__c']))
+    keys = accounts_df[key_column]
+    codes, _ = pd.factorize(keys)
+    # Shift codes by one so missing keys (code -1) land in slot 0, which counts as no group
+    counts = np.bincount(codes + 1, minlength=1)
+    counts[0] = 0
+    row_sizes = counts[codes + 1]
+    duplicated = row_sizes > 1
+
+    _, group_ids = np.unique(codes[duplicated], return_inverse=True)
+    order = np.argsort(group_ids, kind='stable')
+    return pd.DataFrame({
+        'NEO_Cpfcnpj__c': accounts_df['NEO_Cpfcnpj__c'].to_numpy()[duplicated][order],
+        key_column: keys.to_numpy()[duplicated][order],
+        'Account ID': accounts_df['Id'].to_numpy()[duplicated][order],
+        'Group ID': group_ids[order] + 1,
+        'Group Size': row_sizes[duplicated][order],
+    })
+
+def check_duplicates(sf, salesforce_accounts=None, key_column=KEY_COLUMN):
     print("Checking for duplicate NEO_Cpfcnpj__c...")
 
-    # Step 1: Collect NEO_Cpfcnpj__c from accounts
-    cpf_data = {}
-    for account in salesforce_accounts:
-        cpf_value = account.get('NEO_Cpfcnpj__c')
-        if cpf_value:
-            if cpf_value in cpf_data:
-                cpf_data[cpf_value].append(account['Id'])
-            else:
-                cpf_data[cpf_value] = [account['Id']]
-    
-    # Step 2: Filter duplicates
-    duplicates = {cpf: ids for cpf, ids in cpf_data.items() if len(ids) > 1}
+    # Step 1: Load the accounts as a columnar frame (from the local snapshot, with its precomputed
+    # CPF/CNPJ index, when none are given)
+    if salesforce_accounts is None:
+        accounts_df = get_snapshot_frame(sf, with_key_index=True)
+    elif isinstance(salesforce_accounts, pd.DataFrame):
+        accounts_df = salesforce_accounts
+    else:
+        accounts_df = pd.DataFrame(salesforce_accounts, columns=['Id', 'NEO_Cpfcnpj__c'])
+
+    # Step 2: Keep only the accounts whose normalized, valid CPF/CNPJ is shared, grouped and numbered
+    df_duplicates = find_duplicate_groups(accounts_df, key_column)
     
     # Step 3: Create file with duplicated accounts
-    if duplicates:
-        df_duplicates = pd.DataFrame([(cpf, id) for cpf, ids in duplicates.items() for id in ids], columns=['NEO_Cpfcnpj__c', 'Account ID'])
-        output_file_path = 'data/duplicated_accounts.xlsx'
-        df_duplicates.to_excel(output_file_path, index=False)
-        print(f"Duplicated accounts saved to {output_file_path}")
+    if not df_duplicates.empty:
+        output_file_path = OUTPUT_FILE
+        save_artifact(df_duplicates, output_file_path)  # Parquet, plus Excel when EXPORT_EXCEL is on
+        print(f"Duplicated accounts saved to {output_file_path} ({df_duplicates['Group ID'].nunique()} groups)")
     else:
         print("No duplicated accounts found.")
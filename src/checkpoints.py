@@ -0,0 +1,75 @@
+"""Append-only SQLite checkpoints for long related-count runs."""
+import hashlib
+import logging
+import os
+import sqlite3
+
+import pandas as pd
+
+from config import CHECKPOINT_DIR
+
+logger = logging.getLogger(__name__)
+
+
+def batch_key(*parts):
+    """Stable identifier of a unit of work (e.g. the object and the aggregate query of a chunk)."""
+    return hashlib.sha1('\x1f'.join(map(str, parts)).encode()).hexdigest()
+
+
+def checkpoint_path(output_path, mode=None, folder=CHECKPOINT_DIR):
+    """Checkpoint file for the run that writes ``output_path``.
+
+    ``mode`` names how the work is split (e.g. ``'batched'``); runs in different modes record
+    different units of work, so each mode gets its own file and never resumes from the other.
+    """
+    name = os.path.splitext(os.path.basename(output_path))[0]
+    if mode:
+        name = f"{name}.{mode}"
+    return os.path.join(folder, f"{name}.sqlite")
+
+
+class CountCheckpoint:
+    """Completed batches of related counts, appended as they finish.
+
+    Each batch is written with its counts in a single transaction, so a batch is either fully
+    recorded or retried on the next run. Counts are only ever appended; when a batch is redone
+    the newest count for an account wins.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS batches (batch TEXT PRIMARY KEY)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS counts (object TEXT, account TEXT, total INTEGER)")
+
+    def completed(self):
+        """Keys of the batches already recorded."""
+        return {row[0] for row in self.conn.execute("SELECT batch FROM batches")}
+
+    def save(self, batch, rows):
+        """Records a finished batch and its ``(object, account, total)`` rows atomically."""
+        with self.conn:
+            self.conn.executemany("INSERT INTO counts (object, account, total) VALUES (?, ?, ?)", rows)
+            self.conn.execute("INSERT OR IGNORE INTO batches (batch) VALUES (?)", (batch,))
+
+    def totals(self):
+        """Latest count per object and account, as ``{object: {account: total}}``."""
+        df = pd.read_sql_query("SELECT object, account, total FROM counts ORDER BY rowid", self.conn)
+        df = df.drop_duplicates(['object', 'account'], keep='last')
+        return {
+            key: dict(zip(group['account'], group['total'].astype(int)))
+            for key, group in df.groupby('object', sort=False)
+        }
+
+    def close(self):
+        self.conn.close()
+
+    def discard(self):
+        """Deletes the checkpoint once its run has been fully written out."""
+        self.close()
+        os.remove(self.path)
+        logger.debug("Checkpoint %s removed", self.path)
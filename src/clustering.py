@@ -0,0 +1,81 @@
+"""Transitive duplicate clustering: links accounts that share any match key or fuzzy pair."""
+import numpy as np
+import pandas as pd
+
+from cpf_cnpj import build_cpfcnpj_index
+
+# Keys that identify the same customer on their own: the normalized CPF/CNPJ and the customer key.
+DEFAULT_MATCH_KEYS = ('cpfcnpj_key', 'NEO_Clave_Cliente__c')
+
+
+class DisjointSet:
+    """Array-based union-find with union by size and path halving (near-linear in the number of edges)."""
+
+    def __init__(self, size):
+        # Plain lists: element access is much cheaper than on NumPy arrays inside the Python loop.
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, node):
+        parent = self.parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+
+    def union_all(self, left, right):
+        for a, b in zip(left.tolist(), right.tolist()):
+            self.union(a, b)
+
+    def roots(self):
+        return np.array([self.find(node) for node in range(len(self.parent))])
+
+
+def key_edges(values):
+    """Links every row to the first row with the same non-empty key (a star per key, not all pairs)."""
+    keys = values.astype('string').str.strip().replace('', pd.NA)
+    codes, uniques = pd.factorize(keys)
+    rows = np.flatnonzero(codes >= 0)
+    first_row = np.full(len(uniques), -1)
+    # Assigning in reverse leaves the first occurrence of each code in place.
+    first_row[codes[rows][::-1]] = rows[::-1]
+    anchors = first_row[codes[rows]]
+    linked = rows != anchors
+    return anchors[linked], rows[linked]
+
+
+def cluster_ids(accounts_df, keys=DEFAULT_MATCH_KEYS, pairs=None):
+    """Returns a stable cluster ID per account, aligned with ``accounts_df``.
+
+    Accounts are linked when they share a value in any of ``keys`` or appear together in
+    ``pairs`` (a DataFrame with ``Id_left``/``Id_right``, e.g. fuzzy matches), and links are
+    followed transitively: A~B by CPF and B~C by Clave put A, B and C in one cluster. The
+    cluster ID is the smallest account Id in the cluster, so it does not depend on row order.
+    """
+    if 'cpfcnpj_key' in keys and 'cpfcnpj_key' not in accounts_df.columns:
+        accounts_df = accounts_df.assign(cpfcnpj_key=build_cpfcnpj_index(accounts_df['NEO_Cpfcnpj__c'])['cpfcnpj_key'])
+
+    clusters = DisjointSet(len(accounts_df))
+    for key in keys:
+        if key in accounts_df.columns:
+            clusters.union_all(*key_edges(accounts_df[key]))
+
+    ids = accounts_df['Id'].reset_index(drop=True)
+    if pairs is not None and len(pairs):
+        position = pd.Series(np.arange(len(ids)), index=ids.to_numpy())
+        known = pairs['Id_left'].isin(position.index) & pairs['Id_right'].isin(position.index)
+        clusters.union_all(
+            position[pairs.loc[known, 'Id_left']].to_numpy(), position[pairs.loc[known, 'Id_right']].to_numpy()
+        )
+
+    smallest_id = ids.groupby(clusters.roots()).transform('min')
+    return pd.Series(smallest_id.to_numpy(), index=accounts_df.index, name='cluster_id')
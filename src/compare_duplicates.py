@@ -1,11 +1,20 @@
+import argparse
+import os
+import time
 import pandas as pd
 import logging
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill
 from main import connect_to_salesforce  # Function to connect to Salesforce imported from main.py
+from account_fetch import fetch_accounts_by_ids as fetch_accounts_in_chunks
+from describe_cache import get_account_describe, select_consolidation_fields
+from clustering import cluster_ids
+from survivorship import DEFAULT_RULES, MAPPING_FILE
+from parallel_consolidation import consolidate_in_parallel
+from report_writer import survivor_highlights, write_frame
+from artifacts import load_artifact
+from config import METRICS_DIR
+from instrumentation import Metrics, instrument, profiling
+from logging_setup import add_logging_arguments, configure_from_args
 
-# Logging setup
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 # Input and output files
@@ -15,137 +24,111 @@ output_file = 'data/duplicated_accounts_consolidated_with_colors.xlsx'  # Output
 def load_duplicate_ids(filename):
     """Loads the duplicate account IDs from an Excel file."""
     try:
-        df_ids = pd.read_excel(filename)
+        df_ids = load_artifact(filename, columns=['Id'])  # Parquet artifact first, Excel otherwise
         return df_ids['Id'].dropna().tolist()  # Correctly using the 'Id' field
     except Exception as e:
-        logger.error(f"Error loading duplicate IDs: {e}")
+        logger.error("Error loading duplicate IDs: %s", e)
         raise
 
-def fetch_accounts_by_ids(sf, ids_list):
+def fetch_accounts_by_ids(sf, ids_list, rate_limiter=None):
     """Queries Salesforce for the specified account IDs and returns the records."""
     try:
-        fields = ', '.join([f['name'] for f in sf.Account.describe()['fields']])
-        query = f"SELECT {fields} FROM Account WHERE Id IN ({', '.join([f"'{id}'" for id in ids_list])})"
+        # Cached describe, pruned to the fields consolidation uses (no formula, compound or long text fields)
+        fields = select_consolidation_fields(get_account_describe(sf))
         logger.info("Fetching duplicate accounts from Salesforce...")
-        return sf.query_all(query)['records']
+        # Deduplicated IDs, fetched in length-limited chunks in parallel (REST or Bulk API 2.0)
+        return fetch_accounts_in_chunks(sf, ids_list, fields, rate_limiter=rate_limiter)
     except Exception as e:
-        logger.error(f"Error fetching accounts: {e}")
+        logger.error("Error fetching accounts: %s", e)
         raise
 
-def count_non_empty_fields(account):
-    """Counts how many fields in an account are not empty."""
-    return sum(1 for value in account.values() if value not in [None, '', 'NA'])
-
-def choose_base_account(accounts):
-    """Chooses the base account (the one to keep) among several duplicate accounts."""
-    base_account = accounts[0]
-    discarded_account_ids = []  # Discarded account IDs
-
-    # Sort accounts by last modified date (most recent first)
-    accounts = sorted(accounts, key=lambda x: x.get('LastModifiedDate', ''), reverse=True)
-
-    for account in accounts[1:]:
-        last_modified_base = base_account.get('LastModifiedDate')
-        last_modified_account = account.get('LastModifiedDate')
-
-        # If the current account's last modified date is more recent than the base account's, replace
-        if last_modified_account > last_modified_base:
-            discarded_account_ids.append(base_account['Id'])
-            base_account = account  # Update the base account
-        elif last_modified_account == last_modified_base:
-            # If the dates are the same, choose the account with more fields filled
-            count_base = count_non_empty_fields(base_account)
-            count_account = count_non_empty_fields(account)
-            
-            if count_account > count_base:
-                discarded_account_ids.append(base_account['Id'])
-                base_account = account  # Update the base account
-
-        # Now, fill empty fields in the base account with data from the secondary account
-        for field in base_account.keys():
-            value_base = base_account.get(field)
-            value_account = account.get(field)
-            
-            # If the field in the base account is empty or 'NA', use the value from the secondary account
-            if value_base in [None, '', 'NA']:
-                base_account[field] = value_account  # Fill with the value from the duplicate account
-
-    base_account['Discarded_Account_Ids'] = discarded_account_ids  # Add discarded account IDs
-    return base_account, discarded_account_ids  # Return the base account and the discarded IDs
-
-def consolidate_accounts(df):
-    """Consolidates multiple duplicate accounts into one base account and applies color formatting."""
-    consolidated_accounts = []
-    discarded_account_ids = []
-
-    # Group by account ID
-    grouped_accounts = df.groupby('Id')
-
-    for account_id, group in grouped_accounts:
-        accounts = group.to_dict('records')
-        base_account, discarded_ids = choose_base_account(accounts)
-
-        # Add the base account to the consolidated accounts list
-        consolidated_accounts.append(base_account)
-
-        # Add the discarded account IDs to the general list
-        discarded_account_ids.extend(discarded_ids)
-
-    # Convert to final DataFrame
-    df_consolidated = pd.DataFrame(consolidated_accounts)
+def consolidate_accounts(df, pairs=None, rules=DEFAULT_RULES, workers=1, with_mapping=False, source_priority=(),
+                         field_source_priority=None):
+    """Consolidates multiple duplicate accounts into one base account and applies color formatting.
 
+    With ``with_mapping=True`` the survivorship mapping (Id, Survivor_Id, Is_Survivor) is returned as well.
+    ``source_priority`` and ``field_source_priority`` rank records by AccountSource, as in
+    :func:`survivorship.build_golden_records`.
+    """
+    # REST records carry an 'attributes' dict that is not account data
+    df = df.drop(columns='attributes', errors='ignore')
+
+    # Group by duplicate cluster: accounts linked by CPF/CNPJ, NEO_Clave_Cliente__c or fuzzy pairs, transitively
+    df['cluster_id'] = cluster_ids(df, pairs=pairs)
+
+    # Choose the base account of every cluster and fill its empty fields from the others,
+    # sharding the clusters across worker processes when workers > 1
+    df_consolidated, mapping, _ = consolidate_in_parallel(
+        df, workers, rules=rules, source_priority=source_priority, field_source_priority=field_source_priority,
+    )
+
+    if with_mapping:
+        return df_consolidated, mapping
     return df_consolidated
 
 def apply_formatting_to_excel(df):
-    """Applies color formatting to the Excel file, marking consolidated accounts in green and duplicates in yellow."""
-    # Load the Excel file for editing
-    wb = load_workbook(output_file)
-    ws = wb.active
-
-    # Define color styles
-    green_fill = PatternFill(start_color="00FF00", end_color="00FF00", fill_type="solid")
-    yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
-
-    # Loop through the accounts and apply colors
-    for row in ws.iter_rows(min_row=2, max_row=ws.max_row):
-        account_id_cell = row[0]  # Assuming the account ID is in the first column
-        discarded_id_cell = row[6]  # The 'Discarded_Account_Ids' column is the 7th (index 6)
-
-        if discarded_id_cell.value == "":  # Account was not discarded
-            account_id_cell.fill = green_fill  # Base account in green
-        else:
-            account_id_cell.fill = yellow_fill  # Duplicate account in yellow
-
-    # Save the file with the formatting applied
-    wb.save(output_file)
-    logger.info(f"Consolidated accounts with colors saved to: {output_file}")
-
-def main():
+    """Saves the consolidated accounts in one pass, marking base accounts in green and those that absorbed duplicates in yellow."""
+    # Colors are conditional-format rules on the Id column keyed by the 'Discarded_Account_Ids'
+    # column name, so no cell is repainted and the file is written only once
+    write_frame(output_file, df, highlights=survivor_highlights())
+    logger.info("Consolidated accounts with colors saved to: %s", output_file)
+
+def save_mapping(mapping, path=MAPPING_FILE):
+    """Saves which survivor every account was merged into, where merge_executor reads it by default."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    mapping.to_csv(path, index=False)
+    logger.info("Survivorship mapping saved to: %s", path)
+
+def parse_args():
+    """Parses the command-line options."""
+    parser = argparse.ArgumentParser(description="Consolidate duplicate Salesforce accounts.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of processes used to consolidate duplicate clusters (default: 1)")
+    parser.add_argument('--metrics', default=os.path.join(METRICS_DIR, f"consolidation_{time.strftime('%Y%m%d_%H%M%S')}.json"),
+                        help="Where to write the JSON run metrics")
+    parser.add_argument('--profile', help="Profile the run: a .prof path (cProfile) or .html (pyinstrument)")
+    add_logging_arguments(parser)
+    return parser.parse_args()
+
+def main(workers=1, metrics_path=None, profile_path=None):
     """Main function that connects to Salesforce, loads duplicates, and performs automatic consolidation."""
+    metrics = Metrics()
     try:
-        # Connect to Salesforce
-        sf = connect_to_salesforce()
-        
-        # Load duplicate account IDs
-        ids_list = load_duplicate_ids(input_file)
-        logger.info(f"{len(ids_list)} duplicate IDs loaded for comparison.")
-        
-        # Fetch duplicate accounts from Salesforce
-        accounts = fetch_accounts_by_ids(sf, ids_list)
-        df_accounts = pd.DataFrame(accounts)
-
-        # Consolidate duplicate accounts
-        df_consolidated = consolidate_accounts(df_accounts)
-        
-        # Save the consolidated result to an Excel file
-        df_consolidated.to_excel(output_file, index=False)
-        logger.info(f'Duplicated accounts consolidated and saved to: {output_file}')
-        
-        # Apply color formatting to the Excel file
-        apply_formatting_to_excel(df_consolidated)
-        
+        with profiling(profile_path):
+            # Connect to Salesforce; every API call goes through the instrumented client
+            sf = instrument(connect_to_salesforce(), metrics)
+
+            # Load duplicate account IDs
+            with metrics.stage('load_duplicate_ids') as stage:
+                ids_list = load_duplicate_ids(input_file)
+                stage['rows'] = len(ids_list)
+            logger.info("%d duplicate IDs loaded for comparison.", len(ids_list))
+
+            # Fetch duplicate accounts from Salesforce
+            with metrics.stage('fetch_accounts') as stage:
+                accounts = fetch_accounts_by_ids(sf, ids_list)
+                df_accounts = pd.DataFrame(accounts)
+                stage['rows'] = len(df_accounts)
+
+            # Consolidate duplicate accounts
+            with metrics.stage('consolidate_accounts') as stage:
+                stage['rows'] = len(df_accounts)
+                df_consolidated, mapping = consolidate_accounts(df_accounts, workers=workers, with_mapping=True)
+
+            # Save the consolidated result to an Excel file with color formatting, and the survivor
+            # of every account for merge_executor
+            with metrics.stage('write_report') as stage:
+                stage['rows'] = len(df_consolidated)
+                apply_formatting_to_excel(df_consolidated)
+                save_mapping(mapping)
+
     except Exception as e:
-        logger.error(f"An error occurred during execution: {e}")
+        logger.error("An error occurred during execution: %s", e)
+    finally:
+        if metrics_path:
+            metrics.write_report(metrics_path)
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    configure_from_args(args)
+    main(args.workers, args.metrics, args.profile)
@@ -0,0 +1,90 @@
+import logging
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Error code Salesforce returns when the org is over its concurrent or rolling request limits.
+REQUEST_LIMIT_ERROR = 'REQUEST_LIMIT_EXCEEDED'
+
+# Error codes for queries on objects or fields the org does not have; retrying cannot help.
+SCHEMA_ERRORS = ('INVALID_TYPE', 'INVALID_FIELD')
+
+
+class TokenBucket:
+    """Thread-safe token bucket: allows ``rate`` calls per second with bursts of up to ``capacity``.
+
+    ``rate=None`` (or infinity) means no limit: :meth:`acquire` returns at once. The capacity is at
+    least one token, so rates below one call per second still let calls through.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.unlimited = rate is None or math.isinf(rate)
+        if not self.unlimited and not rate > 0:
+            raise ValueError(f"TokenBucket rate must be positive or None for no limit, got {rate!r}")
+        self.rate = None if self.unlimited else float(rate)
+        self.capacity = None if self.unlimited else max(1.0, float(capacity or rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available and consumes it."""
+        if self.unlimited:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def is_request_limit_error(error):
+    """Checks whether an exception carries Salesforce's REQUEST_LIMIT_EXCEEDED error code."""
+    return REQUEST_LIMIT_ERROR in str(error)
+
+
+def is_schema_error(error, codes=SCHEMA_ERRORS):
+    """Checks whether a query failed because its object or field does not exist in the org."""
+    return any(code in str(error) for code in codes)
+
+
+def call_with_retry(func, *args, rate_limiter=None, max_retries=5, base_delay=1.0, **kwargs):
+    """Calls ``func`` through the rate limiter, retrying with exponential backoff on request-limit errors."""
+    for attempt in range(max_retries + 1):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if attempt == max_retries or not is_request_limit_error(e):
+                raise
+            delay = base_delay * 2 ** attempt + random.uniform(0, base_delay)
+            logger.warning("Request limit exceeded, retrying in %.1fs (attempt %d/%d)", delay, attempt + 1, max_retries)
+            time.sleep(delay)
+
+
+def iter_in_order(func, items, max_workers=1):
+    """Like :func:`map_in_order`, but yields each result as soon as it and all earlier ones are done."""
+    if max_workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        yield from executor.map(func, items)
+
+
+def map_in_order(func, items, max_workers=1):
+    """Applies ``func`` to every item, concurrently when ``max_workers > 1``, returning results in input order."""
+    if max_workers <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(func, items))
@@ -9,3 +9,55 @@ USERNAME = os.getenv('SALESFORCE_USERNAME')
 PASSWORD = os.getenv('SALESFORCE_PASSWORD')
 SECURITY_TOKEN = os.getenv('SALESFORCE_SECURITY_TOKEN')
 DOMAIN = os.getenv('SALESFORCE_DOMAIN')
+# Org URL used for record links in offline scripts (e.g. https://mycompany.my.salesforce.com)
+INSTANCE_URL = os.getenv('SALESFORCE_INSTANCE_URL')
+
+# Concurrency for Salesforce API calls. Production orgs allow 25 concurrent
+# long-running requests, so keep the worker pool and burst size well below that.
+MAX_WORKERS = int(os.getenv('SALESFORCE_MAX_WORKERS', '8'))
+REQUESTS_PER_SECOND = float(os.getenv('SALESFORCE_REQUESTS_PER_SECOND', '10'))
+REQUEST_BURST = int(os.getenv('SALESFORCE_REQUEST_BURST', '20'))
+
+# Local Account snapshot shared by every module that needs the full Account table.
+# Changes are synced incrementally once the snapshot is older than SNAPSHOT_TTL
+# seconds, and the whole table is pulled again every SNAPSHOT_FULL_REFRESH seconds.
+SNAPSHOT_PATH = os.getenv('ACCOUNT_SNAPSHOT_PATH', 'data/account_snapshot.sqlite')
+SNAPSHOT_TTL = int(os.getenv('ACCOUNT_SNAPSHOT_TTL', str(15 * 60)))
+SNAPSHOT_FULL_REFRESH = int(os.getenv('ACCOUNT_SNAPSHOT_FULL_REFRESH', str(7 * 24 * 60 * 60)))
+
+# Backend used for full-table extractions: 'rest' (query_all paging) or 'bulk' (Bulk API 2.0 query jobs).
+EXTRACTION_BACKEND = os.getenv('SALESFORCE_EXTRACTION_BACKEND', 'rest')
+
+# On-disk cache of sObject describe results, refreshed after DESCRIBE_CACHE_TTL seconds.
+DESCRIBE_CACHE_DIR = os.getenv('DESCRIBE_CACHE_DIR', 'data/cache')
+DESCRIBE_CACHE_TTL = int(os.getenv('DESCRIBE_CACHE_TTL', str(24 * 60 * 60)))
+
+# Intermediate files are written as Parquet next to their Excel name (data/x.xlsx -> data/x.parquet).
+# The Excel copy for human review is only written when EXPORT_EXCEL is enabled.
+EXPORT_EXCEL = os.getenv('EXPORT_EXCEL', 'true').lower() in ('1', 'true', 'yes')
+
+# Columns read from data_source/conta_duplicadas.xlsx (comma-separated). The default is what the pipeline
+# uses: the Id (also behind the Salesforce links), the 18-character Id, the CPF/CNPJ key and STATUS. Set
+# SOURCE_COLUMNS=* (or an empty value) to read every column, e.g. to keep the rest of the sheet in the count reports.
+SOURCE_COLUMNS = [
+    column.strip()
+    for column in os.getenv('SOURCE_COLUMNS', 'Id,Account_18_Digit_ID__c,NEO_Cpfcnpj__c,STATUS').split(',')
+    if column.strip() and column.strip() != '*'
+]
+
+# Append-only checkpoints of long related-count runs, so a failed run resumes where it stopped.
+CHECKPOINT_DIR = os.getenv('CHECKPOINT_DIR', 'data/checkpoints')
+
+# Rollback journals of merge runs (one JSON Lines file per run).
+MERGE_JOURNAL_DIR = os.getenv('MERGE_JOURNAL_DIR', 'data/merge_journal')
+
+# Machine-readable run metrics (stage timings, API calls per query template), one JSON file per run.
+METRICS_DIR = os.getenv('METRICS_DIR', 'data/metrics')
+
+# Cache keys and output hashes of the pipeline stages, used to skip stages whose inputs did not change.
+PIPELINE_STATE_PATH = os.getenv('PIPELINE_STATE_PATH', 'data/pipeline_state.json')
+
+# Default log verbosity for the command-line scripts (-1 warnings only, 0 info, 1 debug, 2 also HTTP/library
+# debug) and log line format ('text' or 'json', one JSON object per line). -v/-q shift the verbosity per run.
+LOG_VERBOSITY = int(os.getenv('LOG_VERBOSITY', '0'))
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
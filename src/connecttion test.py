@@ -2,9 +2,8 @@ import logging
 import os
 from simple_salesforce import Salesforce
 from dotenv import load_dotenv
+from logging_setup import configure_logging
 
-# Logging configuration
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 def connect_to_salesforce():
@@ -16,15 +15,8 @@ def connect_to_salesforce():
     security_token = os.getenv('SALESFORCE_SECURITY_TOKEN')
     domain = os.getenv('SALESFORCE_DOMAIN', 'login')  # 'login' for production, 'test' for sandbox
 
-    # Logging connection information
-    logger.debug("Attempting to connect to Salesforce...")
-    logger.debug(f"Username: `{username}`")
-    logger.debug(f"Domain: `{domain}`")
-    logger.debug(f"Security Token: `{security_token}`")
-    logger.debug(f"Password: `{password}`")
-
-    # Adding security (do not log password or token)
-    logger.debug("Attempting to authenticate...")
+    # Never log the password or security token
+    logger.debug("Attempting to authenticate as %s (domain %s)...", username, domain)
 
     try:
         # Connect to Salesforce
@@ -32,11 +24,12 @@ def connect_to_salesforce():
         logger.info("Successfully connected to Salesforce!")
         return sf
     except Exception as e:
-        logger.error(f"Authentication failed: {e}")
+        logger.error("Authentication failed: %s", e)
         raise
 
 if __name__ == "__main__":
+    configure_logging()
     try:
         sf = connect_to_salesforce()
     except Exception as e:
-        logger.error(f"An error occurred: {e}")
+        logger.error("An error occurred: %s", e)
@@ -0,0 +1,98 @@
+"""Vectorized CPF/CNPJ normalization and check-digit validation."""
+import numpy as np
+import pandas as pd
+
+CPF_LENGTH = 11
+CNPJ_LENGTH = 14
+CNPJ_ROOT_LENGTH = 8
+
+CPF_WEIGHTS_1 = np.arange(10, 1, -1)
+CPF_WEIGHTS_2 = np.arange(11, 1, -1)
+CNPJ_WEIGHTS_1 = np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+CNPJ_WEIGHTS_2 = np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+
+INDEX_COLUMNS = ['cpfcnpj_key', 'cpfcnpj_type', 'cnpj_root']
+
+
+def to_matrix(values, width):
+    """Turns equal-width ASCII strings into an (n, width) matrix of character values (ord - 48).
+
+    For digits this is the digit itself; for letters it is the value the alphanumeric
+    CNPJ check-digit rule assigns them (A=17, B=18, ...).
+    """
+    if len(values) == 0:
+        return np.empty((0, width), dtype=np.int64)
+    raw = np.frombuffer(''.join(values).encode('ascii'), dtype=np.uint8)
+    return raw.reshape(-1, width).astype(np.int64) - 48
+
+
+def mod11_digit(matrix, weights, cpf):
+    remainder = (matrix @ weights) % 11
+    if cpf:
+        return (remainder * 10 % 11) % 10
+    return np.where(remainder < 2, 0, 11 - remainder)
+
+
+def valid_cpf(values):
+    """Checks both CPF check digits; repeated-digit numbers such as 111.111.111-11 are rejected."""
+    d = to_matrix(values, CPF_LENGTH)
+    first = mod11_digit(d[:, :9], CPF_WEIGHTS_1, cpf=True)
+    second = mod11_digit(d[:, :10], CPF_WEIGHTS_2, cpf=True)
+    repeated = (d == d[:, :1]).all(axis=1)
+    return (d[:, 9] == first) & (d[:, 10] == second) & ~repeated
+
+
+def valid_cnpj(values):
+    """Checks both CNPJ check digits (numeric and the alphanumeric CNPJ format)."""
+    d = to_matrix(values, CNPJ_LENGTH)
+    first = mod11_digit(d[:, :12], CNPJ_WEIGHTS_1, cpf=False)
+    second = mod11_digit(d[:, :13], CNPJ_WEIGHTS_2, cpf=False)
+    repeated = (d == d[:, :1]).all(axis=1)
+    # Alphanumeric CNPJs only allow letters in the first 12 positions; the check digits stay numeric.
+    numeric_digits = ((d[:, 12:] >= 0) & (d[:, 12:] <= 9)).all(axis=1)
+    return numeric_digits & (d[:, 12] == first) & (d[:, 13] == second) & ~repeated
+
+
+def build_cpfcnpj_index(values):
+    """Normalizes raw NEO_Cpfcnpj__c values into a blocking index aligned with ``values``.
+
+    Punctuation and spaces are removed and leading zeros lost by spreadsheets are restored:
+    up to 11 digits are checked as a CPF padded to 11 and, when that fails, as a CNPJ padded to 14
+    (a CNPJ starting with 000 loses as many digits as a CPF has); 12 to 14 characters are a CNPJ.
+    A number valid both ways is kept as a CPF.
+    Returns a DataFrame with:
+
+    - ``cpfcnpj_key``: the normalized number, or NA when it fails check-digit validation
+    - ``cpfcnpj_type``: 'CPF' or 'CNPJ'
+    - ``cnpj_root``: the first 8 characters of a CNPJ, shared by a company's branches
+    """
+    cleaned = (
+        values.astype('string')
+        .str.replace(r'\.0+$', '', regex=True)  # numbers read from Excel as floats, e.g. 52998224725.0
+        .str.upper()
+        .str.replace(r'[^0-9A-Z]', '', regex=True)
+    )
+    lengths = cleaned.str.len().fillna(0).astype(int).to_numpy()
+    numeric = cleaned.str.isdigit().fillna(False).to_numpy(dtype=bool)
+
+    key = np.full(len(cleaned), None, dtype=object)
+    kind = np.full(len(cleaned), None, dtype=object)
+
+    cpf_candidates = numeric & (lengths > 0) & (lengths <= CPF_LENGTH)
+    cpf_values = cleaned[cpf_candidates].str.zfill(CPF_LENGTH).to_numpy(dtype=str)
+    cpf_ok = valid_cpf(cpf_values)
+    cpf_rows = np.flatnonzero(cpf_candidates)[cpf_ok]
+    key[cpf_rows] = cpf_values[cpf_ok]
+    kind[cpf_rows] = 'CPF'
+
+    cnpj_candidates = (lengths > 0) & (lengths <= CNPJ_LENGTH)
+    cnpj_candidates[cpf_rows] = False
+    cnpj_values = cleaned[cnpj_candidates].str.zfill(CNPJ_LENGTH).to_numpy(dtype=str)
+    cnpj_ok = valid_cnpj(cnpj_values)
+    cnpj_rows = np.flatnonzero(cnpj_candidates)[cnpj_ok]
+    key[cnpj_rows] = cnpj_values[cnpj_ok]
+    kind[cnpj_rows] = 'CNPJ'
+
+    index = pd.DataFrame({'cpfcnpj_key': key, 'cpfcnpj_type': kind}, index=values.index).astype('string')
+    index['cnpj_root'] = index['cpfcnpj_key'].str.slice(0, CNPJ_ROOT_LENGTH).where(index['cpfcnpj_type'] == 'CNPJ')
+    return index
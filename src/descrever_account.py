@@ -1,21 +1,23 @@
 # src/describe_account.py
 from simple_salesforce import Salesforce
+import json
 import os
 
 from config import USERNAME, PASSWORD, SECURITY_TOKEN, DOMAIN
+from describe_cache import get_account_describe
 
 # Connect to Salesforce
 sf = Salesforce(username=USERNAME, password=PASSWORD, security_token=SECURITY_TOKEN, domain=DOMAIN)
 
 # Describe the Account object
-account_description = sf.Account.describe()
+account_description = get_account_describe(sf)  # Cached on disk per org and API version
 
-# Save the output to a text file
+# Save the output to a JSON file
 output_folder = 'data'
 os.makedirs(output_folder, exist_ok=True)
-output_file_path = os.path.join(output_folder, 'Account_Description.txt')
+output_file_path = os.path.join(output_folder, 'Account_Description.json')
 
 with open(output_file_path, 'w') as file:
-    file.write(str(account_description))
+    json.dump(account_description, file, indent=2)
 
 print(f"Account description saved to {output_file_path}")
@@ -0,0 +1,65 @@
+import json
+import logging
+import os
+import time
+
+from config import DESCRIBE_CACHE_DIR, DESCRIBE_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# Fields the consolidation steps always need, whatever their type.
+CONSOLIDATION_KEY_FIELDS = ['Id', 'Name', 'LastModifiedDate', 'NEO_Cpfcnpj__c', 'NEO_Clave_Cliente__c']
+
+# Compound and binary field types: their components are selected separately or they are not mergeable.
+SKIPPED_FIELD_TYPES = {'address', 'location', 'base64'}
+
+# Text areas longer than this are long/rich text fields, which are large and not used to pick a base account.
+MAX_TEXTAREA_LENGTH = 255
+
+
+def org_key(sf):
+    """Identifies the org: session IDs start with the org ID, otherwise fall back to the instance host."""
+    session_id = getattr(sf, 'session_id', '') or ''
+    if session_id.startswith('00D'):
+        return session_id.split('!')[0]
+    return sf.sf_instance.replace('.', '_')
+
+
+def describe_cache_path(sf, sobject):
+    return os.path.join(DESCRIBE_CACHE_DIR, f"{sobject}_{org_key(sf)}_v{sf.sf_version}.json")
+
+
+def get_describe(sf, sobject='Account', refresh=False, max_age=DESCRIBE_CACHE_TTL):
+    """Returns the sObject describe, read from the on-disk cache (keyed by org and API version) when fresh."""
+    path = describe_cache_path(sf, sobject)
+    if not refresh and os.path.exists(path) and time.time() - os.path.getmtime(path) <= max_age:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+
+    logger.info("Describing %s from Salesforce...", sobject)
+    describe = getattr(sf, sobject).describe()
+    os.makedirs(DESCRIBE_CACHE_DIR, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(describe, file)
+    return describe
+
+
+def get_account_describe(sf, refresh=False):
+    return get_describe(sf, 'Account', refresh=refresh)
+
+
+def is_consolidation_field(field):
+    """Checks whether a describe field entry is a plain, mergeable data field."""
+    if field['name'] in CONSOLIDATION_KEY_FIELDS:
+        return True
+    if field.get('calculated') or field['type'] in SKIPPED_FIELD_TYPES:
+        return False
+    if field['type'] == 'textarea' and field.get('length', 0) > MAX_TEXTAREA_LENGTH:
+        return False
+    # System and read-only fields cannot be carried over to the base account.
+    return bool(field.get('updateable'))
+
+
+def select_consolidation_fields(describe):
+    """Lists the fields consolidation reads, dropping formula, compound and long text fields from the SELECT."""
+    return [field['name'] for field in describe['fields'] if is_consolidation_field(field)]
@@ -0,0 +1,137 @@
+"""Pluggable backends that run a SOQL query and yield its records one at a time."""
+import csv
+import io
+import logging
+import queue
+import threading
+import time
+
+from config import EXTRACTION_BACKEND
+from soql_batching import MAX_QUERY_URI_LENGTH, MAX_SOQL_LENGTH
+
+logger = logging.getLogger(__name__)
+
+
+class RestBackend:
+    """Runs the query through the REST API, following nextRecordsUrl page by page."""
+
+    name = 'rest'
+    # Queries travel as URL parameters.
+    max_query_length = MAX_QUERY_URI_LENGTH
+
+    def iter_records(self, sf, soql, include_deleted=False):
+        yield from sf.query_all_iter(soql, include_deleted=include_deleted)
+
+
+class BulkBackend:
+    """Runs the query as a Bulk API 2.0 query job and streams the CSV results.
+
+    While one result chunk is being parsed the next ones are already downloading in a
+    background thread (up to ``prefetch`` chunks ahead). Bulk API 2.0 hands out result
+    locators one at a time, so chunks are fetched in sequence but overlap with parsing.
+    Empty CSV cells are returned as None; every other value comes back as a string.
+    """
+
+    name = 'bulk'
+    # Queries travel in the JSON body of the job request.
+    max_query_length = MAX_SOQL_LENGTH
+
+    def __init__(self, poll_interval=2.0, max_records=50000, prefetch=2, timeout=3600):
+        self.poll_interval = poll_interval
+        self.max_records = max_records
+        self.prefetch = prefetch
+        self.timeout = timeout
+
+    def _url(self, sf, path):
+        return f"{sf.base_url}jobs/query{path}"
+
+    def create_job(self, sf, soql, include_deleted=False):
+        payload = {'operation': 'queryAll' if include_deleted else 'query', 'query': soql}
+        response = sf.session.post(self._url(sf, ''), headers=sf.headers, json=payload)
+        response.raise_for_status()
+        job_id = response.json()['id']
+        logger.info("Bulk API 2.0 query job %s created.", job_id)
+        return job_id
+
+    def wait_for_job(self, sf, job_id):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            response = sf.session.get(self._url(sf, f"/{job_id}"), headers=sf.headers)
+            response.raise_for_status()
+            job = response.json()
+            if job['state'] == 'JobComplete':
+                return job
+            if job['state'] in ('Failed', 'Aborted'):
+                raise RuntimeError(f"Bulk query job {job_id} ended as {job['state']}: {job.get('errorMessage')}")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Bulk query job {job_id} did not finish within {self.timeout}s")
+            time.sleep(self.poll_interval)
+
+    @staticmethod
+    def _put(chunks, item, stop):
+        """Puts ``item`` on the queue, giving up once the reader has stopped. Returns whether it was queued."""
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _download(self, sf, job_id, chunks, stop):
+        """Fetches every result chunk in locator order and puts its CSV text on ``chunks``, until ``stop`` is set."""
+        try:
+            locator = None
+            while not stop.is_set():
+                params = {'maxRecords': self.max_records}
+                if locator:
+                    params['locator'] = locator
+                response = sf.session.get(
+                    self._url(sf, f"/{job_id}/results"),
+                    headers={**sf.headers, 'Accept': 'text/csv'},
+                    params=params,
+                )
+                response.raise_for_status()
+                if not self._put(chunks, response.content.decode('utf-8'), stop):
+                    break
+                locator = response.headers.get('Sforce-Locator')
+                if not locator or locator == 'null':
+                    break
+        except Exception as e:
+            self._put(chunks, e, stop)
+        finally:
+            self._put(chunks, None, stop)
+
+    def iter_records(self, sf, soql, include_deleted=False):
+        job_id = self.create_job(sf, soql, include_deleted=include_deleted)
+        job = self.wait_for_job(sf, job_id)
+        logger.info("Bulk query job %s complete (%s records).", job_id, job.get('numberRecordsProcessed'))
+
+        chunks = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        downloader = threading.Thread(target=self._download, args=(sf, job_id, chunks, stop), daemon=True)
+        downloader.start()
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                for row in csv.DictReader(io.StringIO(chunk, newline='')):
+                    yield {field: (value if value != '' else None) for field, value in row.items()}
+        finally:
+            # Also runs when the reader stops early (the generator is closed): end the download thread
+            stop.set()
+            downloader.join()
+
+
+BACKENDS = {backend.name: backend for backend in (RestBackend, BulkBackend)}
+
+
+def get_backend(name=EXTRACTION_BACKEND):
+    """Returns an extraction backend instance by name ('rest' or 'bulk')."""
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown extraction backend '{name}'. Choose one of: {', '.join(BACKENDS)}")
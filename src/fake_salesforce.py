@@ -0,0 +1,352 @@
+"""In-memory stand-in for ``simple_salesforce.Salesforce`` to exercise query code without an org."""
+import csv
+import io
+import itertools
+import json
+import re
+import threading
+import time
+from collections import deque
+
+QUERY_PATTERN = re.compile(
+    r"^\s*SELECT\s+(?P<fields>.+?)\s+FROM\s+(?P<sobject>\w+)"
+    r"(?:\s+WHERE\s+(?P<where>.+?))?"
+    r"(?:\s+GROUP\s+BY\s+(?P<group>\w+))?\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+CONDITION_PATTERN = re.compile(r"^\s*(\w+)\s*(=|IN)\s*(.+?)\s*$", re.IGNORECASE | re.DOTALL)
+AGGREGATE_PATTERN = re.compile(r"^COUNT\((\w+)\)\s+(\w+)$", re.IGNORECASE)
+
+
+def parse_literal(text):
+    """Parses a single SOQL literal into a Python value."""
+    text = text.strip()
+    if text.startswith("'") and text.endswith("'"):
+        return text[1:-1]
+    if text.lower() in ('true', 'false'):
+        return text.lower() == 'true'
+    if text.lower() == 'null':
+        return None
+    return text
+
+
+def comparable(value):
+    """Salesforce accepts 15- and 18-character IDs interchangeably in filters."""
+    if isinstance(value, str) and len(value) == 18 and value.isalnum():
+        return value[:15]
+    return value
+
+
+def parse_condition(condition):
+    """Returns a predicate for one ``Field = value`` or ``Field IN (...)`` condition."""
+    match = CONDITION_PATTERN.match(condition)
+    if not match:
+        raise ValueError(f"Unsupported condition in fake query: {condition}")
+    field, operator, value = match.groups()
+    if operator.upper() == 'IN':
+        values = {comparable(parse_literal(v)) for v in value.strip('()').split(',')}
+        return lambda record: comparable(record.get(field)) in values
+    expected = comparable(parse_literal(value))
+    return lambda record: comparable(record.get(field)) == expected
+
+
+class FakeRequestLimitError(Exception):
+    """Raised when the simulated org's request rate limit is exceeded."""
+
+
+class FakeSalesforce:
+    """Answers a small SOQL subset from in-memory records and keeps a log of every query sent.
+
+    ``records`` maps an sObject name to a list of record dicts. Results larger than
+    ``page_size`` are paged through ``nextRecordsUrl``/``query_more`` like the REST API.
+    ``describes`` maps an sObject name to the result of ``sf.<sObject>.describe()``; objects
+    without one get a describe with a plain updateable string field per record key.
+    ``restful`` applies composite sObject collection updates and deletes to the records;
+    IDs in ``rest_errors`` fail with the given status code instead.
+
+    For benchmarks, every API call can wait ``latency`` seconds, calls beyond
+    ``requests_per_second`` fail with REQUEST_LIMIT_EXCEEDED, and ``indexed=True`` answers
+    ``Field = x`` / ``Field IN (...)`` filters from a per-field index (records must then only
+    change through ``restful``).
+    """
+
+    sf_instance = 'fake.my.salesforce.com'
+    sf_version = '59.0'
+    session_id = '00D000000000001!fake'
+
+    def __init__(self, records=None, page_size=2000, describes=None, latency=0.0, requests_per_second=None,
+                 indexed=False):
+        self.records = {sobject: list(rows) for sobject, rows in (records or {}).items()}
+        self.describes = dict(describes or {})
+        self.describe_calls = []
+        self.page_size = page_size
+        self.queries = []
+        self.cursors = {}
+        self.locators = itertools.count()
+        # Attributes the Bulk API 2.0 backend reads to make its HTTP calls.
+        self.base_url = 'https://fake.my.salesforce.com/services/data/v59.0/'
+        self.headers = {'Authorization': 'Bearer fake', 'Content-Type': 'application/json'}
+        self.session = FakeBulkSession(self)
+        self.rest_calls = []
+        self.rest_errors = {}
+        self.lock = threading.Lock()
+        self.api_calls = 0
+        self.latency = latency
+        self.requests_per_second = requests_per_second
+        self.recent_calls = deque()
+        self.indexed = indexed
+        self.indexes = {}
+
+    def _api_call(self):
+        """Counts one API call and applies the simulated latency and rate limit to it."""
+        with self.lock:
+            self.api_calls += 1
+        if self.requests_per_second:
+            with self.lock:
+                now = time.monotonic()
+                while self.recent_calls and now - self.recent_calls[0] >= 1.0:
+                    self.recent_calls.popleft()
+                if len(self.recent_calls) >= self.requests_per_second:
+                    raise FakeRequestLimitError("REQUEST_LIMIT_EXCEEDED: TotalRequests Limit exceeded.")
+                self.recent_calls.append(now)
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _index(self, sobject, field):
+        """``{comparable value: [rows]}`` for one field, built on first use."""
+        key = (sobject, field)
+        if key not in self.indexes:
+            index = {}
+            for row in self.records.get(sobject, []):
+                index.setdefault(comparable(row.get(field)), []).append(row)
+            self.indexes[key] = index
+        return self.indexes[key]
+
+    def __getattr__(self, sobject):
+        if sobject.startswith('_') or not sobject[:1].isupper():
+            raise AttributeError(sobject)
+        return FakeSObject(self, sobject)
+
+    def _select(self, soql):
+        match = QUERY_PATTERN.match(soql)
+        if not match:
+            raise ValueError(f"Unsupported query in fake Salesforce: {soql}")
+        conditions = re.split(r"\s+AND\s+", match['where'], flags=re.I) if match['where'] else []
+        predicates = [parse_condition(c) for c in conditions]
+        rows = self.records.get(match['sobject'], [])
+        if self.indexed and conditions:
+            field, operator, value = CONDITION_PATTERN.match(conditions[0]).groups()
+            values = value.strip('()').split(',') if operator.upper() == 'IN' else [value]
+            index = self._index(match['sobject'], field)
+            rows = [row for v in dict.fromkeys(comparable(parse_literal(v)) for v in values) for row in index.get(v, [])]
+        rows = [r for r in rows if all(p(r) for p in predicates)]
+        return match, rows
+
+    def query(self, soql, include_deleted=False):
+        self._api_call()
+        self.queries.append(soql)
+        match, rows = self._select(soql)
+        fields = [f.strip() for f in match['fields'].split(',')]
+
+        if fields == ['count()']:
+            return {'totalSize': len(rows), 'done': True, 'records': []}
+
+        if match['group']:
+            group = match['group']
+            aggregates = [AGGREGATE_PATTERN.match(f) for f in fields if f != group]
+            groups = {}
+            for row in rows:
+                groups.setdefault(row.get(group), []).append(row)
+            records = []
+            for value, members in groups.items():
+                record = {'attributes': {'type': 'AggregateResult'}, group: value}
+                for aggregate in aggregates:
+                    record[aggregate[2]] = sum(1 for m in members if m.get(aggregate[1]) is not None)
+                records.append(record)
+            return {'totalSize': len(records), 'done': True, 'records': records}
+
+        records = [
+            {'attributes': {'type': match['sobject']}, **{f: row.get(f) for f in fields}}
+            for row in rows
+        ]
+        locator = f"01g{next(self.locators):015d}"
+        self.cursors[locator] = records
+        return self._page(locator, 0)
+
+    def _page(self, locator, offset):
+        records = self.cursors[locator]
+        end = offset + self.page_size
+        page = {'totalSize': len(records), 'done': end >= len(records), 'records': records[offset:end]}
+        if not page['done']:
+            page['nextRecordsUrl'] = f"/services/data/v59.0/query/{locator}-{end}"
+        else:
+            del self.cursors[locator]
+        return page
+
+    def query_more(self, next_records_identifier, identifier_is_url=False, include_deleted=False):
+        self._api_call()
+        locator, offset = next_records_identifier.rsplit('/', 1)[-1].split('-')
+        return self._page(locator, int(offset))
+
+    def query_all_iter(self, soql, include_deleted=False):
+        result = self.query(soql, include_deleted=include_deleted)
+        while True:
+            yield from result['records']
+            if result['done']:
+                return
+            result = self.query_more(result['nextRecordsUrl'], identifier_is_url=True)
+
+    def query_all(self, soql, include_deleted=False):
+        records = list(self.query_all_iter(soql, include_deleted=include_deleted))
+        return {'totalSize': len(records), 'done': True, 'records': records}
+
+    def restful(self, path, params=None, method='GET', **kwargs):
+        """Handles ``composite/sobjects`` PATCH (update) and DELETE calls like the REST API."""
+        self._api_call()
+        self.rest_calls.append((method, path, params))
+        if path.strip('/') != 'composite/sobjects' or method not in ('PATCH', 'DELETE'):
+            raise ValueError(f"Unsupported REST call in fake Salesforce: {method} {path}")
+        with self.lock:
+            self.indexes.clear()
+            if method == 'PATCH':
+                body = kwargs['json'] if 'json' in kwargs else json.loads(kwargs['data'])
+                return [self._update(record) for record in body['records']]
+            return [self._delete(record_id) for record_id in params['ids'].split(',')]
+
+    def _locate(self, record_id):
+        for sobject, rows in self.records.items():
+            for position, row in enumerate(rows):
+                if comparable(row.get('Id')) == comparable(record_id):
+                    return sobject, position
+        return None, None
+
+    def _result(self, record_id, found):
+        if record_id in self.rest_errors:
+            error = {'statusCode': self.rest_errors[record_id], 'message': 'Simulated failure', 'fields': []}
+            return {'id': record_id, 'success': False, 'errors': [error]}
+        if not found:
+            error = {'statusCode': 'ENTITY_IS_DELETED', 'message': 'entity is deleted', 'fields': []}
+            return {'id': record_id, 'success': False, 'errors': [error]}
+        return {'id': record_id, 'success': True, 'errors': []}
+
+    def _update(self, record):
+        record_id = record.get('id') or record.get('Id')
+        sobject, position = self._locate(record_id)
+        result = self._result(record_id, sobject is not None)
+        if result['success']:
+            changes = {k: v for k, v in record.items() if k not in ('attributes', 'id', 'Id')}
+            self.records[sobject][position].update(changes)
+        return result
+
+    def _delete(self, record_id):
+        sobject, position = self._locate(record_id)
+        result = self._result(record_id, sobject is not None)
+        if result['success']:
+            del self.records[sobject][position]
+        return result
+
+
+class FakeSObject:
+    """The ``sf.<sObject>`` handle; only ``describe()`` is supported."""
+
+    def __init__(self, sf, name):
+        self.sf = sf
+        self.name = name
+
+    def describe(self):
+        self.sf.describe_calls.append(self.name)
+        if self.name in self.sf.describes:
+            return self.sf.describes[self.name]
+        names = dict.fromkeys(key for row in self.sf.records.get(self.name, []) for key in row)
+        fields = [
+            {'name': name, 'type': 'id' if name == 'Id' else 'string', 'length': 255,
+             'calculated': False, 'updateable': name != 'Id'}
+            for name in names
+        ]
+        return {'name': self.name, 'fields': fields}
+
+
+class FakeResponse:
+    """Minimal ``requests.Response`` look-alike."""
+
+    def __init__(self, status_code=200, json_data=None, content=b'', headers=None):
+        self.status_code = status_code
+        self._json = json_data
+        self.content = content
+        self.headers = headers or {}
+
+    def json(self):
+        return self._json
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}: {self._json or self.content!r}")
+
+
+class FakeBulkSession:
+    """Serves the Bulk API 2.0 query job endpoints from a FakeSalesforce's records.
+
+    Jobs report ``InProgress`` for ``polls_before_complete`` status checks before completing,
+    and results are split into CSV chunks by ``maxRecords`` with a numeric ``Sforce-Locator``.
+    """
+
+    def __init__(self, sf, polls_before_complete=1):
+        self.sf = sf
+        self.polls_before_complete = polls_before_complete
+        self.jobs = {}
+        self.job_ids = itertools.count()
+        self.requests = []
+
+    def _job_path(self, url):
+        return url.split('jobs/query', 1)[1].strip('/').split('/')
+
+    def post(self, url, headers=None, json=None):
+        self.requests.append(('POST', url, json))
+        job_id = f"750{next(self.job_ids):015d}"
+        match, rows = self.sf._select(json['query'])
+        fields = [f.strip() for f in match['fields'].split(',')]
+        self.jobs[job_id] = {'fields': fields, 'rows': rows, 'polls': 0}
+        return FakeResponse(json_data={'id': job_id, 'operation': json['operation'], 'state': 'UploadComplete'})
+
+    def get(self, url, headers=None, params=None):
+        self.requests.append(('GET', url, params))
+        parts = self._job_path(url)
+        job = self.jobs.get(parts[0])
+        if job is None:
+            return FakeResponse(status_code=404, json_data=[{'errorCode': 'NOT_FOUND'}])
+
+        if len(parts) == 1:
+            job['polls'] += 1
+            state = 'JobComplete' if job['polls'] > self.polls_before_complete else 'InProgress'
+            return FakeResponse(json_data={'id': parts[0], 'state': state, 'numberRecordsProcessed': len(job['rows'])})
+
+        offset = int((params or {}).get('locator') or 0)
+        end = offset + int((params or {}).get('maxRecords') or len(job['rows']) or 1)
+        buffer = io.StringIO(newline='')
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(job['fields'])
+        for row in job['rows'][offset:end]:
+            writer.writerow(['' if row.get(f) is None else row.get(f) for f in job['fields']])
+        locator = str(end) if end < len(job['rows']) else 'null'
+        return FakeResponse(content=buffer.getvalue().encode('utf-8'), headers={'Sforce-Locator': locator})
+
+
+class ReplayQueryClient:
+    """Replays scripted query responses in order, one per call, to simulate changes between runs.
+
+    Each response is a list of pages and each page a list of record dicts; every call is
+    logged as ``(soql, include_deleted)``.
+    """
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def query_all_iter(self, soql, include_deleted=False):
+        self.calls.append((soql, include_deleted))
+        for page in self.responses.pop(0):
+            yield from page
+
+    def query_all(self, soql, include_deleted=False):
+        records = list(self.query_all_iter(soql, include_deleted=include_deleted))
+        return {'totalSize': len(records), 'done': True, 'records': records}
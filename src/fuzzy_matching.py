@@ -0,0 +1,212 @@
+"""Fuzzy duplicate detection on account Name and billing address.
+
+Exact CPF/CNPJ matching misses accounts whose number is blank or mistyped. Here
+names are normalized and cut into character shingles, MinHash signatures are
+banded (LSH) so only accounts that share a bucket are compared, and a
+CEP-prefix + phonetic-name block adds candidates whose names were spelled
+differently. Candidate pairs are scored in bulk with NumPy and linked into
+clusters with union-find.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+from account_snapshot import get_snapshot_frame
+from clustering import DisjointSet
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 32
+BANDS = 8  # 8 bands of 4 rows: pairs with name Jaccard ~0.6+ usually share a bucket
+MAX_BUCKET_SIZE = 50  # very common names would otherwise generate n^2 candidates
+NAME_WEIGHT = 0.7
+ADDRESS_WEIGHT = 0.3
+MATCH_THRESHOLD = 0.75
+
+# Words that do not help tell two companies apart.
+STOP_WORDS = r'\b(?:LTDA|ME|EPP|EIRELI|SA|S A|CIA|E|DA|DE|DO|DAS|DOS)\b'
+
+# Large odd multipliers for the MinHash permutations (multiply-add hashing modulo 2^64).
+PERMUTATION_SEED = 42
+
+
+def normalize_names(names):
+    """Upper-cases, strips accents, punctuation and stop words, and collapses spaces."""
+    return (
+        names.fillna('').astype(str)
+        .str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+        .str.upper()
+        .str.replace(r'[^A-Z0-9 ]', ' ', regex=True)
+        .str.replace(STOP_WORDS, ' ', regex=True)
+        .str.replace(r'\s+', ' ', regex=True)
+        .str.strip()
+    )
+
+
+def phonetic_keys(names):
+    """Coarse Portuguese phonetic key: merges sounds that are often spelled interchangeably."""
+    return (
+        names.str.split(' ').str[0].fillna('')
+        .str.replace('PH', 'F').str.replace('TH', 'T').str.replace(r'(?<=.)H', '', regex=True)
+        .str.replace(r'[KQ]', 'C', regex=True).str.replace('CE', 'SE').str.replace('CI', 'SI')
+        .str.replace('Z', 'S').str.replace('Y', 'I').str.replace('W', 'V')
+        .str.replace(r'(?<=.)[AEIOU]', '', regex=True)
+        .str.replace(r'(.)\1+', r'\1', regex=True)
+    )
+
+
+def postal_digits(postal_codes):
+    return postal_codes.fillna('').astype(str).str.replace(r'\D', '', regex=True)
+
+
+def shingle_hashes(names):
+    """Returns (row, hash) arrays for every character shingle of every non-empty name, sorted by row."""
+    lengths = names.str.len().to_numpy()
+    rows = []
+    shingles = []
+    # Names shorter than a shingle count as a single shingle.
+    short = np.flatnonzero((lengths > 0) & (lengths < SHINGLE_SIZE))
+    rows.append(short)
+    shingles.append(names.to_numpy()[short])
+    for start in range(max(int(lengths.max(initial=0)) - SHINGLE_SIZE + 1, 0)):
+        present = np.flatnonzero(lengths >= start + SHINGLE_SIZE)
+        rows.append(present)
+        shingles.append(names.iloc[present].str.slice(start, start + SHINGLE_SIZE).to_numpy())
+    rows = np.concatenate(rows)
+    hashes = pd.util.hash_array(np.concatenate(shingles).astype(object))
+    order = np.argsort(rows, kind='stable')
+    return rows[order], hashes[order]
+
+
+def minhash_signatures(names):
+    """Computes a MinHash signature per name; rows with an empty name get no signature.
+
+    Returns the row positions that have a signature and the (rows, NUM_PERMUTATIONS) matrix.
+    """
+    rows, hashes = shingle_hashes(names)
+    rng = np.random.default_rng(PERMUTATION_SEED)
+    multipliers = rng.integers(1, 2**63, size=NUM_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+    offsets = rng.integers(0, 2**63, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]]) if len(rows) else np.array([], dtype=int)
+    signatures = np.empty((len(starts), NUM_PERMUTATIONS), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for p in range(NUM_PERMUTATIONS):
+            signatures[:, p] = np.minimum.reduceat(hashes * multipliers[p] + offsets[p], starts) if len(starts) else []
+    return rows[starts], signatures
+
+
+def bucket_pairs(keys, positions):
+    """Turns bucket keys into (left, right) position pairs for every bucket of 2..MAX_BUCKET_SIZE members."""
+    buckets = pd.DataFrame({'key': keys, 'pos': positions})
+    sizes = buckets.groupby('key')['pos'].transform('size')
+    buckets = buckets[(sizes > 1) & (sizes <= MAX_BUCKET_SIZE)]
+    pairs = buckets.merge(buckets, on='key', suffixes=('_l', '_r'))
+    pairs = pairs[pairs['pos_l'] < pairs['pos_r']]
+    return pairs['pos_l'].to_numpy(), pairs['pos_r'].to_numpy()
+
+
+def candidate_pairs(signature_rows, signatures, names, postal):
+    """Blocks accounts into candidate pairs with LSH buckets plus a CEP prefix + phonetic block."""
+    lefts, rights = [], []
+    rows_per_band = NUM_PERMUTATIONS // BANDS
+    for band in range(BANDS):
+        columns = signatures[:, band * rows_per_band:(band + 1) * rows_per_band]
+        keys = pd.util.hash_pandas_object(pd.DataFrame(columns), index=False).to_numpy()
+        left, right = bucket_pairs(keys, signature_rows)
+        lefts.append(left)
+        rights.append(right)
+
+    cep_prefix = postal.str.slice(0, 5)
+    phonetic = phonetic_keys(names)
+    blocked = np.flatnonzero(((cep_prefix.str.len() == 5) & (phonetic != '')).to_numpy())
+    # Same string dtype on both sides: on an empty frame the phonetic keys come back as object
+    block_keys = cep_prefix.astype(str) + '|' + phonetic.astype(str)
+    left, right = bucket_pairs(block_keys.to_numpy()[blocked], blocked)
+    lefts.append(left)
+    rights.append(right)
+
+    pairs = pd.DataFrame({'left': np.concatenate(lefts), 'right': np.concatenate(rights)}).drop_duplicates()
+    return pairs['left'].to_numpy(), pairs['right'].to_numpy()
+
+
+def score_pairs(left, right, signature_rows, signatures, postal, cities):
+    """Scores candidate pairs: estimated name Jaccard plus billing address agreement."""
+    signature_index = np.full(len(postal), -1)
+    signature_index[signature_rows] = np.arange(len(signature_rows))
+    l_sig, r_sig = signature_index[left], signature_index[right]
+    has_names = (l_sig >= 0) & (r_sig >= 0)
+    name_similarity = np.zeros(len(left))
+    name_similarity[has_names] = (signatures[l_sig[has_names]] == signatures[r_sig[has_names]]).mean(axis=1)
+
+    postal = postal.to_numpy()
+    cities = cities.to_numpy()
+    both_postal = (postal[left] != '') & (postal[right] != '')
+    address_similarity = np.select(
+        [both_postal & (postal[left] == postal[right]),
+         both_postal & (pd.Series(postal[left]).str.slice(0, 5).to_numpy() == pd.Series(postal[right]).str.slice(0, 5).to_numpy()),
+         (cities[left] != '') & (cities[left] == cities[right])],
+        [1.0, 0.6, 0.3],
+        default=0.0,
+    )
+    # When one side has no billing address there is nothing to compare it with, so the name alone decides.
+    missing = (postal == '') & (cities == '')
+    no_address = missing[left] | missing[right]
+    return np.where(no_address, name_similarity, NAME_WEIGHT * name_similarity + ADDRESS_WEIGHT * address_similarity)
+
+
+def find_fuzzy_duplicates(accounts_df, threshold=MATCH_THRESHOLD):
+    """Finds clusters of accounts with matching Name and billing address.
+
+    Returns the scored pairs (``Id_left``, ``Id_right``, ``score``) above ``threshold``
+    and the accounts that belong to a cluster, with ``fuzzy_cluster_id`` (the smallest Id
+    in the cluster), ``cluster_size`` and ``best_score`` (highest pair score of the account).
+    """
+    accounts_df = accounts_df.reset_index(drop=True)
+    names = normalize_names(accounts_df['Name'])
+    postal = postal_digits(accounts_df.get('BillingPostalCode', pd.Series('', index=accounts_df.index)))
+    cities = normalize_names(accounts_df.get('BillingCity', pd.Series('', index=accounts_df.index)))
+
+    signature_rows, signatures = minhash_signatures(names)
+    left, right = candidate_pairs(signature_rows, signatures, names, postal)
+    scores = score_pairs(left, right, signature_rows, signatures, postal, cities)
+    logger.info("Fuzzy matching: %d candidate pairs for %d accounts.", len(left), len(accounts_df))
+
+    matched = scores >= threshold
+    left, right, scores = left[matched], right[matched], scores[matched]
+    ids = accounts_df['Id'].to_numpy()
+    pairs = pd.DataFrame({'Id_left': ids[left], 'Id_right': ids[right], 'score': scores.round(3)})
+
+    components = DisjointSet(len(accounts_df))
+    components.union_all(left, right)
+    smallest_id = pd.Series(ids).groupby(components.roots()).transform('min').to_numpy()
+    best = np.zeros(len(accounts_df))
+    np.maximum.at(best, left, scores)
+    np.maximum.at(best, right, scores)
+    in_cluster = best > 0
+
+    clusters = accounts_df.loc[in_cluster, ['Id', 'Name']].copy()
+    clusters['fuzzy_cluster_id'] = smallest_id[in_cluster]
+    clusters['cluster_size'] = clusters.groupby('fuzzy_cluster_id')['Id'].transform('size')
+    clusters['best_score'] = best[in_cluster].round(3)
+    return pairs, clusters.sort_values(['fuzzy_cluster_id', 'Id']).reset_index(drop=True)
+
+
+def export_fuzzy_duplicates(sf, output_path='data/fuzzy_duplicated_accounts.xlsx', threshold=MATCH_THRESHOLD):
+    """Runs fuzzy matching over the Account snapshot and saves the clusters and scored pairs to Excel."""
+    pairs, clusters = find_fuzzy_duplicates(get_snapshot_frame(sf), threshold=threshold)
+    with pd.ExcelWriter(output_path) as writer:
+        clusters.to_excel(writer, sheet_name='Clusters', index=False)
+        pairs.to_excel(writer, sheet_name='Pairs', index=False)
+    logger.info("%d fuzzy duplicate clusters saved to %s", clusters['fuzzy_cluster_id'].nunique(), output_path)
+    return output_path
+
+
+if __name__ == "__main__":
+    from logging_setup import configure_logging
+    from main import connect_to_salesforce
+
+    configure_logging()
+    export_fuzzy_duplicates(connect_to_salesforce())
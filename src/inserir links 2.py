@@ -1,21 +1,21 @@
-import openpyxl
+from config import INSTANCE_URL
+from report_writer import copy_with_links, record_link
 
 # Input and output files
 input_file = 'data/conta_duplicadas_no_info_arquivo_com_links.xlsx'
 output_file = 'data/conta_duplicadas_no_info_arquivo_com_links_clickable.xlsx'
 
-# Load the workbook and worksheet
-workbook = openpyxl.load_workbook(input_file)
-sheet = workbook['Contas']
 
-# Iterate over the cells in column AI (column 35) and convert them into clickable links
-for row in range(2, sheet.max_row + 1):  # Starts from row 2 to the last row
-    cell = sheet[f'AI{row}']
-    if cell.value:  # Only if there is a value
-        # Apply the clickable hyperlink formula
-        cell.value = f'=HYPERLINK("{cell.value}", "{cell.value}")'
+def instance_url():
+    """Org URL from SALESFORCE_INSTANCE_URL, or from a Salesforce login when it is not set."""
+    if INSTANCE_URL:
+        return INSTANCE_URL
+    from main import connect_to_salesforce
+    return f"https://{connect_to_salesforce().sf_instance}"
 
-# Save the output file
-workbook.save(output_file)
 
-print(f'Clickable links in column AI have been saved to: {output_file}')
+# Stream the 'Contas' sheet into a new file with a HYPERLINK formula per account, built from the
+# 'Id' column while writing (no second load/save pass, no hard-coded column or row count)
+rows = copy_with_links(input_file, output_file, [record_link(instance_url())], sheet_name='Contas')
+
+print(f'Clickable links for {rows} accounts have been saved to: {output_file}')
@@ -0,0 +1,283 @@
+"""Run metrics: stage timings, Salesforce API call accounting and optional profiling."""
+import cProfile
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'")
+DATETIME_LITERAL = re.compile(r"\b\d{4}-\d{2}-\d{2}(?:T[\d:.]+(?:Z|[+-]\d{2}:?\d{2})?)?\b")
+VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+RECORD_ID = re.compile(r"/[a-zA-Z0-9]{15}(?:[a-zA-Z0-9]{3})?(?=/|$)")
+LIMIT_INFO = re.compile(r"api-usage=(\d+)/(\d+)")
+
+
+def soql_template(soql):
+    """Strips the literal values from a query so calls can be grouped by shape (``IN ('a','b')`` -> ``IN (?)``)."""
+    template = STRING_LITERAL.sub('?', soql)
+    template = DATETIME_LITERAL.sub('?', template)
+    template = VALUE_LIST.sub('(?)', template)
+    return ' '.join(template.split())
+
+
+def url_template(url):
+    """API path of a REST call with record/job IDs replaced, e.g. ``jobs/query/{id}/results``."""
+    path = url.split('?', 1)[0].split('/services/data/', 1)[-1]
+    path = path.split('/', 1)[1] if path.startswith('v') and '/' in path else path
+    return RECORD_ID.sub('/{id}', '/' + path.strip('/'))[1:]
+
+
+def peak_rss_mb():
+    """Peak resident memory of the process in MB, where the platform reports it."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class Metrics:
+    """Collects API calls per query template and per-stage timings for one run.
+
+    With ``trace_memory=True`` each stage also records its peak Python allocation through
+    ``tracemalloc`` (accurate, but it slows allocation-heavy code down).
+    """
+
+    def __init__(self, trace_memory=False):
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.api = {}
+        self.stages = []
+        self.api_usage = None
+        self.trace_memory = trace_memory
+        if trace_memory:
+            tracemalloc.start()
+
+    def record_call(self, template, records=0, size=0, seconds=0.0):
+        """Counts one API call under ``template``."""
+        with self.lock:
+            entry = self.api.setdefault(template, {'calls': 0, 'records': 0, 'bytes': 0, 'seconds': 0.0})
+            entry['calls'] += 1
+            entry['records'] += records
+            entry['bytes'] += size
+            entry['seconds'] += seconds
+
+    def record_limit_info(self, header):
+        """Keeps the org's daily API usage from a ``Sforce-Limit-Info`` response header."""
+        match = LIMIT_INFO.search(header or '')
+        if match:
+            used, limit = map(int, match.groups())
+            with self.lock:
+                if self.api_usage is None:
+                    self.api_usage = {'first_seen': used, 'last_seen': used, 'limit': limit}
+                self.api_usage['last_seen'] = used
+
+    def totals(self):
+        with self.lock:
+            return (sum(e['calls'] for e in self.api.values()), sum(e['bytes'] for e in self.api.values()))
+
+    @contextmanager
+    def stage(self, name):
+        """Times a pipeline stage. Set ``rows`` on the yielded dict to get a rows/s figure."""
+        record = {'stage': name, 'rows': None}
+        calls_before, bytes_before = self.totals()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - started
+            calls_after, bytes_after = self.totals()
+            record.update(
+                seconds=round(seconds, 3),
+                rows_per_second=round(record['rows'] / seconds, 1) if record['rows'] and seconds else None,
+                api_calls=calls_after - calls_before,
+                bytes_downloaded=bytes_after - bytes_before,
+                peak_rss_mb=peak_rss_mb(),
+            )
+            if self.trace_memory:
+                record['peak_traced_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+            self.stages.append(record)
+            logger.info("Stage %s finished in %.2fs (%d API calls)", name, seconds, record['api_calls'])
+
+    def report(self):
+        calls, size = self.totals()
+        return {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'seconds': round(time.time() - self.started, 3),
+            'api_calls': calls,
+            'bytes_downloaded': size,
+            'api_usage': self.api_usage,
+            'stages': self.stages,
+            'api_by_template': dict(sorted(self.api.items(), key=lambda item: -item[1]['calls'])),
+        }
+
+    def write_report(self, path):
+        """Writes the metrics as JSON and returns the path."""
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.report(), file, indent=2, default=str)
+        logger.info("Run metrics saved to %s", path)
+        return path
+
+
+def response_size(result):
+    """Approximate payload size of a parsed REST response (its JSON length)."""
+    return len(json.dumps(result, default=str))
+
+
+class InstrumentedSession:
+    """Wraps the HTTP session used for Bulk API calls, counting calls and downloaded bytes per endpoint."""
+
+    def __init__(self, session, metrics):
+        self._session = session
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    def _call(self, method, url, *args, **kwargs):
+        started = time.perf_counter()
+        response = getattr(self._session, method)(url, *args, **kwargs)
+        self._metrics.record_call(
+            f"{method.upper()} {url_template(url)}", size=len(response.content or b''),
+            seconds=time.perf_counter() - started,
+        )
+        headers = getattr(response, 'headers', None) or {}
+        self._metrics.record_limit_info(headers.get('Sforce-Limit-Info'))
+        return response
+
+    def get(self, url, *args, **kwargs):
+        return self._call('get', url, *args, **kwargs)
+
+    def post(self, url, *args, **kwargs):
+        return self._call('post', url, *args, **kwargs)
+
+    def patch(self, url, *args, **kwargs):
+        return self._call('patch', url, *args, **kwargs)
+
+    def delete(self, url, *args, **kwargs):
+        return self._call('delete', url, *args, **kwargs)
+
+
+class InstrumentedSalesforce:
+    """Proxy for a ``simple_salesforce.Salesforce`` client that accounts for every API call.
+
+    ``query``/``query_more`` pages, ``restful`` calls and Bulk API requests are counted per SOQL
+    template or endpoint, with records, payload bytes and time. ``query_all`` and ``query_all_iter``
+    are rebuilt on the counted calls so every page is seen. Everything else is passed through.
+    """
+
+    def __init__(self, sf, metrics):
+        self._sf = sf
+        self._metrics = metrics
+        self._templates = threading.local()
+        self.session = InstrumentedSession(sf.session, metrics)
+
+    def __getattr__(self, name):
+        return getattr(self._sf, name)
+
+    def _record(self, template, result, started):
+        records = len(result.get('records', ())) if isinstance(result, dict) else 0
+        self._metrics.record_call(template, records, response_size(result), time.perf_counter() - started)
+        usage = getattr(self._sf, 'api_usage', None)
+        if usage and 'api-usage' in usage:
+            used, limit = usage['api-usage']
+            self._metrics.record_limit_info(f"api-usage={used}/{limit}")
+
+    def query(self, soql, include_deleted=False, **kwargs):
+        self._templates.current = soql_template(soql)
+        started = time.perf_counter()
+        result = self._sf.query(soql, include_deleted=include_deleted, **kwargs)
+        self._record(self._templates.current, result, started)
+        return result
+
+    def query_more(self, next_records_identifier, identifier_is_url=False, include_deleted=False, **kwargs):
+        started = time.perf_counter()
+        result = self._sf.query_more(
+            next_records_identifier, identifier_is_url=identifier_is_url, include_deleted=include_deleted, **kwargs
+        )
+        # Pages are counted under the query that opened the cursor (on this thread)
+        self._record(getattr(self._templates, 'current', 'query_more'), result, started)
+        return result
+
+    def query_all_iter(self, soql, include_deleted=False, **kwargs):
+        result = self.query(soql, include_deleted=include_deleted, **kwargs)
+        while True:
+            yield from result['records']
+            if result['done']:
+                return
+            self._templates.current = soql_template(soql)
+            result = self.query_more(result['nextRecordsUrl'], identifier_is_url=True,
+                                     include_deleted=include_deleted, **kwargs)
+
+    def query_all(self, soql, include_deleted=False, **kwargs):
+        records = list(self.query_all_iter(soql, include_deleted=include_deleted, **kwargs))
+        return {'totalSize': len(records), 'done': True, 'records': records}
+
+    def restful(self, path, params=None, method='GET', **kwargs):
+        started = time.perf_counter()
+        result = self._sf.restful(path, params=params, method=method, **kwargs)
+        self._metrics.record_call(f"{method} {url_template(path)}", 0, response_size(result),
+                                  time.perf_counter() - started)
+        return result
+
+
+def instrument(sf, metrics):
+    """Wraps a Salesforce client so its API calls are counted in ``metrics``."""
+    return InstrumentedSalesforce(sf, metrics)
+
+
+@contextmanager
+def profiling(path=None):
+    """Profiles the enclosed block when ``path`` is given.
+
+    ``.html`` paths use pyinstrument (if installed); anything else gets a cProfile dump readable
+    with ``python -m pstats`` or snakeviz.
+    """
+    if not path:
+        yield
+        return
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    if path.lower().endswith('.html'):
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise RuntimeError("pyinstrument is not installed; use a .prof path for cProfile") from None
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(profiler.output_html())
+            logger.info("Profile saved to %s", path)
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        logger.info("Profile saved to %s", path)
@@ -1,29 +1,22 @@
-import pandas as pd
 import logging
+from account_snapshot import iter_snapshot_rows
+from artifacts import save_rows_artifact
 
-def list_salesforce_accounts(sf):
-    """Lists all accounts from Salesforce and saves them in an Excel file with ID, Name, and NEO_Cpfcnpj__c."""
-    logging.debug("Fetching all accounts from Salesforce.")
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = ["Id", "Name", "NEO_Cpfcnpj__c"]
+
+def list_salesforce_accounts(sf, output_path='data/salesforce_accounts.xlsx'):
+    """Lists all accounts from Salesforce and saves them in an Excel (or .csv) file with ID, Name, and NEO_Cpfcnpj__c."""
+    logger.debug("Fetching all accounts from Salesforce.")
     try:
-        # Querying all accounts from Salesforce with the NEO_Cpfcnpj__c field
-        query = "SELECT Id, Name, NEO_Cpfcnpj__c FROM Account"
-        result = sf.query_all(query)
-        
-        # Extracting data into a list
-        accounts_data = [
-            {
-                "Id": account["Id"],
-                "Name": account["Name"],
-                "NEO_Cpfcnpj__c": account.get("NEO_Cpfcnpj__c", None)  # Using get to avoid error if the field is empty
-            }
-            for account in result["records"]
-        ]
-        
-        # Saving data to a DataFrame and exporting to Excel
-        df = pd.DataFrame(accounts_data)
-        df.to_excel('data/salesforce_accounts.xlsx', index=False)
+        # Streaming the accounts from the shared local snapshot (synced from Salesforce page by page)
+        # straight into a Parquet artifact (and the Excel export, when enabled), so memory stays flat
+        # regardless of the number of accounts
+        count = save_rows_artifact(output_path, EXPORT_COLUMNS, iter_snapshot_rows(sf, EXPORT_COLUMNS), sheet_name='Sheet1')
         
-        logging.info("Salesforce accounts saved to 'data/salesforce_accounts.xlsx' with NEO_Cpfcnpj__c.")
+        logger.info("Salesforce accounts saved to '%s' with NEO_Cpfcnpj__c.", output_path)
+        return count
     except Exception as e:
-        logging.error(f"Failed to list Salesforce accounts: {e}")
+        logger.error("Failed to list Salesforce accounts: %s", e)
         raise
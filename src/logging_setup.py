@@ -0,0 +1,102 @@
+"""Run-level logging setup: one verbosity switch for every script, optional JSON lines, and sampling for per-row events.
+
+Modules only create ``logger = logging.getLogger(__name__)`` and log with %-style arguments, which
+are formatted only when a handler is going to emit the line. Scripts call :func:`configure_logging`
+once in their ``__main__`` block; nothing is configured at import time.
+"""
+import json
+import logging
+import sys
+import threading
+
+from config import LOG_FORMAT, LOG_VERBOSITY
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+# Libraries that log every HTTP request at DEBUG; they only follow -v from -vv on
+LIBRARY_LOGGERS = ['urllib3', 'requests', 'simple_salesforce']
+
+# Attributes every LogRecord has; anything else on a record came from ``extra=`` and is logged as a field
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and the fields passed with ``extra=``."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record), 'level': record.levelname, 'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def verbosity_level(verbosity):
+    """Log level for a verbosity: below 0 warnings only, 0 info, 1 and up debug."""
+    if verbosity < 0:
+        return logging.WARNING
+    return logging.INFO if verbosity == 0 else logging.DEBUG
+
+
+def configure_logging(verbosity=LOG_VERBOSITY, log_format=LOG_FORMAT, stream=None):
+    """Sets up the root logger for a run, replacing any handler installed before. Returns the level."""
+    level = verbosity_level(verbosity)
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+    for name in LIBRARY_LOGGERS:
+        logging.getLogger(name).setLevel(logging.DEBUG if verbosity > 1 else max(level, logging.WARNING))
+    return level
+
+
+def add_logging_arguments(parser):
+    """Adds -v/-q and --log-format to a script's argument parser."""
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help="More output: -v for debug messages, -vv also for HTTP requests")
+    parser.add_argument('-q', '--quiet', action='count', default=0, help="Only warnings and errors")
+    parser.add_argument('--log-format', choices=['text', 'json'], default=LOG_FORMAT, help="Log line format")
+    return parser
+
+
+def configure_from_args(args):
+    """:func:`configure_logging` with the options added by :func:`add_logging_arguments`."""
+    return configure_logging(LOG_VERBOSITY + args.verbose - args.quiet, args.log_format)
+
+
+class SampledLog:
+    """Logs per-row events without flooding the log: the first ``head`` events, then one in every ``every``.
+
+    When the level is disabled a call costs one ``isEnabledFor`` check: nothing is formatted or counted.
+    Sampled lines carry ``event`` (the running count) as a structured field, and :meth:`summary`
+    logs how many events there were in total. Safe to share between threads.
+    """
+
+    def __init__(self, logger, level=logging.DEBUG, head=10, every=10000):
+        self.logger = logger
+        self.level = level
+        self.head = head
+        self.every = every
+        self.seen = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, msg, *args):
+        if not self.logger.isEnabledFor(self.level):
+            return
+        with self.lock:
+            self.seen += 1
+            seen = self.seen
+        if seen <= self.head or seen % self.every == 0:
+            self.logger.log(self.level, msg, *args, extra={'event': seen})
+
+    def summary(self, what='events'):
+        """Logs the total when some events were left out, and starts counting again."""
+        with self.lock:
+            seen, self.seen = self.seen, 0
+        if seen > self.head:
+            self.logger.log(self.level, "%d %s in total (first %d and one in every %d logged)", seen, what,
+                            self.head, self.every)
@@ -1,12 +1,16 @@
+import argparse
 import os  
 import logging
+import time
 from simple_salesforce import Salesforce
 from dotenv import load_dotenv
 from list_accounts import list_salesforce_accounts
-from process_accounts import load_no_info_accounts, process_all_accounts
+from process_accounts import load_no_info_accounts, load_other_accounts, process_all_accounts
+from config import METRICS_DIR
+from instrumentation import Metrics, instrument, profiling
+from logging_setup import add_logging_arguments, configure_from_args
 
-# Logging configuration
-logging.basicConfig(level=logging.DEBUG)
+# Logging is configured by the script that runs (configure_from_args), not at import
 logger = logging.getLogger(__name__)
 
 def load_credentials():
@@ -16,49 +20,73 @@ def load_credentials():
     password = os.getenv('SALESFORCE_PASSWORD')
     security_token = os.getenv('SALESFORCE_SECURITY_TOKEN')
     domain = os.getenv('SALESFORCE_DOMAIN', 'login')  # 'login' or 'test'
-    
-    logger.debug(f"Loaded credentials: Username: {username}, Domain: {domain}")
     return username, password, security_token, domain
 
 def connect_to_salesforce():
     """Connect to Salesforce and return the session.""" 
     username, password, security_token, domain = load_credentials()
     try:
-        logger.debug("Attempting to connect to Salesforce...")
-        logger.debug(f"Connecting with Username: {username}, Domain: {domain}")
-        
+        logger.debug("Connecting to Salesforce (domain %s)...", domain)
         sf = Salesforce(username=username, password=password, security_token=security_token, domain=domain)
         logger.info("Connection to Salesforce established successfully!")
         return sf
     except Exception as e:
-        logger.error(f"Authentication failed: {e}")
+        logger.error("Authentication failed: %s", e)
         raise
 
-def main():
+def parse_args():
+    """Parses the command-line options."""
+    parser = argparse.ArgumentParser(description="List Salesforce accounts and count their related records.")
+    parser.add_argument('--metrics', default=os.path.join(METRICS_DIR, f"run_{time.strftime('%Y%m%d_%H%M%S')}.json"),
+                        help="Where to write the JSON run metrics")
+    parser.add_argument('--profile', help="Profile the run: a .prof path (cProfile) or .html (pyinstrument)")
+    parser.add_argument('--trace-memory', action='store_true', help="Record peak Python memory per stage (slower)")
+    add_logging_arguments(parser)
+    return parser.parse_args()
+
+def main(metrics_path=None, profile_path=None, trace_memory=False):
     """Main function of the script.""" 
+    metrics = Metrics(trace_memory=trace_memory)
     try:
-        # Connect to Salesforce
-        sf = connect_to_salesforce()
-        logger.info("Connection established successfully.")
+        with profiling(profile_path):
+            # Connect to Salesforce; every API call goes through the instrumented client
+            with metrics.stage('connect'):
+                sf = instrument(connect_to_salesforce(), metrics)
+            logger.info("Connection established successfully.")
+
+            # List accounts and save to Excel
+            with metrics.stage('list_salesforce_accounts') as stage:
+                stage['rows'] = list_salesforce_accounts(sf)
 
-        # List accounts and save to Excel
-        list_salesforce_accounts(sf)
+            # Load accounts with 'NO INFO'
+            with metrics.stage('load_no_info_accounts') as stage:
+                no_info_accounts = load_no_info_accounts()
+                stage['rows'] = 0 if no_info_accounts is None else len(no_info_accounts)
+            if no_info_accounts is not None and not no_info_accounts.empty:
+                # Process accounts with 'NO INFO'
+                with metrics.stage('process_accounts_no_info') as stage:
+                    stage['rows'] = len(no_info_accounts)
+                    result_file_no_info = process_all_accounts(sf, only_no_info=True, accounts_df=no_info_accounts)
+                logger.info("Processing 'NO INFO' accounts completed.")
+                logger.info("Related object counts saved to: %s", result_file_no_info)
 
-        # Load accounts with 'NO INFO'
-        no_info_accounts = load_no_info_accounts()
-        if no_info_accounts is not None and not no_info_accounts.empty:
-            # Process accounts with 'NO INFO'
-            result_file_no_info = process_all_accounts(sf, only_no_info=True)  # Fixed here
-            logger.info("Processing 'NO INFO' accounts completed.")
-            logger.info(f"Related object counts saved to: {result_file_no_info}")
-        
-        # Process all other accounts
-        result_file_all_accounts = process_all_accounts(sf, only_no_info=False)  # Fixed here
-        logger.info("Processing other accounts completed.")
-        logger.info(f"Related object counts saved to: {result_file_all_accounts}")
+            # Process all other accounts
+            with metrics.stage('load_other_accounts') as stage:
+                other_accounts = load_other_accounts()
+                stage['rows'] = 0 if other_accounts is None else len(other_accounts)
+            with metrics.stage('process_accounts_other') as stage:
+                stage['rows'] = 0 if other_accounts is None else len(other_accounts)
+                result_file_all_accounts = process_all_accounts(sf, only_no_info=False, accounts_df=other_accounts)
+            logger.info("Processing other accounts completed.")
+            logger.info("Related object counts saved to: %s", result_file_all_accounts)
 
     except Exception as e:
-        logger.error(f"An error occurred during script execution: {e}")
+        logger.error("An error occurred during script execution: %s", e)
+    finally:
+        if metrics_path:
+            metrics.write_report(metrics_path)
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    configure_from_args(args)
+    main(args.metrics, args.profile, args.trace_memory)
@@ -0,0 +1,258 @@
+"""Applies a survivorship mapping in Salesforce: reparents child records to the survivors, then deletes the losers."""
+import argparse
+import json
+import logging
+import os
+import time
+
+import pandas as pd
+
+from artifacts import load_artifact
+from concurrency import TokenBucket, call_with_retry, is_schema_error, iter_in_order
+from config import MAX_WORKERS, MERGE_JOURNAL_DIR, REQUEST_BURST, REQUESTS_PER_SECOND
+from logging_setup import add_logging_arguments, configure_from_args
+from process_accounts import RELATED_OBJECT_QUERIES
+from related_counts import COUNT_QUERY_PATTERN
+from soql_batching import chunk_ids, quote_ids
+from survivorship import MAPPING_FILE
+
+logger = logging.getLogger(__name__)
+
+# Records per composite sObject collection call (the API maximum)
+COLLECTION_SIZE = 200
+COLLECTION_PATH = 'composite/sobjects'
+
+
+def related_lookups(queries=RELATED_OBJECT_QUERIES):
+    """``(sObject, lookup field)`` pairs pointing at Account, from the related-count templates."""
+    lookups = []
+    for count_query in queries.values():
+        match = COUNT_QUERY_PATTERN.search(count_query)
+        if not match:
+            raise ValueError(f"Unsupported count query: {count_query}")
+        if match.groups() not in lookups:
+            lookups.append(match.groups())
+    return lookups
+
+
+def loser_map(mapping):
+    """``{discarded account Id: survivor Id}`` from a survivorship mapping (Id, Survivor_Id, Is_Survivor)."""
+    is_survivor = mapping['Is_Survivor'].astype(str).str.lower().isin(['true', '1'])
+    losers = mapping[~is_survivor & (mapping['Id'] != mapping['Survivor_Id'])]
+    return dict(zip(losers['Id'], losers['Survivor_Id']))
+
+
+def batches(items, size=COLLECTION_SIZE):
+    """Splits a list into consecutive batches of at most ``size`` items."""
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def plan_reparenting(sf, losers, lookups, rate_limiter=None):
+    """Finds the child records of the discarded accounts and the survivor each one moves to.
+
+    Returns a list of ``{'sobject', 'id', 'field', 'old', 'new'}`` changes, grouped by object and
+    ordered by new parent so the children of one survivor share batches (fewer row-lock conflicts),
+    and the set of discarded accounts whose children could not be listed. Those must not be deleted.
+    """
+    by_prefix = {loser[:15]: survivor for loser, survivor in losers.items()}
+    changes = []
+    unresolved = set()
+    for sobject, field in lookups:
+        template = f"SELECT Id, {field} FROM {sobject} WHERE {field} IN ({{ids}})"
+        object_changes = []
+        for chunk in chunk_ids(list(losers), template):
+            try:
+                result = call_with_retry(sf.query_all, template.format(ids=quote_ids(chunk)), rate_limiter=rate_limiter)
+            except Exception as e:
+                if is_schema_error(e):
+                    # Objects missing from the org (e.g. Invoice without the feature) have nothing to move
+                    logger.warning("Skipping %s.%s, not available in this org: %s", sobject, field, e)
+                    break
+                logger.error("Could not list %s children of %d accounts, they will not be deleted: %s",
+                             sobject, len(chunk), e)
+                unresolved.update(chunk)
+                continue
+            for record in result['records']:
+                old = record[field]
+                object_changes.append({
+                    'sobject': sobject, 'id': record['Id'], 'field': field,
+                    'old': old, 'new': by_prefix[old[:15]],
+                })
+        object_changes.sort(key=lambda change: change['new'])
+        changes.extend(object_changes)
+        logger.info("%d %s records to reparent through %s", len(object_changes), sobject, field)
+    return changes, unresolved
+
+
+class Journal:
+    """Append-only JSON Lines log of every change, written before the change is sent."""
+
+    def __init__(self, path):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def write(self, action, **entry):
+        self.file.write(json.dumps({'action': action, **entry}) + '\n')
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+def collection_errors(results):
+    """``{record Id: error text}`` for the failed entries of a collection response."""
+    return {
+        result.get('id') or position: '; '.join(f"{e.get('statusCode')}: {e.get('message')}" for e in result['errors'])
+        for position, result in enumerate(results) if not result['success']
+    }
+
+
+def update_records(sf, batch, rate_limiter=None):
+    """Sends one composite collection update; returns the failed record IDs with their errors."""
+    records = [{'attributes': {'type': c['sobject']}, 'id': c['id'], c['field']: c['new']} for c in batch]
+    body = {'allOrNone': False, 'records': records}
+    results = call_with_retry(sf.restful, COLLECTION_PATH, method='PATCH', json=body, rate_limiter=rate_limiter)
+    errors = collection_errors(results)
+    # Failed entries may come back without an ID; map them back by position
+    return {batch[key]['id'] if isinstance(key, int) else key: error for key, error in errors.items()}
+
+
+def delete_records(sf, ids, rate_limiter=None):
+    """Sends one composite collection delete; returns the failed record IDs with their errors."""
+    params = {'ids': ','.join(ids), 'allOrNone': 'false'}
+    results = call_with_retry(sf.restful, COLLECTION_PATH, params=params, method='DELETE', rate_limiter=rate_limiter)
+    errors = collection_errors(results)
+    return {ids[key] if isinstance(key, int) else key: error for key, error in errors.items()}
+
+
+def execute_merge(sf, mapping, dry_run=True, journal_path=None, max_workers=MAX_WORKERS, delete_losers=True,
+                  lookups=None):
+    """Reparents the children of every discarded account to its survivor, then deletes the discarded accounts.
+
+    Updates go out as composite sObject collections of up to 200 records, one object type at a time,
+    ``max_workers`` calls in parallel under the shared rate limit. A discarded account is only deleted
+    when all of its children were listed and moved. With ``dry_run=True`` nothing is changed and the planned
+    changes are returned. Otherwise every change is journaled before it is sent (see
+    :func:`rollback_merge`). Returns a summary dict.
+    """
+    losers = loser_map(mapping)
+    rate_limiter = TokenBucket(REQUESTS_PER_SECOND, REQUEST_BURST)
+    changes, unresolved = plan_reparenting(sf, losers, lookups or related_lookups(), rate_limiter)
+    summary = {'accounts_to_delete': len(losers) - len(unresolved), 'records_to_reparent': len(changes),
+               'unresolved_accounts': len(unresolved)}
+    if dry_run:
+        logger.info("Dry run: %d child records would move and %d accounts would be deleted (%d kept, children "
+                    "not listed)", len(changes), summary['accounts_to_delete'], len(unresolved))
+        return {**summary, 'dry_run': True, 'changes': changes}
+
+    journal_path = journal_path or os.path.join(MERGE_JOURNAL_DIR, f"merge_{time.strftime('%Y%m%d_%H%M%S')}.jsonl")
+    journal = Journal(journal_path)
+    # Accounts whose children could not all be listed or moved are kept
+    blocked = set(unresolved)
+    try:
+        # Step 1: reparent, one object type at a time
+        reparented = 0
+        for sobject in dict.fromkeys(change['sobject'] for change in changes):
+            object_batches = batches([change for change in changes if change['sobject'] == sobject])
+            for batch in object_batches:
+                for change in batch:
+                    journal.write('reparent', **change)
+            journal.flush()
+
+            results = iter_in_order(lambda batch: (batch, update_records(sf, batch, rate_limiter)), object_batches,
+                                    max_workers=max_workers)
+            for batch, errors in results:
+                reparented += len(batch) - len(errors)
+                for change in batch:
+                    if change['id'] in errors:
+                        logger.error("Could not reparent %s %s: %s", sobject, change['id'], errors[change['id']])
+                        blocked.add(change['old'])
+        summary['reparented'] = reparented
+
+        # Step 2: delete the losers whose children all moved
+        deleted = 0
+        if delete_losers:
+            blocked_prefixes = {account_id[:15] for account_id in blocked}
+            deletable = [loser for loser in losers if loser[:15] not in blocked_prefixes]
+            for loser in deletable:
+                journal.write('delete', id=loser, survivor=losers[loser])
+            journal.flush()
+
+            results = iter_in_order(lambda ids: (ids, delete_records(sf, ids, rate_limiter)), batches(deletable),
+                                    max_workers=max_workers)
+            for ids, errors in results:
+                deleted += len(ids) - len(errors)
+                for account_id, error in errors.items():
+                    logger.error("Could not delete account %s: %s", account_id, error)
+        summary.update(deleted=deleted, skipped_accounts=len(blocked), journal=journal_path)
+    finally:
+        journal.close()
+
+    logger.info("Merge finished: %s", summary)
+    return summary
+
+
+def rollback_merge(sf, journal_path, max_workers=MAX_WORKERS):
+    """Points the child records listed in a merge journal back to their original accounts.
+
+    Deleted accounts cannot be restored through the REST API; their IDs are returned so they can be
+    undeleted from the Recycle Bin (kept for 15 days) before the rollback is run.
+    """
+    entries = []
+    with open(journal_path, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                entries.append(json.loads(line))
+
+    reverts = [
+        {**entry, 'old': entry['new'], 'new': entry['old']} for entry in entries if entry['action'] == 'reparent'
+    ]
+    deleted = [entry['id'] for entry in entries if entry['action'] == 'delete']
+    rate_limiter = TokenBucket(REQUESTS_PER_SECOND, REQUEST_BURST)
+
+    restored = 0
+    for sobject in dict.fromkeys(revert['sobject'] for revert in reverts):
+        object_batches = batches([revert for revert in reverts if revert['sobject'] == sobject])
+        results = iter_in_order(lambda batch: (batch, update_records(sf, batch, rate_limiter)), object_batches,
+                                max_workers=max_workers)
+        for batch, errors in results:
+            restored += len(batch) - len(errors)
+            for record_id, error in errors.items():
+                logger.error("Could not restore %s %s: %s", sobject, record_id, error)
+
+    if deleted:
+        logger.warning("%d deleted accounts must be undeleted from the Recycle Bin", len(deleted))
+    logger.info("Rollback finished: %d of %d child records restored", restored, len(reverts))
+    return {'restored': restored, 'to_restore': len(reverts), 'deleted_accounts': deleted}
+
+
+if __name__ == "__main__":
+    from main import connect_to_salesforce
+
+    parser = argparse.ArgumentParser(description="Merge discarded duplicate accounts into their survivors.")
+    parser.add_argument('--mapping', default=MAPPING_FILE,
+                        help="Survivorship mapping (Id, Survivor_Id, Is_Survivor) written by the consolidation")
+    parser.add_argument('--execute', action='store_true', help="Apply the changes (the default is a dry run)")
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help="Concurrent API calls")
+    parser.add_argument('--keep-losers', action='store_true', help="Reparent only, do not delete discarded accounts")
+    parser.add_argument('--rollback', metavar='JOURNAL', help="Undo the reparenting recorded in a merge journal")
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+
+    sf = connect_to_salesforce()
+    if args.rollback:
+        rollback_merge(sf, args.rollback, max_workers=args.workers)
+    else:
+        result = execute_merge(sf, load_artifact(args.mapping), dry_run=not args.execute, max_workers=args.workers,
+                               delete_losers=not args.keep_losers)
+        if result.get('dry_run'):
+            plan_file = 'data/merge_plan.csv'
+            pd.DataFrame(result['changes'], columns=['sobject', 'id', 'field', 'old', 'new']).to_csv(plan_file, index=False)
+            logger.info("Planned changes saved to %s", plan_file)
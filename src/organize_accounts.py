@@ -0,0 +1,55 @@
+import logging
+
+from artifacts import save_artifact
+from logging_setup import configure_logging
+from source_accounts import SOURCE_FILE, load_source_accounts
+
+logger = logging.getLogger(__name__)
+
+# Arquivo organizado gerado a partir da planilha de origem
+ORGANIZED_FILE = 'data/conta_duplicadas_organized.xlsx'
+
+def organize_duplicates(input_file_path=SOURCE_FILE, output_file_path=ORGANIZED_FILE):
+    """
+    Organiza o arquivo Excel com base na coluna 'Excel Line' para agrupar contas duplicadas.
+
+    Args:
+    - input_file_path (str): Caminho do arquivo original na pasta data_source.
+    - output_file_path (str): Caminho onde o arquivo organizado será salvo.
+
+    Retorna o caminho do arquivo salvo, ou None em caso de erro.
+    """
+    try:
+        # Carregar o arquivo Excel (lido uma única vez por versão, com cache em Parquet ao lado do arquivo)
+        logger.info("Carregando o arquivo de %s...", input_file_path)
+        df = load_source_accounts(input_file_path, columns=()).copy()
+
+        # Imprimir colunas para depuração
+        logger.debug("Colunas encontradas no arquivo: %s", list(df.columns))
+
+        # Padronizar nomes das colunas para garantir que estejam no formato esperado
+        df.columns = df.columns.str.strip().str.upper()
+
+        # Verificar se as colunas necessárias estão presentes
+        required_columns = ['ID', 'NEO_CPFCNPJ__C', 'EXCEL LINE']
+        if not all(column in df.columns for column in required_columns):
+            logger.error("O arquivo Excel precisa conter as colunas %s", required_columns)
+            return None
+
+        # Ordenar o DataFrame com base na coluna 'Excel Line'
+        df_sorted = df.sort_values(by='EXCEL LINE', kind='stable').reset_index(drop=True)
+
+        # Salvar o DataFrame organizado na pasta 'data' (Parquet, mais o Excel quando EXPORT_EXCEL está ativo)
+        logger.info("Salvando o arquivo organizado em %s...", output_file_path)
+        save_artifact(df_sorted, output_file_path)
+
+        logger.info("Arquivo salvo com sucesso e organizado pela coluna 'Excel Line'.")
+        return output_file_path
+
+    except Exception as e:
+        logger.error("Ocorreu um erro ao organizar o arquivo: %s", e)
+        return None
+
+if __name__ == "__main__":
+    configure_logging()
+    organize_duplicates()
@@ -0,0 +1,80 @@
+"""Runs survivorship over duplicate clusters in a process pool, one columnar shard per task."""
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from survivorship import DEFAULT_RULES, build_golden_records
+
+logger = logging.getLogger(__name__)
+
+# More shards than workers keeps the pool busy when cluster sizes are uneven.
+SHARDS_PER_WORKER = 4
+
+
+def shard_clusters(df, shard_count, cluster_column='cluster_id'):
+    """Splits the frame into ``shard_count`` DataFrames, keeping every cluster whole.
+
+    Shards are assigned by hashing the cluster ID, so the same cluster always lands in the same shard.
+    """
+    shard_of_row = pd.util.hash_array(df[cluster_column].astype(str).to_numpy()) % np.uint64(shard_count)
+    return [df[shard_of_row == shard] for shard in range(shard_count)]
+
+
+def consolidate_shard(task):
+    """Worker entry point: builds the golden records of one shard and times it."""
+    shard_number, shard, cluster_column, rules, source_priority, field_source_priority = task
+    started = time.perf_counter()
+    golden, mapping = build_golden_records(
+        shard, cluster_column=cluster_column, rules=rules, source_priority=source_priority,
+        field_source_priority=field_source_priority,
+    )
+    return shard_number, len(shard), time.perf_counter() - started, golden, mapping
+
+
+def sort_results(golden, mapping, cluster_column='cluster_id'):
+    """Orders golden records by cluster and the mapping by cluster and Id, so the output does not
+    depend on the number of workers or on how clusters were sharded."""
+    golden = golden.sort_values(cluster_column, kind='stable').reset_index(drop=True)
+    mapping = mapping.sort_values([cluster_column, 'Id'], kind='stable').reset_index(drop=True)
+    return golden, mapping
+
+
+def consolidate_in_parallel(df, workers, cluster_column='cluster_id', rules=DEFAULT_RULES, source_priority=(),
+                            field_source_priority=None):
+    """Builds golden records across ``workers`` processes and reassembles them in cluster order.
+
+    ``source_priority`` and ``field_source_priority`` are passed to
+    :func:`survivorship.build_golden_records` for every shard.
+
+    Each worker receives a DataFrame shard (pickled column by column, not as per-row dicts).
+    Returns the golden records, the survivor mapping and a per-shard timing table.
+    """
+    if workers <= 1:
+        started = time.perf_counter()
+        golden, mapping = build_golden_records(
+            df, cluster_column=cluster_column, rules=rules, source_priority=source_priority,
+            field_source_priority=field_source_priority,
+        )
+        timings = pd.DataFrame([{'shard': 0, 'rows': len(df), 'seconds': time.perf_counter() - started}])
+        return (*sort_results(golden, mapping, cluster_column), timings)
+
+    shards = shard_clusters(df, workers * SHARDS_PER_WORKER, cluster_column)
+    tasks = [
+        (number, shard, cluster_column, rules, source_priority, field_source_priority)
+        for number, shard in enumerate(shards) if len(shard)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(consolidate_shard, tasks))
+
+    timings = pd.DataFrame(
+        [{'shard': number, 'rows': rows, 'seconds': round(seconds, 3)} for number, rows, seconds, _, _ in results]
+    )
+    for row in timings.itertuples():
+        logger.info("Shard %d: %d accounts consolidated in %.3fs", row.shard, row.rows, row.seconds)
+
+    golden = pd.concat([result[3] for result in results], ignore_index=True)
+    mapping = pd.concat([result[4] for result in results], ignore_index=True)
+    return (*sort_results(golden, mapping, cluster_column), timings)
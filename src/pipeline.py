@@ -0,0 +1,452 @@
+"""Single entry point for the duplicate-account workflow: a dependency graph of stages with cached outputs.
+
+Every stage declares its input files, the stages it reads from and the files it writes. Before a
+stage runs, a cache key is built from the SHA-256 of its inputs, the output hashes of its upstream
+stages, the source of the modules it runs and the settings that change its output. If the key
+and the hashes of its outputs match the last run, the stage is skipped. Stages whose dependencies
+are done run concurrently (verification and the related counts, for instance), sharing one
+Salesforce login; the stages that fan out API calls (related counts, consolidation fetch) share
+one rate limit.
+
+Usage: python pipeline.py [stage ...] [--force stage ...] [--force-all] [--jobs 4] [--plan]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+
+import pandas as pd
+
+from account_snapshot import ensure_snapshot, snapshot_fingerprint
+from artifacts import artifact_path, load_artifact
+from check_duplicates import OUTPUT_FILE as DUPLICATES_FILE, check_duplicates
+from compare_duplicates import (
+    consolidate_accounts, fetch_accounts_by_ids, input_file as DUPLICATE_IDS_FILE, load_duplicate_ids,
+    output_file as CONSOLIDATED_FILE, save_mapping,
+)
+from concurrency import TokenBucket
+from config import (
+    EXPORT_EXCEL, INSTANCE_URL, METRICS_DIR, PIPELINE_STATE_PATH, REQUEST_BURST, REQUESTS_PER_SECOND, SOURCE_COLUMNS,
+)
+from instrumentation import Metrics, instrument
+from logging_setup import add_logging_arguments, configure_from_args
+from list_accounts import list_salesforce_accounts
+from main import connect_to_salesforce
+from organize_accounts import ORGANIZED_FILE, organize_duplicates
+from process_accounts import NO_INFO_OUTPUT, OTHER_OUTPUT, load_no_info_accounts, load_other_accounts, process_accounts
+from report_writer import record_link, salesforce_link, survivor_highlights, write_frame
+from source_accounts import SOURCE_FILE, file_sha256
+from survivorship import MAPPING_FILE
+from verify_duplicates import NEW_ACCOUNTS_FILE, VERIFICATION_FILE, verify_accounts
+
+logger = logging.getLogger(__name__)
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+ACCOUNTS_FILE = 'data/salesforce_accounts.xlsx'
+LINKS_FILE = 'data/conta_duplicadas_no_info_file_with_links.xlsx'
+
+# Stages that can run at the same time; each related-count stage also uses up to MAX_WORKERS threads
+DEFAULT_JOBS = 4
+
+# Settings that change what the stages write, so changing one invalidates the cache
+SETTINGS = {'export_excel': EXPORT_EXCEL, 'source_columns': SOURCE_COLUMNS}
+
+
+class Stage:
+    """One step of the pipeline.
+
+    ``run(context)`` does the work and returns the number of rows handled (or None). ``inputs``
+    are files read from outside the pipeline, ``after`` the stages whose outputs it reads and
+    ``outputs`` the files it writes (as their Excel/CSV names; the Parquet artifact next to each
+    one counts too). ``modules`` are the source files whose code decides the result. Stages with
+    ``always=True`` run every time and report their state through ``fingerprint()`` instead.
+    """
+
+    def __init__(self, name, run, inputs=(), after=(), outputs=(), modules=(), always=False, fingerprint=None):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.after = list(after)
+        self.outputs = list(outputs)
+        self.modules = tuple(modules)
+        self.always = always
+        self.fingerprint = fingerprint
+
+    def output_files(self):
+        """Every file standing for the outputs: the Parquet artifact and the export, when present."""
+        files = []
+        for path in self.outputs:
+            for candidate in dict.fromkeys([artifact_path(path), path]):
+                if os.path.exists(candidate) or candidate == path:
+                    files.append(candidate)
+        return files
+
+
+class LazySalesforce:
+    """Instrumented Salesforce client that logs in on first use, so fully cached runs never connect."""
+
+    def __init__(self, connect, metrics=None):
+        self._connect = connect
+        self._metrics = metrics
+        self._client = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                sf = self._connect()
+                self._client = instrument(sf, self._metrics) if self._metrics else sf
+            return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.client(), name)
+
+
+class PipelineContext:
+    """What the stages share: the Salesforce client and one rate limit for the stages that fan out API calls."""
+
+    def __init__(self, connect=connect_to_salesforce, metrics=None):
+        self.sf = LazySalesforce(connect, metrics)
+        self.rate_limiter = TokenBucket(REQUESTS_PER_SECOND, REQUEST_BURST)
+
+
+class PipelineState:
+    """Cache keys and file hashes of the last successful run of every stage, kept in a JSON file."""
+
+    def __init__(self, path=PIPELINE_STATE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.stages = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                self.stages = json.load(file)
+
+    def get(self, name):
+        with self.lock:
+            return self.stages.get(name)
+
+    def output_hashes(self, name):
+        """Output hashes downstream keys are built from.
+
+        Excel exports embed their creation time, so when a Parquet artifact stands for the same
+        output only the artifact counts; rewriting identical data then leaves downstream stages cached.
+        """
+        outputs = (self.get(name) or {}).get('outputs', {})
+        return {
+            path: digest for path, digest in hashes(outputs).items()
+            if artifact_path(path) == path or artifact_path(path) not in outputs
+        }
+
+    def record(self, name, entry):
+        """Saves a stage's entry, replacing the file atomically so an interrupted run keeps the finished stages."""
+        with self.lock:
+            self.stages[name] = entry
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            temporary = f"{self.path}.tmp"
+            with open(temporary, 'w', encoding='utf-8') as file:
+                json.dump(self.stages, file, indent=2, sort_keys=True)
+            os.replace(temporary, self.path)
+
+
+def describe_files(paths, known=None):
+    """``{path: [size, mtime_ns, sha256]}`` (None for missing files).
+
+    Files whose size and mtime match ``known`` keep their recorded hash instead of being read again.
+    """
+    known = known or {}
+    described = {}
+    for path in paths:
+        if not os.path.exists(path):
+            described[path] = None
+            continue
+        stat = os.stat(path)
+        previous = known.get(path)
+        if previous and previous[:2] == [stat.st_size, stat.st_mtime_ns]:
+            described[path] = previous
+        else:
+            described[path] = [stat.st_size, stat.st_mtime_ns, file_sha256(path)]
+    return described
+
+
+def hashes(described):
+    return {path: entry[2] if entry else None for path, entry in described.items()}
+
+
+@lru_cache(maxsize=None)
+def code_hash(modules):
+    """SHA-256 of the source of the given modules (paths relative to src/)."""
+    digest = hashlib.sha256()
+    for module in modules:
+        digest.update(module.encode())
+        with open(os.path.join(SRC_DIR, module), 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def stage_key(stage, inputs, upstream):
+    """Cache key of a stage from its input hashes, its upstream outputs, its code and the settings."""
+    payload = {
+        'stage': stage.name, 'inputs': hashes(inputs), 'upstream': upstream,
+        'code': code_hash(stage.modules), 'settings': SETTINGS,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def stage_status(stage, state, forced=False):
+    """Cache key, described inputs and whether the stage can be skipped."""
+    entry = state.get(stage.name) or {}
+    inputs = describe_files(stage.inputs, entry.get('inputs'))
+    key = stage_key(stage, inputs, {name: state.output_hashes(name) for name in stage.after})
+    if stage.always or forced or entry.get('key') != key:
+        return key, inputs, False
+    current = describe_files(stage.output_files(), entry.get('outputs'))
+    return key, inputs, hashes(current) == hashes(entry.get('outputs', {}))
+
+
+def execute_stage(stage, context, state, metrics, forced=False):
+    """Runs a stage unless its cached outputs are current. Returns 'cached', 'ran' or 'failed'."""
+    try:
+        key, inputs, cached = stage_status(stage, state, forced)
+        if cached:
+            logger.info("Stage %s is up to date, skipped", stage.name)
+            return 'cached'
+
+        logger.info("Running stage %s...", stage.name)
+        started = time.time()
+        with metrics.stage(stage.name) as record:
+            record['rows'] = stage.run(context)
+        if stage.fingerprint:
+            outputs = {stage.name: [None, None, stage.fingerprint()]}
+        else:
+            outputs = describe_files(stage.output_files())
+        state.record(stage.name, {
+            'key': key, 'inputs': inputs, 'outputs': outputs,
+            'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'seconds': round(time.time() - started, 3),
+        })
+        return 'ran'
+    except Exception as e:
+        logger.error("Stage %s failed: %s", stage.name, e)
+        return 'failed'
+
+
+def select_stages(stages, targets=None, force=()):
+    """The target stages and everything upstream of them, in definition (dependency) order."""
+    by_name = {stage.name: stage for stage in stages}
+    unknown = [name for name in [*(targets or ()), *force] if name not in by_name]
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(unknown)}")
+
+    needed = set()
+    pending = list(targets or by_name)
+    while pending:
+        name = pending.pop()
+        if name not in needed:
+            needed.add(name)
+            pending.extend(by_name[name].after)
+    return [stage for stage in stages if stage.name in needed]
+
+
+def validate_stages(stages):
+    """Checks that every stage comes after the stages it depends on (which also rules out cycles)."""
+    seen = set()
+    for stage in stages:
+        missing = [name for name in stage.after if name not in seen]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on {', '.join(missing)}, which must be defined before it")
+        seen.add(stage.name)
+
+
+def run_pipeline(targets=None, force=(), jobs=DEFAULT_JOBS, state_path=PIPELINE_STATE_PATH, metrics=None,
+                 connect=connect_to_salesforce, stages=None):
+    """Runs the selected stages (all by default) and their upstream stages, skipping the ones that are current.
+
+    A stage starts as soon as the stages it depends on are done, up to ``jobs`` at a time. Stages
+    in ``force`` run even when cached; their downstream stages then run only if the outputs changed.
+    When a stage fails, the stages depending on it are marked 'blocked' and the others go on.
+    Returns ``{stage: status}``.
+    """
+    stages = STAGES if stages is None else stages
+    validate_stages(stages)
+    selected = select_stages(stages, targets, force)
+    metrics = metrics or Metrics()
+    state = PipelineState(state_path)
+    context = PipelineContext(connect, metrics)
+    force = set(force)
+
+    statuses = {}
+    pending = list(selected)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        while pending or running:
+            for stage in list(pending):
+                upstream = [statuses.get(name) for name in stage.after]
+                if any(status in ('failed', 'blocked') for status in upstream):
+                    statuses[stage.name] = 'blocked'
+                    pending.remove(stage)
+                    logger.warning("Stage %s not run: an upstream stage failed", stage.name)
+                elif all(status in ('cached', 'ran') for status in upstream):
+                    pending.remove(stage)
+                    future = executor.submit(execute_stage, stage, context, state, metrics, stage.name in force)
+                    running[future] = stage.name
+            if not running:
+                # Stages are in dependency order, so with nothing running every pending stage was just resolved
+                break
+            # Block until a running stage finishes instead of polling
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                statuses[running.pop(future)] = future.result()
+
+    logger.info("Pipeline finished: %s", ', '.join(f"{name} {status}" for name, status in statuses.items()))
+    return statuses
+
+
+def plan_pipeline(targets=None, force=(), state_path=PIPELINE_STATE_PATH, stages=None):
+    """What a run would do, without running anything: ``{stage: 'always' | 'cached' | 'run'}``.
+
+    Stages downstream of one that runs are shown as 'run', since their inputs may change.
+    """
+    stages = STAGES if stages is None else stages
+    validate_stages(stages)
+    state = PipelineState(state_path)
+    plan = {}
+    for stage in select_stages(stages, targets, force):
+        _, _, cached = stage_status(stage, state, stage.name in force)
+        if stage.always:
+            plan[stage.name] = 'always'
+        elif cached and all(plan[name] != 'run' for name in stage.after):
+            plan[stage.name] = 'cached'
+        else:
+            plan[stage.name] = 'run'
+    return plan
+
+
+# Stages
+
+def refresh_snapshot_stage(context):
+    # Incremental sync when the snapshot is older than SNAPSHOT_TTL; no API call (nor login) otherwise
+    ensure_snapshot(context.sf)
+
+
+def list_accounts_stage(context):
+    return list_salesforce_accounts(context.sf, ACCOUNTS_FILE)
+
+
+def check_duplicates_stage(context):
+    check_duplicates(context.sf)
+
+
+def verify_stage(context):
+    if verify_accounts(context.sf) is None:
+        raise RuntimeError("verification failed, see the output above")
+
+
+def organize_stage(context):
+    if organize_duplicates(SOURCE_FILE, ORGANIZED_FILE) is None:
+        raise RuntimeError(f"could not organize {SOURCE_FILE}")
+
+
+def count_partition(context, accounts, output_path):
+    if accounts is None:
+        raise RuntimeError(f"could not load {SOURCE_FILE}")
+    if accounts.empty:
+        return 0
+    if process_accounts(context.sf, accounts, output_path, rate_limiter=context.rate_limiter) is None:
+        raise RuntimeError(f"related counts for {output_path} failed; run again to resume from the checkpoint")
+    return len(accounts)
+
+
+def count_no_info_stage(context):
+    return count_partition(context, load_no_info_accounts(), NO_INFO_OUTPUT)
+
+
+def count_other_stage(context):
+    return count_partition(context, load_other_accounts(), OTHER_OUTPUT)
+
+
+def links_stage(context):
+    if not os.path.exists(artifact_path(NO_INFO_OUTPUT)):
+        return 0
+    link = record_link(INSTANCE_URL) if INSTANCE_URL else salesforce_link(context.sf)
+    # The Parquet artifact has no link column, but an Excel export edited after it (which load_artifact
+    # then reads) does; write_frame refreshes an existing link column rather than adding another
+    df = load_artifact(NO_INFO_OUTPUT)
+    write_frame(LINKS_FILE, df, sheet_name='Contas', links=[link])
+    return len(df)
+
+
+def consolidate_stage(context):
+    ids_list = load_duplicate_ids(DUPLICATE_IDS_FILE)
+    accounts = pd.DataFrame(fetch_accounts_by_ids(context.sf, ids_list, rate_limiter=context.rate_limiter))
+    golden, mapping = consolidate_accounts(accounts, with_mapping=True)
+    write_frame(CONSOLIDATED_FILE, golden, highlights=survivor_highlights())
+    save_mapping(mapping)
+    return len(accounts)
+
+
+# Related counts read child objects, which the Account snapshot does not track: they are recomputed when
+# the source workbook or the code changes, or with --force counts_no_info counts_other.
+COUNT_MODULES = ['process_accounts.py', 'related_counts.py', 'soql_batching.py', 'source_accounts.py']
+CONSOLIDATION_MODULES = [
+    'compare_duplicates.py', 'account_fetch.py', 'describe_cache.py', 'clustering.py', 'cpf_cnpj.py',
+    'survivorship.py', 'parallel_consolidation.py', 'report_writer.py',
+]
+
+STAGES = [
+    Stage('snapshot', refresh_snapshot_stage, always=True, fingerprint=snapshot_fingerprint),
+    Stage('list_accounts', list_accounts_stage, after=['snapshot'], outputs=[ACCOUNTS_FILE],
+          modules=['list_accounts.py', 'artifacts.py']),
+    Stage('check_duplicates', check_duplicates_stage, after=['snapshot'], outputs=[DUPLICATES_FILE],
+          modules=['check_duplicates.py', 'cpf_cnpj.py', 'artifacts.py']),
+    Stage('verify', verify_stage, inputs=[SOURCE_FILE], after=['snapshot'], outputs=[VERIFICATION_FILE, NEW_ACCOUNTS_FILE],
+          modules=['verify_duplicates.py', 'reconciliation.py', 'source_accounts.py', 'artifacts.py']),
+    Stage('organize', organize_stage, inputs=[SOURCE_FILE], outputs=[ORGANIZED_FILE],
+          modules=['organize_accounts.py', 'source_accounts.py', 'artifacts.py']),
+    Stage('counts_no_info', count_no_info_stage, inputs=[SOURCE_FILE], outputs=[NO_INFO_OUTPUT], modules=COUNT_MODULES),
+    Stage('counts_other', count_other_stage, inputs=[SOURCE_FILE], outputs=[OTHER_OUTPUT], modules=COUNT_MODULES),
+    Stage('links', links_stage, after=['counts_no_info'], outputs=[LINKS_FILE], modules=['report_writer.py']),
+    # The snapshot stands in for changes to the duplicate accounts, which are fetched live
+    Stage('consolidate', consolidate_stage, inputs=[DUPLICATE_IDS_FILE], after=['snapshot'],
+          outputs=[CONSOLIDATED_FILE, MAPPING_FILE], modules=CONSOLIDATION_MODULES),
+]
+
+
+def parse_args():
+    """Parses the command-line options."""
+    parser = argparse.ArgumentParser(description="Run the duplicate-account pipeline, skipping stages that are up to date.")
+    parser.add_argument('stages', nargs='*', metavar='stage',
+                        help=f"Stages to bring up to date, with their dependencies (default: all of {', '.join(s.name for s in STAGES)})")
+    parser.add_argument('--force', nargs='+', default=[], metavar='stage', help="Run these stages even if cached")
+    parser.add_argument('--force-all', action='store_true', help="Run every selected stage")
+    parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS, help="Stages run at the same time")
+    parser.add_argument('--plan', action='store_true', help="Show which stages would run, without running them")
+    parser.add_argument('--state', default=PIPELINE_STATE_PATH, help="Cache state file")
+    parser.add_argument('--metrics', default=os.path.join(METRICS_DIR, f"pipeline_{time.strftime('%Y%m%d_%H%M%S')}.json"),
+                        help="Where to write the JSON run metrics")
+    add_logging_arguments(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    configure_from_args(args)
+    selected = [stage.name for stage in select_stages(STAGES, args.stages)]
+    force = selected if args.force_all else args.force
+
+    if args.plan:
+        for name, status in plan_pipeline(args.stages, force, args.state).items():
+            print(f"{name:<20} {status}")
+    else:
+        run_metrics = Metrics()
+        try:
+            statuses = run_pipeline(args.stages, force, args.jobs, args.state, run_metrics)
+        finally:
+            run_metrics.write_report(args.metrics)
+        if any(status in ('failed', 'blocked') for status in statuses.values()):
+            raise SystemExit(1)
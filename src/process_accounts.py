@@ -1,10 +1,22 @@
 import pandas as pd
 import logging
 from simple_salesforce import Salesforce
+from concurrency import TokenBucket, call_with_retry, iter_in_order
+from config import MAX_WORKERS, REQUESTS_PER_SECOND, REQUEST_BURST
+from related_counts import count_related_objects, is_permanent_error, log_failures
+from report_writer import salesforce_link
+from artifacts import save_artifact
+from source_accounts import load_source_partitions
+from checkpoints import CountCheckpoint, batch_key, checkpoint_path
+from logging_setup import SampledLog
 
 # Configurando o logger
 logger = logging.getLogger(__name__)
 
+# Eventos por conta (contagens e erros) são amostrados: as primeiras ocorrências e depois uma a cada N
+count_log = SampledLog(logger, logging.DEBUG)
+count_error_log = SampledLog(logger, logging.ERROR, head=20, every=1000)
+
 # Consultas SQL para contar objetos relacionados à conta
 RELATED_OBJECT_QUERIES = {
     'Oportunidades': "SELECT count() FROM Opportunity WHERE AccountId = '{account_id}'",
@@ -23,72 +35,162 @@ RELATED_OBJECT_QUERIES = {
     'Documentos': "SELECT count() FROM Document WHERE AccountId = '{account_id}'"
 }
 
+# Arquivos gerados para cada partição da planilha
+NO_INFO_OUTPUT = 'data/conta_duplicadas_no_info.xlsx'
+OTHER_OUTPUT = 'data/conta_duplicadas_demais_contas.xlsx'
+
 def load_no_info_accounts():
     """Carrega contas com Status 'NO INFO' do arquivo conta_duplicadas.xlsx."""
     try:
-        file_path = 'data_source/conta_duplicadas.xlsx'
-        df = pd.read_excel(file_path)
-        no_info_accounts = df[df['STATUS'] == 'NO INFO']
-        logger.debug(f"Contas carregadas com 'NO INFO': {len(no_info_accounts)}")
+        # A planilha é lida uma única vez (cache em memória e Parquet ao lado do arquivo)
+        no_info_accounts, _ = load_source_partitions()
+        logger.debug("Contas carregadas com 'NO INFO': %d", len(no_info_accounts))
         return no_info_accounts
     except Exception as e:
-        logger.error(f"Erro ao carregar o arquivo conta_duplicadas.xlsx: {e}")
+        logger.error("Erro ao carregar o arquivo conta_duplicadas.xlsx: %s", e)
         return None
 
 def load_other_accounts():
     """Carrega contas com Status diferente de 'NO INFO' do arquivo conta_duplicadas.xlsx."""
     try:
-        file_path = 'data_source/conta_duplicadas.xlsx'
-        df = pd.read_excel(file_path)
-        other_accounts = df[df['STATUS'] != 'NO INFO']
-        logger.debug(f"Contas carregadas com Status diferente de 'NO INFO': {len(other_accounts)}")
+        # A planilha é lida uma única vez (cache em memória e Parquet ao lado do arquivo)
+        _, other_accounts = load_source_partitions()
+        logger.debug("Contas carregadas com Status diferente de 'NO INFO': %d", len(other_accounts))
         return other_accounts
     except Exception as e:
-        logger.error(f"Erro ao carregar o arquivo conta_duplicadas.xlsx: {e}")
+        logger.error("Erro ao carregar o arquivo conta_duplicadas.xlsx: %s", e)
         return None
 
-def get_related_counts(sf, account_id):
-    """Retorna a contagem de objetos relacionados para uma conta usando o ID da conta no Salesforce."""
+def get_related_counts(sf, account_id, rate_limiter=None, unavailable=None, errors=None):
+    """Retorna a contagem de objetos relacionados para uma conta usando o ID da conta no Salesforce.
+
+    Objetos que não existem na organização (erros em :data:`related_counts.PERMANENT_ERRORS`) contam 0
+    e entram em ``unavailable``, para não serem consultados de novo; falhas temporárias ficam como None
+    e o último erro de cada objeto fica em ``errors``.
+    """
+    unavailable = set() if unavailable is None else unavailable
     counts = {}
     for key, query in RELATED_OBJECT_QUERIES.items():
+        if key in unavailable:
+            counts[key] = 0
+            continue
         try:
-            counts[key] = sf.query(query.format(account_id=account_id))['totalSize']
+            counts[key] = call_with_retry(sf.query, query.format(account_id=account_id), rate_limiter=rate_limiter)['totalSize']
         except Exception as e:
-            logger.error(f"Erro ao obter contagem para {key} na conta {account_id}: {e}")
-            counts[key] = 0
-    logger.debug(f"Contagens para a conta {account_id}: {counts}")
+            if is_permanent_error(e):
+                if key not in unavailable:
+                    unavailable.add(key)
+                    logger.warning("%s não pode ser contado nesta organização, contando 0: %s", key, e)
+                counts[key] = 0
+            else:
+                count_error_log("Erro ao obter contagem para %s na conta %s: %s", key, account_id, e)
+                counts[key] = None
+                if errors is not None:
+                    errors[key] = e
+    count_log("Contagens para a conta %s: %s", account_id, counts)
     return counts
 
-def process_accounts(sf, accounts_df, output_path):
-    """Processa as contas, adiciona as contagens de objetos relacionados e salva em um novo arquivo Excel."""
+def process_accounts(sf, accounts_df, output_path, batched=True, max_workers=MAX_WORKERS, resume=True,
+                     requests_per_second=REQUESTS_PER_SECOND, rate_limiter=None):
+    """Processa as contas, adiciona as contagens de objetos relacionados e salva em um novo arquivo Excel.
+
+    Com ``batched=True`` as contagens são feitas com consultas agregadas (GROUP BY) por lote de contas,
+    em vez de uma consulta count() por objeto e por conta. As consultas são enviadas em paralelo por até
+    ``max_workers`` threads, limitadas pelo token bucket, e os resultados mantêm a ordem das linhas.
+
+    Com ``resume=True`` cada lote concluído é gravado em um checkpoint SQLite (em CHECKPOINT_DIR); se a
+    execução falhar, a próxima chamada com o mesmo ``output_path`` e o mesmo modo (``batched``) retoma
+    de onde parou. O checkpoint é apagado depois que o arquivo final é salvo.
+
+    ``rate_limiter`` permite compartilhar um token bucket com outras etapas que rodam ao mesmo tempo.
+    """
+    # Lotes agregados e contagens por conta gravam unidades diferentes: cada modo tem seu próprio checkpoint
+    mode = 'batched' if batched else 'per_account'
+    checkpoint = CountCheckpoint(checkpoint_path(output_path, mode)) if resume else None
     try:
         accounts_copy = accounts_df.copy()
-        counts_data = {key: [] for key in RELATED_OBJECT_QUERIES.keys()}
+        account_ids = accounts_copy['Id'].tolist()
+        rate_limiter = rate_limiter or TokenBucket(requests_per_second, REQUEST_BURST)
 
-        for _, row in accounts_copy.iterrows():
-            account_id = row['Id']
-            counts = get_related_counts(sf, account_id)
-            for key, count in counts.items():
-                counts_data[key].append(count)
+        if batched:
+            counts_data = count_related_objects(
+                sf, account_ids, RELATED_OBJECT_QUERIES, max_workers=max_workers, rate_limiter=rate_limiter,
+                checkpoint=checkpoint,
+            )
+        else:
+            counts_data = count_accounts_one_by_one(sf, account_ids, rate_limiter, max_workers, checkpoint)
 
         # Adiciona as contagens como novas colunas no DataFrame
         for key, values in counts_data.items():
             accounts_copy[key] = values
 
-        accounts_copy.to_excel(output_path, index=False)
-        logger.info(f"Arquivo salvo com contagens de objetos relacionados em: {output_path}")
+        # Gravação em Parquet para as próximas etapas; o Excel (com a coluna de links para as contas
+        # no Salesforce) só é gerado para revisão quando EXPORT_EXCEL está ativo
+        save_artifact(accounts_copy, output_path, sheet_name='Contas', links=[salesforce_link(sf)])
+        logger.info("Arquivo salvo com contagens de objetos relacionados em: %s", output_path)
+        if checkpoint:
+            checkpoint.discard()
+            checkpoint = None
         return output_path
     except Exception as e:
-        logger.error(f"Erro ao processar contas: {e}")
+        logger.error("Erro ao processar contas: %s", e)
         return None
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+def count_accounts_one_by_one(sf, account_ids, rate_limiter, max_workers, checkpoint=None):
+    """Contagens com uma consulta count() por objeto e por conta, gravando cada conta no checkpoint.
+
+    Como no modo em lotes, uma conta com falha temporária não é gravada no checkpoint: a execução
+    termina com RuntimeError e a próxima retoma essas contas. Sem checkpoint a falha conta 0. Os erros
+    por conta são amostrados no log, mas ao final há um resumo com todos os objetos que falharam.
+    """
+    done = checkpoint.completed() if checkpoint else set()
+    pending = [account_id for account_id in dict.fromkeys(account_ids) if batch_key('account', account_id) not in done]
+
+    totals = {key: {} for key in RELATED_OBJECT_QUERIES}
+    unavailable = set()
+    errors = {}
+    failures = {}
+    failed = 0
+    results = iter_in_order(
+        lambda account_id: (account_id, get_related_counts(sf, account_id, rate_limiter, unavailable, errors)),
+        pending, max_workers=max_workers,
+    )
+    for account_id, counts in results:
+        if None in counts.values():
+            failed += 1
+            for key in (key for key, count in counts.items() if count is None):
+                accounts, _, _ = failures.get(key, (0, 0, None))
+                failures[key] = (accounts + 1, accounts + 1, errors[key])
+            if checkpoint:
+                continue
+        elif checkpoint:
+            checkpoint.save(batch_key('account', account_id), [(key, account_id, count) for key, count in counts.items()])
+        for key, count in counts.items():
+            totals[key][account_id] = count or 0
+    count_log.summary('per-account counts')
+    count_error_log.summary('count errors')
+    log_failures(failures, 'accounts')
+
+    if checkpoint:
+        if failed:
+            raise RuntimeError(f"{failed} accounts failed; run again to resume from {checkpoint.path}")
+        for key, counts in checkpoint.totals().items():
+            totals[key].update(counts)
+    return {key: [totals[key].get(account_id, 0) for account_id in account_ids] for key in RELATED_OBJECT_QUERIES}
+
+def process_all_accounts(sf, only_no_info=False, max_workers=MAX_WORKERS, accounts_df=None):
+    """Processa contas 'NO INFO' e outras contas conforme especificado.
 
-def process_all_accounts(sf, only_no_info=False):
-    """Processa contas 'NO INFO' e outras contas conforme especificado."""
+    ``accounts_df`` evita recarregar a partição quando o chamador já a tem em mãos.
+    """
     if only_no_info:
-        no_info_accounts = load_no_info_accounts()
+        no_info_accounts = load_no_info_accounts() if accounts_df is None else accounts_df
         if no_info_accounts is not None and not no_info_accounts.empty:
-            return process_accounts(sf, no_info_accounts, 'data/conta_duplicadas_no_info.xlsx')
+            return process_accounts(sf, no_info_accounts, NO_INFO_OUTPUT, max_workers=max_workers)
     else:
-        other_accounts = load_other_accounts()
+        other_accounts = load_other_accounts() if accounts_df is None else accounts_df
         if other_accounts is not None and not other_accounts.empty:
-            return process_accounts(sf, other_accounts, 'data/conta_duplicadas_demais_contas.xlsx')
+            return process_accounts(sf, other_accounts, OTHER_OUTPUT, max_workers=max_workers)
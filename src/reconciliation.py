@@ -0,0 +1,55 @@
+"""Vectorized reconciliation of spreadsheet account IDs against the Salesforce Account snapshot."""
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Characters encoding the case of each 5-character block of a 15-character ID
+SUFFIX_ALPHABET = np.frombuffer(b'ABCDEFGHIJKLMNOPQRSTUVWXYZ012345', dtype=np.uint8)
+BIT_WEIGHTS = np.array([1, 2, 4, 8, 16], dtype=np.uint8)
+
+EXISTS = 'Exists'
+MISSING = 'Does Not Exist'
+
+
+def to_18_char_ids(ids):
+    """Normalizes Salesforce IDs to their 18-character form, all at once.
+
+    15-character IDs get their case-checksum suffix; 18-character IDs are kept; anything else
+    (blank, wrong length) becomes missing. Returns a Series aligned with ``ids``.
+    """
+    ids = pd.Series(ids, copy=False)
+    text = ids.where(ids.notna(), '').astype(str).str.strip()
+    lengths = text.str.len().to_numpy()
+    result = pd.Series(np.where(lengths == 18, text, None), index=ids.index, dtype=object)
+
+    short = (lengths == 15) & text.str.isascii().to_numpy()
+    if short.any():
+        chars = np.frombuffer(text[short].to_numpy().astype('S15').tobytes(), dtype=np.uint8).reshape(-1, 15)
+        upper = ((chars >= ord('A')) & (chars <= ord('Z'))).reshape(-1, 3, 5)
+        codes = (upper * BIT_WEIGHTS).sum(axis=2, dtype=np.uint8)
+        suffix = np.ascontiguousarray(SUFFIX_ALPHABET[codes]).view('S3').ravel().astype(str)
+        result[short] = (text[short] + suffix).to_numpy()
+    return result
+
+
+def reconcile_accounts(sheet_df, salesforce_df, sheet_column='Account_18_Digit_ID__c', id_column='Id'):
+    """Matches spreadsheet rows against Salesforce accounts in one pass of hash lookups.
+
+    Both sides are keyed by the 18-character ID, so 15- and 18-character IDs match each other.
+    Returns ``(sheet_df, new_accounts)``: a copy of the sheet with an 'Account Exists' column
+    (semi-join) and the Salesforce accounts that are not in the sheet (anti-join).
+    """
+    # 18-character IDs are case-insensitive, so the keys are compared in upper case
+    sheet_keys = pd.Index(to_18_char_ids(sheet_df[sheet_column]).str.upper())
+    salesforce_keys = pd.Index(to_18_char_ids(salesforce_df[id_column]).str.upper())
+
+    exists = sheet_keys.isin(salesforce_keys)
+    result = sheet_df.copy()
+    result['Account Exists'] = np.where(exists, EXISTS, MISSING)
+
+    new_accounts = salesforce_df[~salesforce_keys.isin(sheet_keys)]
+    logger.info("%d accounts found, %d missing, %d new in Salesforce", exists.sum(), (~exists).sum(), len(new_accounts))
+    return result, new_accounts
@@ -0,0 +1,118 @@
+import logging
+import re
+
+from checkpoints import batch_key
+from concurrency import SCHEMA_ERRORS, call_with_retry, is_schema_error, iter_in_order
+from soql_batching import MAX_AGGREGATE_ROWS, chunk_ids, quote_ids
+
+logger = logging.getLogger(__name__)
+
+# Matches the per-account count templates, e.g.
+# "SELECT count() FROM Task WHERE WhatId = '{account_id}'"
+COUNT_QUERY_PATTERN = re.compile(r"FROM\s+(\w+)\s+WHERE\s+(\w+)\s*=\s*'\{account_id\}'", re.IGNORECASE)
+
+# Errors meaning the object or lookup field does not exist in the org (e.g. Campaign.AccountId); those
+# counts are recorded as 0 instead of being left pending. Anything else, MALFORMED_QUERY included
+# (a bad or oversized chunk), leaves the batch pending so it is never saved as a zero.
+PERMANENT_ERRORS = SCHEMA_ERRORS
+
+
+def build_aggregate_query(count_query):
+    """Turns a per-account count() template into a GROUP BY template over an IN clause.
+
+    Returns the aggregate template (with an ``{ids}`` placeholder) and the lookup field.
+    """
+    match = COUNT_QUERY_PATTERN.search(count_query)
+    if not match:
+        raise ValueError(f"Unsupported count query: {count_query}")
+    sobject, field = match.groups()
+    template = f"SELECT {field}, COUNT(Id) total FROM {sobject} WHERE {field} IN ({{ids}}) GROUP BY {field}"
+    return template, field
+
+
+def is_permanent_error(error):
+    """Checks whether a count query can never succeed in this org, so retrying it is pointless."""
+    return is_schema_error(error, PERMANENT_ERRORS)
+
+
+def id_key(record_id):
+    """Key used to match 15- and 18-character IDs of the same record."""
+    return record_id[:15]
+
+
+def log_failures(failures, unit):
+    """Logs, once per object, how many ``unit`` failed in the run and the last error seen.
+
+    ``failures`` maps each object to ``(failed, accounts, error)``. Per-event errors may be sampled;
+    this summary always covers every object that had a failure.
+    """
+    for key, (failed, accounts, error) in failures.items():
+        logger.error("%s: %d %s failed (%d accounts left without counts); last error: %s",
+                     key, failed, unit, accounts, error)
+
+
+def count_related_objects(sf, account_ids, queries, max_workers=1, rate_limiter=None, checkpoint=None):
+    """Counts related records for many accounts with one aggregate query per chunk and object.
+
+    Chunks are sent concurrently when ``max_workers > 1``. Returns a dict mapping each key of
+    ``queries`` to a list of counts aligned with ``account_ids``, the same shape
+    ``process_accounts`` builds row by row.
+
+    With a ``checkpoint`` (see :class:`checkpoints.CountCheckpoint`) every finished chunk is saved
+    as it completes and chunks saved by an earlier run are skipped. Chunks that fail are left for
+    the next run and a ``RuntimeError`` is raised once the others are saved, instead of counting 0.
+    Queries that can never succeed (see :data:`PERMANENT_ERRORS`) count 0 and are saved as done.
+    Every object with failed chunks is listed in a summary at the end (see :func:`log_failures`).
+    """
+    unique_ids = list(dict.fromkeys(account_ids))
+    done = checkpoint.completed() if checkpoint else set()
+
+    tasks = []
+    for key, count_query in queries.items():
+        template, field = build_aggregate_query(count_query)
+        for chunk in chunk_ids(unique_ids, template, max_ids=MAX_AGGREGATE_ROWS):
+            query = template.format(ids=quote_ids(chunk))
+            if batch_key(key, query) not in done:
+                tasks.append((key, field, query, len(chunk)))
+    if done:
+        logger.info("Resuming from checkpoint: %d batches already done, %d left", len(done), len(tasks))
+
+    def run(task):
+        key, field, query, size = task
+        try:
+            result = call_with_retry(sf.query, query, rate_limiter=rate_limiter)
+        except Exception as e:
+            if is_permanent_error(e):
+                return key, query, {}, e
+            logger.error("Error counting %s for a batch of %d accounts: %s", key, size, e)
+            return key, query, None, e
+        return key, query, {id_key(record[field]): record['total'] for record in result['records']}, None
+
+    totals = {key: {} for key in queries}
+    failures = {}
+    unavailable = set()
+    for task, (key, query, counts, error) in zip(tasks, iter_in_order(run, tasks, max_workers=max_workers)):
+        if counts is None:
+            batches, accounts, _ = failures.get(key, (0, 0, None))
+            failures[key] = (batches + 1, accounts + task[3], error)
+            continue
+        if error is not None and key not in unavailable:
+            unavailable.add(key)
+            logger.warning("%s cannot be counted in this org, counting 0: %s", key, error)
+        if checkpoint:
+            checkpoint.save(batch_key(key, query), [(key, account, total) for account, total in counts.items()])
+        else:
+            totals[key].update(counts)
+
+    log_failures(failures, 'batches')
+    failed = sum(batches for batches, _, _ in failures.values())
+    if checkpoint:
+        if failed:
+            raise RuntimeError(f"{failed} batches failed; run again to resume from {checkpoint.path}")
+        for key, counts in checkpoint.totals().items():
+            totals[key].update(counts)
+
+    return {
+        key: [totals[key].get(id_key(account_id), 0) for account_id in account_ids]
+        for key in queries
+    }
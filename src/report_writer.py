@@ -0,0 +1,173 @@
+import csv
+import logging
+import os
+import re
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.styles import PatternFill
+from openpyxl.utils import get_column_letter
+
+logger = logging.getLogger(__name__)
+
+GREEN_FILL = PatternFill(start_color="00FF00", end_color="00FF00", fill_type="solid")
+YELLOW_FILL = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
+
+# Rows converted from a DataFrame at a time, so a 1M-row frame is never copied whole
+FRAME_CHUNK_ROWS = 50000
+
+COLUMN_PLACEHOLDER = re.compile(r'\{([^{}]+)\}')
+
+
+def highlight(column, formula, fill):
+    """Describes a conditional fill for ``column``.
+
+    ``formula`` is an Excel formula for the first data row in which ``{Column Name}`` stands
+    for that row's cell in the named column, e.g. ``'LEN({Discarded_Account_Ids})=0'``.
+    """
+    return {'column': column, 'formula': formula, 'fill': fill}
+
+
+def survivor_highlights(id_column='Id', discarded_column='Discarded_Account_Ids'):
+    """Base account in green when nothing was merged into it, yellow when it absorbed duplicates."""
+    return [
+        highlight(id_column, f'LEN({{{discarded_column}}})=0', GREEN_FILL),
+        highlight(id_column, f'LEN({{{discarded_column}}})>0', YELLOW_FILL),
+    ]
+
+
+def record_link(base_url, source_column='Id', column='Salesforce Link'):
+    """Describes a column of clickable links built from the record IDs in ``source_column``.
+
+    ``base_url`` is the org URL (``https://<instance>``); the link opens ``<base_url>/<Id>``.
+    """
+    return {'column': column, 'source': source_column, 'url': base_url.rstrip('/') + '/{value}'}
+
+
+def salesforce_link(sf, source_column='Id', column='Salesforce Link'):
+    """:func:`record_link` for the org ``sf`` is connected to."""
+    return record_link(f"https://{sf.sf_instance}", source_column, column)
+
+
+def link_values(rows, columns, links, as_formula):
+    """Fills one link cell per link column in every row, as it streams past.
+
+    A link column already in ``columns`` (e.g. from an earlier export) is overwritten in place;
+    the others are appended at the end of the row.
+    """
+    sources = [columns.index(link['source']) for link in links]
+    targets = [columns.index(link['column']) if link['column'] in columns else None for link in links]
+    for row in rows:
+        # Read-only sheets can return rows without their trailing empty cells
+        row = list(row) + [None] * (len(columns) - len(row))
+        for link, source, target in zip(links, sources, targets):
+            value = row[source]
+            if value is None or value == '':
+                cell = None
+            else:
+                url = link['url'].format(value=value)
+                cell = f'=HYPERLINK("{url}", "{url}")' if as_formula else url
+            if target is None:
+                row.append(cell)
+            else:
+                row[target] = cell
+        yield row
+
+
+def resolve_formula(formula, columns):
+    """Replaces ``{Column Name}`` placeholders with row-relative references to the first data row."""
+    def reference(match):
+        name = match.group(1)
+        if name not in columns:
+            raise KeyError(f"Column '{name}' used in a conditional format is not in the report")
+        return f'${get_column_letter(columns.index(name) + 1)}2'
+    return COLUMN_PLACEHOLDER.sub(reference, formula)
+
+
+def add_highlights(ws, columns, highlights, row_count):
+    """Adds the conditional-format rules covering every data row of a column."""
+    last_row = max(row_count + 1, 2)
+    for rule in highlights:
+        letter = get_column_letter(columns.index(rule['column']) + 1)
+        ws.conditional_formatting.add(
+            f'{letter}2:{letter}{last_row}',
+            FormulaRule(formula=[resolve_formula(rule['formula'], columns)], fill=rule['fill'], stopIfTrue=True),
+        )
+
+
+def write_rows(path, columns, rows, sheet_name='Sheet1', highlights=(), links=()):
+    """Streams rows to an .xlsx or .csv file as they are produced, without holding them in memory.
+
+    ``rows`` can be any iterable of sequences (a generator over query pages, a database
+    cursor, ...). Excel output uses openpyxl's write-only mode; ``highlights`` become
+    conditional-format rules, so colouring costs nothing per row. ``links`` (see
+    :func:`record_link`) add columns of record URLs, written as HYPERLINK formulas in
+    Excel and plain URLs in CSV; a column with the same header is overwritten. Returns the row count.
+    """
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    columns = list(columns)
+    for link in links:
+        if link['source'] not in columns:
+            raise KeyError(f"Column '{link['source']}' used for links is not in the report")
+    if links:
+        rows = link_values(rows, columns, links, as_formula=not path.lower().endswith('.csv'))
+        columns = columns + [link['column'] for link in links if link['column'] not in columns]
+
+    # Fail before writing anything if a rule names a missing column
+    for rule in highlights:
+        resolve_formula(rule['formula'], columns)
+        if rule['column'] not in columns:
+            raise KeyError(f"Column '{rule['column']}' to highlight is not in the report")
+
+    count = 0
+    if path.lower().endswith('.csv'):
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+    else:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(sheet_name)
+        ws.append(columns)
+        for row in rows:
+            ws.append(list(row))
+            count += 1
+        # Rules are written when the sheet is closed, so they can be added after the rows
+        add_highlights(ws, columns, highlights, count)
+        wb.save(path)
+
+    logger.info("%d rows written to %s", count, path)
+    return count
+
+
+def frame_rows(df):
+    """Yields the rows of a DataFrame as tuples, with missing values as None, a chunk at a time."""
+    for start in range(0, len(df), FRAME_CHUNK_ROWS):
+        chunk = df.iloc[start:start + FRAME_CHUNK_ROWS].astype(object)
+        yield from chunk.where(chunk.notna(), None).itertuples(index=False, name=None)
+
+
+def write_frame(path, df, sheet_name='Sheet1', highlights=(), links=()):
+    """Writes a DataFrame in one pass with :func:`write_rows`."""
+    return write_rows(path, df.columns, frame_rows(df), sheet_name=sheet_name, highlights=highlights, links=links)
+
+
+def copy_with_links(input_path, output_path, links, sheet_name=None):
+    """Streams a workbook sheet into a new file with link columns added, reading it in read-only mode.
+
+    Source columns are found by header name, so any row count or column layout works. Link columns
+    the sheet already has (a workbook exported with links) are refreshed instead of added again.
+    """
+    wb = load_workbook(input_path, read_only=True)
+    try:
+        ws = wb[sheet_name] if sheet_name else wb.active
+        rows = ws.iter_rows(values_only=True)
+        columns = list(next(rows, ()))
+        return write_rows(output_path, columns, rows, sheet_name=ws.title, links=links)
+    finally:
+        wb.close()
@@ -1,12 +1,12 @@
 # operacoes_salesforce.py
 from simple_salesforce import Salesforce
+from account_snapshot import get_snapshot_records
 
 def obter_ids_salesforce(sf):
     """Retorna um dicionário com IDs, Nomes e NEO_Cpfcnpj__c das contas no Salesforce."""
     try:
-        # Consulta para obter ID, Nome e NEO_Cpfcnpj__c
-        consulta = "SELECT Id, Name, NEO_Cpfcnpj__c FROM Account"
-        contas = sf.query_all(consulta)
+        # Lê ID, Nome e NEO_Cpfcnpj__c do snapshot local de contas
+        contas = get_snapshot_records(sf)
 
         # Cria um dicionário com ID como chave e um dicionário como valor
         return {
@@ -14,7 +14,7 @@ def obter_ids_salesforce(sf):
                 'Nome': conta['Name'],
                 'NEO_Cpfcnpj__c': conta.get('NEO_Cpfcnpj__c')  # Usando get() para evitar KeyError se o campo não existir
             }
-            for conta in contas['records']
+            for conta in contas
         }
 
     except Exception as e:
@@ -0,0 +1,45 @@
+from urllib.parse import quote_plus
+
+# simple_salesforce sends queries as GET parameters, so the limit that bites
+# first is the request URI length, not the 100k character SOQL limit.
+MAX_QUERY_URI_LENGTH = 16000
+
+# Hard limit on the length of a SOQL statement sent in a request body (Bulk API).
+MAX_SOQL_LENGTH = 100000
+
+# Room left for the instance host and the /services/data/vXX.X/query/?q= prefix.
+URI_OVERHEAD = 200
+
+# Aggregate queries return at most 2000 groups and cannot be paged with queryMore.
+MAX_AGGREGATE_ROWS = 2000
+
+
+def quote_ids(ids):
+    """Formats IDs as the body of a SOQL IN clause."""
+    return ', '.join(f"'{record_id}'" for record_id in ids)
+
+
+def chunk_ids(ids, query_template, max_length=MAX_QUERY_URI_LENGTH, max_ids=None):
+    """Splits IDs into chunks whose formatted query stays within the URI length limit.
+
+    ``query_template`` must contain an ``{ids}`` placeholder for the IN clause body.
+    """
+    budget = max_length - URI_OVERHEAD - len(quote_plus(query_template.format(ids='')))
+    if budget <= 0:
+        raise ValueError("Query template alone exceeds the maximum query length.")
+
+    chunks = []
+    chunk = []
+    used = 0
+    for record_id in ids:
+        # Each ID costs its quoted, URL-encoded form plus the ", " separator.
+        cost = len(quote_plus(f"'{record_id}', "))
+        if chunk and (used + cost > budget or (max_ids and len(chunk) >= max_ids)):
+            chunks.append(chunk)
+            chunk = []
+            used = 0
+        chunk.append(record_id)
+        used += cost
+    if chunk:
+        chunks.append(chunk)
+    return chunks
@@ -0,0 +1,135 @@
+"""Single-read loader for the source workbook data_source/conta_duplicadas.xlsx."""
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from artifacts import arrow_safe, artifact_path
+from config import SOURCE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+SOURCE_FILE = 'data_source/conta_duplicadas.xlsx'
+NO_INFO_STATUS = 'NO INFO'
+
+# Explicit dtypes for the columns the pipeline relies on; IDs and CPF/CNPJ stay text
+SOURCE_DTYPES = {
+    'Id': str,
+    'Account_18_Digit_ID__c': str,
+    'NEO_Cpfcnpj__c': str,
+    'STATUS': str,
+}
+
+# Sidecar metadata keys identifying the workbook version the Parquet copy was built from
+MTIME_KEY = b'source_mtime_ns'
+HASH_KEY = b'source_sha256'
+# Columns parsed into the sidecar: a JSON list, or "*" when the whole sheet was read
+COLUMNS_KEY = b'source_columns'
+ALL_COLUMNS = '*'
+
+# Parsed frames kept for the life of the process, keyed by path; the lock makes concurrent
+# callers (pipeline stages running in threads) wait for a single parse instead of racing on the sidecar
+_frames = {}
+_lock = threading.Lock()
+# NO INFO / other partitions of each cached frame, so they are split (and copied) once
+_partitions = {}
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sidecar_covers(metadata, columns):
+    """Checks whether a sidecar parsed with the columns recorded in ``metadata`` can serve ``columns``."""
+    parsed = metadata.get(COLUMNS_KEY)
+    if parsed is None:
+        return False
+    parsed = json.loads(parsed)
+    if parsed == ALL_COLUMNS:
+        return True
+    return bool(columns) and set(columns) <= set(parsed)
+
+
+def read_sidecar(path, mtime_ns, columns=()):
+    """Returns the Parquet sidecar of ``path`` when it was built from the same workbook, else None.
+
+    A matching mtime is trusted; otherwise the workbook is hashed, so a touched but unchanged file is still a hit.
+    The sidecar must also hold ``columns`` (every column of the sheet when empty), or it is a miss.
+    """
+    sidecar = artifact_path(path)
+    if not os.path.exists(sidecar):
+        return None
+    metadata = pq.read_schema(sidecar).metadata or {}
+    if not sidecar_covers(metadata, columns):
+        return None
+    if metadata.get(MTIME_KEY) != str(mtime_ns).encode():
+        if metadata.get(HASH_KEY) != file_sha256(path).encode():
+            return None
+    logger.debug("Reading %s from %s", path, sidecar)
+    return pq.read_table(sidecar, columns=list(columns) or None, memory_map=True).to_pandas()
+
+
+def write_sidecar(df, path, mtime_ns, columns=()):
+    """Saves the parsed frame next to the workbook, tagged with the workbook's mtime, hash and parsed columns."""
+    table = pa.Table.from_pandas(arrow_safe(df), preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        MTIME_KEY: str(mtime_ns).encode(),
+        HASH_KEY: file_sha256(path).encode(),
+        COLUMNS_KEY: json.dumps(list(columns) or ALL_COLUMNS).encode(),
+    })
+    pq.write_table(table, artifact_path(path))
+
+
+def load_source_accounts(path=SOURCE_FILE, columns=SOURCE_COLUMNS):
+    """Loads the source workbook, parsing it at most once per version of the file.
+
+    The parsed frame is kept in memory and in a Parquet sidecar (data_source/conta_duplicadas.parquet)
+    that is reused while the workbook's mtime or content hash is unchanged. ``columns`` limits what is
+    parsed (all columns when empty); listed columns the sheet does not have are skipped. Callers get the
+    cached frame and must copy it before changing it.
+    """
+    with _lock:
+        mtime_ns = os.stat(path).st_mtime_ns
+        key = (path, tuple(columns or ()))
+        cached = _frames.get(key)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+
+        df = read_sidecar(path, mtime_ns, columns)
+        if df is None:
+            logger.info("Parsing %s...", path)
+            wanted = set(columns)
+            usecols = (lambda column: column in wanted) if columns else None
+            dtypes = {column: dtype for column, dtype in SOURCE_DTYPES.items() if not columns or column in wanted}
+            df = pd.read_excel(path, usecols=usecols, dtype=dtypes)
+            write_sidecar(df, path, mtime_ns, columns)
+            logger.info("%d rows parsed from %s", len(df), path)
+
+        _frames[key] = (mtime_ns, df)
+        return df
+
+
+def load_source_partitions(path=SOURCE_FILE):
+    """Splits the source accounts into the 'NO INFO' rows and all other rows, with a single STATUS comparison.
+
+    The split is cached with the parsed frame, so both partitions are built once per version of the
+    workbook however many callers ask for them. Like the frame, they must be copied before changing them.
+    """
+    df = load_source_accounts(path)
+    with _lock:
+        cached = _partitions.get(path)
+        if cached is None or cached[0] is not df:
+            no_info = (df['STATUS'] == NO_INFO_STATUS).to_numpy()
+            cached = _partitions[path] = (df, df[no_info], df[~no_info])
+        return cached[1], cached[2]
@@ -0,0 +1,92 @@
+"""Columnar survivorship: picks the base account of every duplicate cluster and builds its golden record."""
+import numpy as np
+import pandas as pd
+
+# Values treated as "not filled", as in the original consolidation scripts.
+EMPTY_VALUES = ['', 'NA']
+
+# Ranking rules, applied in order to choose the survivor of each cluster:
+#   most_recent     - latest LastModifiedDate first
+#   most_filled     - most non-empty fields first
+#   source_priority - lowest position of the record's source in ``source_priority`` first
+DEFAULT_RULES = ('most_recent', 'most_filled')
+
+# Where the consolidation saves which survivor every account was merged into (read by merge_executor)
+MAPPING_FILE = 'data/debug/survivorship_mapping.csv'
+
+
+def empty_mask(df):
+    return df.isna() | df.isin(EMPTY_VALUES)
+
+
+def source_ranks(values, priority):
+    """Position of each value in ``priority``; values not listed rank after all listed ones."""
+    return values.map({source: rank for rank, source in enumerate(priority)}).fillna(len(priority))
+
+
+def build_golden_records(
+    df,
+    cluster_column='cluster_id',
+    rules=DEFAULT_RULES,
+    source_column='AccountSource',
+    source_priority=(),
+    field_source_priority=None,
+):
+    """Chooses a survivor per cluster and fills its empty fields from the other members, for all clusters at once.
+
+    Every cluster is ranked with ``rules`` (ties broken by Id), the top record is the survivor,
+    and each field of the golden record is the first non-empty value in rank order.
+    ``field_source_priority`` maps a field to a list of ``source_column`` values whose records
+    should supply that field first (e.g. ``{'Phone': ['Web', 'Partner']}``).
+
+    Returns the golden records (one row per cluster, keeping the survivor's Id, plus
+    ``Discarded_Account_Ids``) and a mapping of every account to its survivor
+    (``Id``, cluster, ``Survivor_Id``, ``Is_Survivor``).
+    """
+    data = df.reset_index(drop=True)
+    empty = empty_mask(data)
+    fields = [column for column in data.columns if column != cluster_column]
+
+    sort_columns = [cluster_column]
+    ascending = [True]
+    ranking = pd.DataFrame(index=data.index)
+    for rule in rules:
+        if rule == 'most_recent':
+            ranking['_modified'] = pd.to_datetime(data['LastModifiedDate'], errors='coerce', utc=True)
+            sort_columns.append('_modified')
+            ascending.append(False)
+        elif rule == 'most_filled':
+            ranking['_filled'] = (~empty[fields]).sum(axis=1)
+            sort_columns.append('_filled')
+            ascending.append(False)
+        elif rule == 'source_priority':
+            ranking['_source'] = source_ranks(data[source_column], source_priority)
+            sort_columns.append('_source')
+            ascending.append(True)
+        else:
+            raise ValueError(f"Unknown survivorship rule: {rule}")
+    sort_columns.append('Id')
+    ascending.append(True)
+
+    ordered = data.join(ranking).sort_values(sort_columns, ascending=ascending, na_position='last', kind='stable')
+    rank_order = ordered.index.to_numpy()
+    masked = data.mask(empty)
+
+    # First non-empty value per cluster and field, in survivor rank order.
+    golden = masked.loc[rank_order].groupby(cluster_column, sort=True)[fields].first()
+    survivors = ordered.groupby(cluster_column, sort=True)['Id'].first()
+    golden['Id'] = survivors
+
+    for field, priority in (field_source_priority or {}).items():
+        by_source = ordered.assign(_field_source=source_ranks(ordered[source_column], priority))
+        by_source = by_source.sort_values([cluster_column, '_field_source'], kind='stable').index.to_numpy()
+        golden[field] = masked.loc[by_source].groupby(cluster_column, sort=True)[field].first()
+
+    mapping = pd.DataFrame({'Id': data['Id'], cluster_column: data[cluster_column]})
+    mapping['Survivor_Id'] = mapping[cluster_column].map(survivors)
+    mapping['Is_Survivor'] = mapping['Id'] == mapping['Survivor_Id']
+
+    discarded = mapping.loc[~mapping['Is_Survivor']].groupby(cluster_column)['Id'].agg('; '.join)
+    golden['Discarded_Account_Ids'] = discarded.reindex(golden.index, fill_value='')
+    golden = golden.reset_index()[[column for column in data.columns] + ['Discarded_Account_Ids']]
+    return golden, mapping
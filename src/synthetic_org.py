@@ -0,0 +1,161 @@
+"""Synthetic Salesforce org data for benchmarks: accounts with noisy CPF/CNPJ duplicates, child records and describes."""
+import numpy as np
+import pandas as pd
+
+from cpf_cnpj import CNPJ_WEIGHTS_1, CNPJ_WEIGHTS_2, CPF_WEIGHTS_1, CPF_WEIGHTS_2, mod11_digit
+from reconciliation import to_18_char_ids
+
+NAME_WORDS = np.array([
+    'Agro', 'Alfa', 'Brasil', 'Central', 'Comercial', 'Construtora', 'Distribuidora', 'Engenharia', 'Farma',
+    'Industria', 'Logistica', 'Mercado', 'Nova', 'Paulista', 'Sul', 'Tecnologia', 'Transportes', 'Uniao',
+])
+COMPANY_SUFFIXES = np.array(['LTDA', 'S.A.', 'ME', 'EIRELI', ''])
+CITIES = np.array(['Sao Paulo', 'Rio de Janeiro', 'Belo Horizonte', 'Curitiba', 'Porto Alegre', 'Recife', 'Salvador'])
+STREETS = np.array(['Rua das Flores', 'Av. Paulista', 'Rua XV de Novembro', 'Av. Brasil', 'Rua Augusta'])
+SOURCES = np.array(['Web', 'Partner', 'Phone Inquiry', 'Trade Show', 'Other'])
+
+# Average child records per account, and the lookup pointing at the account
+CHILD_FANOUT = {
+    'Contact': ('003', 'AccountId', 1.5),
+    'Opportunity': ('006', 'AccountId', 0.8),
+    'Case': ('500', 'AccountId', 0.5),
+    'Task': ('00T', 'WhatId', 2.0),
+    'Event': ('00U', 'WhatId', 0.5),
+}
+
+
+def record_ids(prefix, count, start=0):
+    """Valid 18-character IDs with the given key prefix."""
+    return to_18_char_ids(pd.Series([f"{prefix}{i:0{15 - len(prefix)}d}" for i in range(start, start + count)])).to_numpy()
+
+
+def with_check_digits(digits, weights_1, weights_2, cpf):
+    """Appends the two mod-11 check digits to each row of a digit matrix."""
+    digits = np.column_stack([digits, mod11_digit(digits, weights_1, cpf=cpf)])
+    return np.column_stack([digits, mod11_digit(digits, weights_2, cpf=cpf)])
+
+
+def synthetic_cnpjs(count, rng):
+    """Generates valid 14-digit CNPJs (random base plus computed check digits)."""
+    digits = with_check_digits(rng.integers(0, 10, size=(count, 12)), CNPJ_WEIGHTS_1, CNPJ_WEIGHTS_2, cpf=False)
+    return (digits.astype(np.uint8) + ord('0')).view('S14').ravel().astype(str)
+
+
+def synthetic_cpfs(count, rng):
+    """Generates valid 11-digit CPFs."""
+    digits = with_check_digits(rng.integers(0, 10, size=(count, 9)), CPF_WEIGHTS_1, CPF_WEIGHTS_2, cpf=True)
+    return (digits.astype(np.uint8) + ord('0')).view('S11').ravel().astype(str)
+
+
+def add_format_noise(values, rng, noise_rate):
+    """Formats about ``noise_rate`` of the numbers the way they show up in the org.
+
+    Punctuated (12.345.678/0001-95, 123.456.789-09), padded with spaces, or read as a
+    number (leading zeros lost, ``.0`` suffix).
+    """
+    values = values.astype(object)
+    noisy = np.flatnonzero(rng.random(len(values)) < noise_rate)
+    styles = rng.integers(0, 4, size=len(noisy))
+    for position, style in zip(noisy, styles):
+        value = values[position]
+        if style == 0:
+            values[position] = (f"{value[:2]}.{value[2:5]}.{value[5:8]}/{value[8:12]}-{value[12:]}" if len(value) == 14
+                                else f"{value[:3]}.{value[3:6]}.{value[6:9]}-{value[9:]}")
+        elif style == 1:
+            values[position] = f" {value} "
+        elif style == 2:
+            values[position] = f"{int(value)}.0"
+        else:
+            values[position] = str(int(value))
+    return values
+
+
+def synthetic_account_frame(accounts, duplicate_rate=0.1, noise_rate=0.2, invalid_rate=0.02, cpf_share=0.3, seed=0):
+    """Builds the Account table as a DataFrame.
+
+    About ``duplicate_rate`` of the accounts reuse another account's CPF/CNPJ (with a variant of
+    its name), ``noise_rate`` of the numbers carry formatting noise and ``invalid_rate`` have
+    broken check digits.
+    """
+    rng = np.random.default_rng(seed)
+    unique = max(1, int(accounts * (1 - duplicate_rate)))
+    cpf_count = int(unique * cpf_share)
+    keys = np.concatenate([synthetic_cnpjs(unique - cpf_count, rng), synthetic_cpfs(cpf_count, rng)])
+    rng.shuffle(keys)
+
+    names = np.char.add(np.char.add(rng.choice(NAME_WORDS, unique), ' '), rng.choice(NAME_WORDS, unique))
+    names = np.char.strip(np.char.add(np.char.add(names, ' '), rng.choice(COMPANY_SUFFIXES, unique)))
+
+    # Duplicates point back at a random original row
+    source = np.concatenate([np.arange(unique), rng.integers(0, unique, size=accounts - unique)])
+    cpfcnpj = keys[source]
+    name = names[source].astype(object)
+    duplicates = np.arange(unique, accounts)
+    name[duplicates] = np.char.upper(names[source[duplicates]].astype(str))
+
+    invalid = np.flatnonzero(rng.random(accounts) < invalid_rate)
+    cpfcnpj = cpfcnpj.astype(object)
+    cpfcnpj[invalid] = [value[:-1] + str((int(value[-1]) + 1) % 10) for value in cpfcnpj[invalid]]
+
+    modified = pd.to_datetime(rng.integers(1.6e9, 1.7e9, size=accounts), unit='s').strftime('%Y-%m-%dT%H:%M:%S.000+0000')
+    clave = np.where(rng.random(accounts) < 0.5, np.char.add('CL', source.astype(str)), None)
+    return pd.DataFrame({
+        'Id': record_ids('001', accounts),
+        'Name': name,
+        'NEO_Cpfcnpj__c': add_format_noise(cpfcnpj.astype(str), rng, noise_rate),
+        'NEO_Clave_Cliente__c': clave,
+        'BillingStreet': np.char.add(np.char.add(rng.choice(STREETS, accounts), ', '), rng.integers(1, 3000, accounts).astype(str)),
+        'BillingCity': rng.choice(CITIES, accounts),
+        'BillingPostalCode': np.char.zfill(rng.integers(1000000, 99999999, accounts).astype(str), 8),
+        'Phone': np.where(rng.random(accounts) < 0.6, np.char.add('+55 11 9', rng.integers(10000000, 99999999, accounts).astype(str)), None),
+        'AccountSource': np.where(rng.random(accounts) < 0.7, rng.choice(SOURCES, accounts), None),
+        'LastModifiedDate': modified,
+        'SystemModstamp': modified,
+    })
+
+
+def synthetic_children(account_ids, seed=0, fanout=CHILD_FANOUT):
+    """Child records per object, each account getting a Poisson number of them."""
+    rng = np.random.default_rng(seed + 1)
+    children = {}
+    for sobject, (prefix, field, average) in fanout.items():
+        counts = rng.poisson(average, size=len(account_ids))
+        parents = np.repeat(account_ids, counts)
+        ids = record_ids(prefix, len(parents))
+        children[sobject] = [{'Id': record_id, field: parent} for record_id, parent in zip(ids, parents)]
+    return children
+
+
+def account_describe():
+    """Account describe with the field types consolidation has to prune (formula, compound, long text)."""
+    def field(name, field_type, length=255, calculated=False, updateable=True):
+        return {'name': name, 'type': field_type, 'length': length, 'calculated': calculated, 'updateable': updateable}
+
+    return {'name': 'Account', 'fields': [
+        field('Id', 'id', 18, updateable=False),
+        field('Name', 'string'),
+        field('NEO_Cpfcnpj__c', 'string', 20),
+        field('NEO_Clave_Cliente__c', 'string', 50),
+        field('BillingStreet', 'textarea'),
+        field('BillingCity', 'string', 40),
+        field('BillingPostalCode', 'string', 20),
+        field('BillingAddress', 'address', 0, updateable=False),
+        field('Phone', 'phone', 40),
+        field('AccountSource', 'picklist'),
+        field('Description', 'textarea', 32000),
+        field('Cpfcnpj_Formatado__c', 'string', 1300, calculated=True, updateable=False),
+        field('LastModifiedDate', 'datetime', 0, updateable=False),
+        field('SystemModstamp', 'datetime', 0, updateable=False),
+    ]}
+
+
+def synthetic_org(accounts, duplicate_rate=0.1, noise_rate=0.2, seed=0, with_children=True):
+    """Records and describes for :class:`fake_salesforce.FakeSalesforce`.
+
+    Returns ``(records, describes, account_frame)``.
+    """
+    frame = synthetic_account_frame(accounts, duplicate_rate=duplicate_rate, noise_rate=noise_rate, seed=seed)
+    records = {'Account': frame.astype(object).where(frame.notna(), None).to_dict('records')}
+    if with_children:
+        records.update(synthetic_children(frame['Id'].to_numpy(), seed=seed))
+    return records, {'Account': account_describe()}, frame
@@ -0,0 +1,19 @@
+import os
+import sys
+
+# The modules live flat in src/ and import each other by name
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import pytest
+
+from fake_salesforce import FakeSalesforce
+
+
+@pytest.fixture
+def fake_sf():
+    """Fake org with 30 accounts; their IDs differ within the first 15 characters, like real ones."""
+    accounts = [
+        {'Id': f"001{number:012d}AAA", 'Name': f"Account {number}", 'Phone': f"555-{number:04d}"}
+        for number in range(30)
+    ]
+    return FakeSalesforce({'Account': accounts})
@@ -0,0 +1,35 @@
+import math
+
+import account_fetch
+from account_fetch import fetch_accounts_by_ids
+from extraction_backends import RestBackend
+
+FIELDS = ['Id', 'Name']
+
+
+def account_id(number):
+    return f"001{number:012d}AAA"
+
+
+def test_15_and_18_character_ids_are_fetched_once(fake_sf):
+    ids = [account_id(3), account_id(1)[:15], account_id(1), account_id(3)[:15], account_id(2), 'x' * 18]
+    records = fetch_accounts_by_ids(fake_sf, ids, FIELDS, max_workers=1, backend=RestBackend())
+
+    # In order of first appearance; IDs that are not in the org are left out
+    assert [record['Id'] for record in records] == [account_id(3), account_id(1), account_id(2)]
+    sent = ' '.join(fake_sf.queries)
+    assert sent.count(account_id(1)[:15]) == 1 and sent.count(account_id(3)[:15]) == 1
+
+
+def test_chunks_shrink_as_the_select_list_grows(fake_sf, monkeypatch):
+    monkeypatch.setattr(account_fetch, 'MAX_CELLS_PER_CHUNK', 20)
+    ids = [account_id(number) for number in range(30)]
+
+    records = fetch_accounts_by_ids(fake_sf, ids, FIELDS, max_workers=4, backend=RestBackend())
+    assert [record['Id'] for record in records] == ids
+    assert len(fake_sf.queries) == math.ceil(30 / (20 // 2))
+
+    fake_sf.queries.clear()
+    fetch_accounts_by_ids(fake_sf, ids, FIELDS + ['Phone'], max_workers=4, backend=RestBackend())
+    assert len(fake_sf.queries) == math.ceil(30 / (20 // 3))
+    assert all(query.count("'") // 2 <= 20 // 3 for query in fake_sf.queries)
@@ -0,0 +1,128 @@
+import sqlite3
+import time
+
+import account_snapshot
+from account_snapshot import WATERMARK_OVERLAP, ensure_snapshot, refresh_snapshot, snapshot_state, sync_snapshot
+from concurrency import map_in_order
+from extraction_backends import RestBackend
+from fake_salesforce import ReplayQueryClient
+
+
+def account(account_id, name, modstamp, **extra):
+    return {'Id': account_id, 'Name': name, 'NEO_Cpfcnpj__c': None, 'SystemModstamp': modstamp, **extra}
+
+
+def accounts(path):
+    with sqlite3.connect(path) as conn:
+        return dict(conn.execute('SELECT "Id", "Name" FROM accounts').fetchall())
+
+
+def test_sync_applies_changes_and_deletes_since_the_watermark(tmp_path):
+    path = str(tmp_path / 'snapshot.sqlite')
+    client = ReplayQueryClient([
+        # Full pull, in two pages
+        [[account('001A', 'Acme', '2024-05-01T10:00:00.000+0000')],
+         [account('001B', 'Beta', '2024-05-01T12:00:00.000+0000')]],
+        # Changes since the watermark: one update, one new account, one delete
+        [[account('001A', 'Acme Ltda', '2024-05-02T09:00:00.000+0000'),
+          account('001C', 'Gama', '2024-05-02T08:00:00.000+0000'),
+          account('001B', 'Beta', '2024-05-02T07:00:00.000+0000', IsDeleted=True)]],
+    ])
+    refresh_snapshot(client, path, backend=RestBackend())
+    assert accounts(path) == {'001A': 'Acme', '001B': 'Beta'}
+    assert snapshot_state(path)['watermark'] == '2024-05-01T12:00:00.000+0000'
+
+    assert sync_snapshot(client, path) == 3
+    assert accounts(path) == {'001A': 'Acme Ltda', '001C': 'Gama'}
+    assert snapshot_state(path)['watermark'] == '2024-05-02T09:00:00.000+0000'
+
+    soql, include_deleted = client.calls[1]
+    assert include_deleted is True
+    # Re-read WATERMARK_OVERLAP (5 minutes) behind the watermark, for records committed late
+    assert WATERMARK_OVERLAP == 300
+    assert soql.endswith("WHERE SystemModstamp > 2024-05-01T11:55:00Z")
+
+
+def test_sync_without_changes_keeps_the_watermark(tmp_path):
+    path = str(tmp_path / 'snapshot.sqlite')
+    client = ReplayQueryClient([[[account('001A', 'Acme', '2024-05-01T10:00:00.000+0000')]], [[]]])
+    refresh_snapshot(client, path, backend=RestBackend())
+
+    assert sync_snapshot(client, path) == 0
+    assert accounts(path) == {'001A': 'Acme'}
+    assert snapshot_state(path)['watermark'] == '2024-05-01T10:00:00.000+0000'
+
+
+def test_concurrent_callers_pull_the_snapshot_once(tmp_path):
+    class SlowClient(ReplayQueryClient):
+        def query_all_iter(self, soql, include_deleted=False):
+            time.sleep(0.05)
+            yield from super().query_all_iter(soql, include_deleted=include_deleted)
+
+    path = str(tmp_path / 'snapshot.sqlite')
+    # A second full pull would find no scripted response left
+    client = SlowClient([[[account('001A', 'Acme', '2024-05-01T10:00:00.000+0000')]]])
+    map_in_order(lambda _: ensure_snapshot(client, path), range(4), max_workers=4)
+
+    assert len(client.calls) == 1
+    assert accounts(path) == {'001A': 'Acme'}
+
+
+class Clock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def test_ensure_snapshot_pulls_syncs_or_reuses_by_age(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(account_snapshot, 'time', clock)
+    monkeypatch.setattr(account_snapshot, 'SNAPSHOT_FULL_REFRESH', 1000)
+    monkeypatch.setattr(account_snapshot, 'get_backend', RestBackend)
+    path = str(tmp_path / 'snapshot.sqlite')
+    page = [account('001A', 'Acme', '2024-05-01T10:00:00.000+0000')]
+    client = ReplayQueryClient([[page], [[]], [page], [page]])
+
+    # No snapshot yet: full pull
+    ensure_snapshot(client, path, max_age=100)
+    assert len(client.calls) == 1 and not client.calls[0][1]
+
+    # Younger than max_age: nothing is sent
+    clock.now += 100
+    ensure_snapshot(client, path, max_age=100)
+    assert len(client.calls) == 1
+
+    # Older than max_age: incremental sync (queryAll)
+    clock.now += 1
+    ensure_snapshot(client, path, max_age=100)
+    assert len(client.calls) == 2 and client.calls[1][1]
+    assert float(snapshot_state(path)['synced_at']) == clock.now
+
+    # The last full pull is older than SNAPSHOT_FULL_REFRESH: full pull, even though the sync is recent
+    clock.now += 900
+    ensure_snapshot(client, path, max_age=10_000)
+    assert len(client.calls) == 3 and not client.calls[2][1]
+    assert float(snapshot_state(path)['full_pulled_at']) == clock.now
+
+    # refresh=True always pulls
+    ensure_snapshot(client, path, max_age=10_000, refresh=True)
+    assert len(client.calls) == 4
+
+
+def test_ensure_snapshot_rebuilds_a_stale_key_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(account_snapshot, 'get_backend', RestBackend)
+    path = str(tmp_path / 'snapshot.sqlite')
+    client = ReplayQueryClient([[[account('001A', 'Acme', '2024-05-01T10:00:00.000+0000', NEO_Cpfcnpj__c='529.982.247-25')]]])
+    ensure_snapshot(client, path)
+    with sqlite3.connect(path) as conn:
+        conn.execute("DELETE FROM cpfcnpj_index")
+        conn.execute("UPDATE snapshot_meta SET value = 'old' WHERE key = 'index_synced_at'")
+
+    ensure_snapshot(client, path)
+    state = snapshot_state(path)
+    assert len(client.calls) == 1
+    assert state['index_synced_at'] == state['synced_at']
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('SELECT "Id", cpfcnpj_key FROM cpfcnpj_index').fetchall() == [('001A', '52998224725')]
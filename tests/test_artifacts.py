@@ -0,0 +1,40 @@
+import os
+
+import pandas as pd
+import pytest
+
+import artifacts
+from artifacts import artifact_path, load_artifact, save_artifact, save_rows_artifact
+
+
+@pytest.fixture
+def no_excel_reads(monkeypatch):
+    def read_excel(*args, **kwargs):
+        raise AssertionError("read_excel should not be called for a current artifact")
+    monkeypatch.setattr(artifacts.pd, 'read_excel', read_excel)
+
+
+def test_fresh_artifact_is_read_from_parquet(tmp_path, no_excel_reads):
+    path = str(tmp_path / 'accounts.xlsx')
+    df = pd.DataFrame({'Id': ['001A', '001B'], 'Name': ['Alfa', 'Beta']})
+    save_artifact(df, path, export_excel=True)
+
+    assert (tmp_path / 'accounts.xlsx').exists()
+    pd.testing.assert_frame_equal(load_artifact(path), df)
+
+
+def test_streamed_artifact_is_read_from_parquet(tmp_path, no_excel_reads):
+    path = str(tmp_path / 'accounts.xlsx')
+    save_rows_artifact(path, ['Id', 'Name'], [('001A', 'Alfa'), ('001B', 'Beta')], export_excel=True)
+
+    assert load_artifact(path, columns=['Id'])['Id'].tolist() == ['001A', '001B']
+
+
+def test_edited_export_wins_over_parquet(tmp_path):
+    path = str(tmp_path / 'accounts.xlsx')
+    save_artifact(pd.DataFrame({'Id': ['001A']}), path, export_excel=True)
+    pd.DataFrame({'Id': ['001Z']}).to_excel(path, index=False)
+    # The hand-edited workbook is newer than the Parquet copy
+    os.utime(artifact_path(path), ns=(0, 0))
+
+    assert load_artifact(path)['Id'].tolist() == ['001Z']
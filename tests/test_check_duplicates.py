@@ -0,0 +1,34 @@
+import pandas as pd
+
+from check_duplicates import find_duplicate_groups
+
+ACCOUNTS = pd.DataFrame({
+    'Id': ['001A', '001B', '001C', '001D', '001E', '001F', '001G'],
+    'NEO_Cpfcnpj__c': ['529.982.247-25', '11222333000181', '52998224725', None, '11.222.333/0001-81',
+                       '11.222.333/0002-62', '123'],
+})
+
+
+def test_formatted_and_bare_numbers_form_one_group():
+    groups = find_duplicate_groups(ACCOUNTS)
+
+    assert groups['Account ID'].tolist() == ['001A', '001C', '001B', '001E']
+    assert groups['cpfcnpj_key'].tolist() == ['52998224725', '52998224725', '11222333000181', '11222333000181']
+    # Groups are numbered in order of first appearance; blank, unique and invalid numbers are left out
+    assert groups['Group ID'].tolist() == [1, 1, 2, 2]
+    assert groups['Group Size'].tolist() == [2, 2, 2, 2]
+    assert groups['NEO_Cpfcnpj__c'].tolist() == ['529.982.247-25', '52998224725', '11222333000181', '11.222.333/0001-81']
+
+
+def test_cnpj_root_groups_branches_of_a_company():
+    groups = find_duplicate_groups(ACCOUNTS, key_column='cnpj_root')
+
+    assert groups['Account ID'].tolist() == ['001B', '001E', '001F']
+    assert groups['Group ID'].tolist() == [1, 1, 1]
+    assert groups['Group Size'].tolist() == [3, 3, 3]
+
+
+def test_no_duplicates():
+    groups = find_duplicate_groups(ACCOUNTS.iloc[[0, 1, 3]])
+    assert groups.empty
+    assert list(groups.columns) == ['NEO_Cpfcnpj__c', 'cpfcnpj_key', 'Account ID', 'Group ID', 'Group Size']
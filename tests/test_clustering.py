@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from clustering import DisjointSet, cluster_ids
+
+
+def test_disjoint_set_merges_transitively():
+    components = DisjointSet(6)
+    components.union_all(np.array([0, 2, 4]), np.array([1, 3, 1]))
+    components.union(3, 3)
+
+    roots = components.roots()
+    assert roots[0] == roots[1] == roots[4]
+    assert roots[2] == roots[3]
+    assert len(set(roots.tolist())) == 3
+
+
+def test_accounts_linked_through_different_keys_share_a_cluster():
+    accounts = pd.DataFrame({
+        'Id': ['001D', '001B', '001C', '001A', '001E'],
+        'cpfcnpj_key': ['111', '111', None, '222', '333'],
+        'NEO_Clave_Cliente__c': [None, 'K1', 'K1', None, None],
+    }, index=[10, 11, 12, 13, 14])
+    clusters = cluster_ids(accounts)
+
+    # 001D~001B by CPF and 001B~001C by Clave; the cluster is named after its smallest Id
+    assert clusters.tolist() == ['001B', '001B', '001B', '001A', '001E']
+    assert clusters.index.tolist() == [10, 11, 12, 13, 14]
+
+
+def test_blank_keys_do_not_link():
+    accounts = pd.DataFrame({
+        'Id': ['001A', '001B', '001C', '001D'],
+        'cpfcnpj_key': [' ', ' ', '', None],
+        'NEO_Clave_Cliente__c': ['', ' ', None, '  '],
+    })
+    assert cluster_ids(accounts).tolist() == ['001A', '001B', '001C', '001D']
+
+
+def test_pairs_join_clusters_and_unknown_ids_are_ignored():
+    accounts = pd.DataFrame({'Id': ['001C', '001B', '001A'], 'cpfcnpj_key': ['9', None, '9']})
+    pairs = pd.DataFrame({'Id_left': ['001B', '001X'], 'Id_right': ['001C', '001A']})
+    assert cluster_ids(accounts, pairs=pairs).tolist() == ['001A', '001A', '001A']
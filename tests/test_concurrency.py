@@ -0,0 +1,38 @@
+import math
+import time
+
+import pytest
+
+from concurrency import TokenBucket
+
+
+@pytest.mark.parametrize('rate', [None, math.inf])
+def test_unlimited_bucket_never_waits(rate):
+    bucket = TokenBucket(rate, 5)
+    started = time.monotonic()
+    for _ in range(10000):
+        bucket.acquire()
+    assert time.monotonic() - started < 1
+
+
+@pytest.mark.parametrize('rate', [0, -1, math.nan])
+def test_rate_must_be_positive(rate):
+    with pytest.raises(ValueError):
+        TokenBucket(rate)
+
+
+def test_slow_rate_still_allows_one_call():
+    bucket = TokenBucket(0.5)
+    assert bucket.capacity == 1.0
+    started = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - started < 0.1
+
+
+def test_burst_then_wait():
+    bucket = TokenBucket(50, 5)
+    started = time.monotonic()
+    for _ in range(10):
+        bucket.acquire()
+    # 5 tokens up front, the other 5 refill at 50 per second
+    assert 0.08 <= time.monotonic() - started < 0.5
@@ -0,0 +1,27 @@
+import pandas as pd
+
+from cpf_cnpj import build_cpfcnpj_index
+
+
+def index_of(*values):
+    return build_cpfcnpj_index(pd.Series(values, dtype=object))
+
+
+def test_formats_and_lost_leading_zeros():
+    index = index_of('529.982.247-25', 52998224725.0, '11.222.333/0001-81', '360305000104', ' 012.345.678-90 ')
+    assert index['cpfcnpj_key'].tolist() == ['52998224725', '52998224725', '11222333000181', '00360305000104', '01234567890']
+    assert index['cpfcnpj_type'].tolist() == ['CPF', 'CPF', 'CNPJ', 'CNPJ', 'CPF']
+    assert index['cnpj_root'].tolist()[2:4] == ['11222333', '00360305']
+
+
+def test_cnpj_without_its_leading_zeros_is_not_taken_for_a_cpf():
+    # 00.012.345/0001-65 stored as a number keeps 11 digits, the length of a CPF
+    index = index_of('12345000165', 12345000165.0, '00.012.345/0001-65')
+    assert index['cpfcnpj_key'].tolist() == ['00012345000165'] * 3
+    assert index['cpfcnpj_type'].tolist() == ['CNPJ'] * 3
+    assert index['cnpj_root'].tolist() == ['00012345'] * 3
+
+
+def test_invalid_numbers_get_no_key():
+    index = index_of('529.982.247-26', '11111111111', '', None, '123')
+    assert index['cpfcnpj_key'].isna().all()
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+import describe_cache
+from describe_cache import describe_cache_path, get_describe, select_consolidation_fields
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(describe_cache, 'DESCRIBE_CACHE_DIR', str(tmp_path))
+    return tmp_path
+
+
+def test_describe_is_cached_per_org(fake_sf):
+    describe = get_describe(fake_sf)
+    assert get_describe(fake_sf) == describe
+    assert fake_sf.describe_calls == ['Account']
+
+    # Another org (session IDs start with the org ID) has its own cache file
+    fake_sf.session_id = '00D000000000002!fake'
+    get_describe(fake_sf)
+    assert fake_sf.describe_calls == ['Account', 'Account']
+    assert len(os.listdir(describe_cache.DESCRIBE_CACHE_DIR)) == 2
+
+
+def test_new_api_version_describes_again(fake_sf):
+    get_describe(fake_sf)
+    old_path = describe_cache_path(fake_sf, 'Account')
+
+    fake_sf.sf_version = '60.0'
+    get_describe(fake_sf)
+    assert describe_cache_path(fake_sf, 'Account') != old_path
+    assert fake_sf.describe_calls == ['Account', 'Account']
+
+
+def test_stale_or_refreshed_cache_describes_again(fake_sf):
+    get_describe(fake_sf)
+    path = describe_cache_path(fake_sf, 'Account')
+    os.utime(path, (0, 0))
+
+    get_describe(fake_sf, max_age=3600)
+    get_describe(fake_sf, refresh=True)
+    assert fake_sf.describe_calls == ['Account'] * 3
+
+
+def test_only_mergeable_fields_are_selected():
+    describe = {'fields': [
+        {'name': 'Id', 'type': 'id', 'updateable': False},
+        {'name': 'Phone', 'type': 'phone', 'updateable': True},
+        {'name': 'BillingAddress', 'type': 'address', 'updateable': True},
+        {'name': 'Score__c', 'type': 'double', 'calculated': True, 'updateable': False},
+        {'name': 'Notes__c', 'type': 'textarea', 'length': 32000, 'updateable': True},
+        {'name': 'CreatedDate', 'type': 'datetime', 'updateable': False},
+    ]}
+    assert select_consolidation_fields(describe) == ['Id', 'Phone']
@@ -0,0 +1,42 @@
+import threading
+
+from extraction_backends import BulkBackend, RestBackend
+from fake_salesforce import FakeBulkSession, FakeSalesforce
+
+QUERY = "SELECT Id, Name, Phone FROM Account"
+
+
+def org(count=25, polls_before_complete=1):
+    sf = FakeSalesforce({'Account': [
+        {'Id': f"001{number:012d}AAA", 'Name': f"Account {number}", 'Phone': None if number % 3 else '555-0100'}
+        for number in range(count)
+    ]}, page_size=10)
+    sf.session = FakeBulkSession(sf, polls_before_complete=polls_before_complete)
+    return sf
+
+
+def downloads(sf):
+    return [request for request in sf.session.requests if request[1].endswith('/results')]
+
+
+def test_bulk_polls_until_complete_and_pages_through_results():
+    sf = org(polls_before_complete=3)
+    records = list(BulkBackend(poll_interval=0, max_records=10).iter_records(sf, QUERY))
+
+    rest = [{k: v for k, v in record.items() if k != 'attributes'} for record in RestBackend().iter_records(sf, QUERY)]
+    assert records == rest
+    polls = [request for request in sf.session.requests if request[0] == 'GET' and not request[1].endswith('/results')]
+    assert len(polls) == 4
+    assert [params.get('locator') for _, _, params in downloads(sf)] == [None, '10', '20']
+
+
+def test_download_thread_ends_when_the_reader_stops_early():
+    sf = org(count=200)
+    before = threading.active_count()
+    records = BulkBackend(poll_interval=0, max_records=10, prefetch=1).iter_records(sf, QUERY)
+    assert next(records)['Id'] == '001000000000000AAA'
+    records.close()
+
+    assert threading.active_count() == before
+    # Only the chunks read or already prefetched were downloaded
+    assert len(downloads(sf)) < 5
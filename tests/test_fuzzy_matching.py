@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from fuzzy_matching import (
+    candidate_pairs, find_fuzzy_duplicates, minhash_signatures, normalize_names, postal_digits, score_pairs,
+)
+
+ACCOUNTS = pd.DataFrame({
+    'Id': ['001C', '001A', '001B', '001D', '001E', '001F'],
+    'Name': ['Padaria Souza Ltda', 'PADARIA SOUZA', 'Padaria Sousa ME', 'Mercado Central', 'Kaza Bonita', 'Casa Bonita'],
+    'BillingPostalCode': ['01310-100', '01310100', '01310-100', '20000-000', '30140-071', '30140-999'],
+    'BillingCity': ['São Paulo', 'Sao Paulo', 'SAO PAULO', 'Rio', 'BH', 'BH'],
+})
+
+
+def blocked_pairs(accounts):
+    names = normalize_names(accounts['Name'])
+    rows, signatures = minhash_signatures(names)
+    left, right = candidate_pairs(rows, signatures, names, postal_digits(accounts['BillingPostalCode']))
+    return set(zip(left.tolist(), right.tolist()))
+
+
+def test_blocking_pairs_similar_names_and_same_cep_phonetic_keys():
+    pairs = blocked_pairs(ACCOUNTS)
+    # The Padaria accounts share MinHash buckets; Kaza/Casa Bonita only meet in the CEP prefix + phonetic block
+    assert {(0, 1), (0, 2), (1, 2), (4, 5)} <= pairs
+    assert not any(3 in pair for pair in pairs)
+
+    moved = ACCOUNTS.assign(BillingPostalCode=['01310-100'] * 5 + ['99999-000'])
+    assert (4, 5) not in blocked_pairs(moved)
+
+
+def test_score_weighs_name_and_address():
+    accounts = pd.DataFrame({
+        'Name': ['Padaria Souza'] * 4,
+        'BillingPostalCode': ['01310100', '01310100', '01310999', ''],
+        'BillingCity': ['Sao Paulo', 'Sao Paulo', 'Campinas', ''],
+    })
+    names = normalize_names(accounts['Name'])
+    rows, signatures = minhash_signatures(names)
+    left, right = np.array([0, 0, 0]), np.array([1, 2, 3])
+    scores = score_pairs(left, right, rows, signatures, postal_digits(accounts['BillingPostalCode']),
+                         normalize_names(accounts['BillingCity']))
+    # Same CEP, same CEP prefix, and no address on one side (the name alone decides)
+    assert scores.tolist() == [1.0, 0.7 + 0.3 * 0.6, 1.0]
+
+
+def test_threshold_decides_which_pairs_cluster():
+    pairs, clusters = find_fuzzy_duplicates(ACCOUNTS)
+    assert pairs.values.tolist() == [['001C', '001A', 1.0]]
+    assert clusters['Id'].tolist() == ['001A', '001C']
+
+    pairs, clusters = find_fuzzy_duplicates(ACCOUNTS, threshold=0.5)
+    assert len(pairs) == 3
+    # Clusters are named after their smallest Id
+    assert clusters['fuzzy_cluster_id'].unique().tolist() == ['001A']
+    assert clusters.set_index('Id')['best_score'].to_dict() == {'001A': 1.0, '001B': 0.694, '001C': 1.0}
+
+
+def test_empty_and_blank_names():
+    pairs, clusters = find_fuzzy_duplicates(pd.DataFrame({'Id': [], 'Name': []}))
+    assert pairs.empty and clusters.empty
+
+    blank = pd.DataFrame({'Id': ['001A', '001B', '001C'], 'Name': [' ', None, 'Ltda'],
+                          'BillingPostalCode': ['01310100'] * 3})
+    pairs, clusters = find_fuzzy_duplicates(blank, threshold=0)
+    # Names that normalize to nothing never match each other
+    assert pairs.empty and clusters.empty
@@ -0,0 +1,56 @@
+import pytest
+
+from fake_salesforce import FakeSalesforce
+from instrumentation import Metrics, instrument, soql_template, url_template
+
+
+@pytest.mark.parametrize('soql, template', [
+    ("SELECT Id FROM Account WHERE Name = 'Acme'", "SELECT Id FROM Account WHERE Name = ?"),
+    ("SELECT Id FROM Account WHERE Name = 'O\\'Brien' AND Phone = ''", "SELECT Id FROM Account WHERE Name = ? AND Phone = ?"),
+    ("SELECT Id FROM Account WHERE Id IN ('001A', '001B','001C')", "SELECT Id FROM Account WHERE Id IN (?)"),
+    ("SELECT Id FROM Account WHERE Id IN ('001A')", "SELECT Id FROM Account WHERE Id IN (?)"),
+    ("SELECT Id FROM Account WHERE SystemModstamp > 2024-05-01T11:55:00Z", "SELECT Id FROM Account WHERE SystemModstamp > ?"),
+    ("SELECT Id FROM Account WHERE CreatedDate < 2024-05-01T11:55:00.000+0000", "SELECT Id FROM Account WHERE CreatedDate < ?"),
+    ("SELECT Id FROM Account WHERE CloseDate = 2024-05-01", "SELECT Id FROM Account WHERE CloseDate = ?"),
+    ("SELECT AccountId, COUNT(Id) total FROM Contact\n  WHERE AccountId IN ('001A')  GROUP BY AccountId",
+     "SELECT AccountId, COUNT(Id) total FROM Contact WHERE AccountId IN (?) GROUP BY AccountId"),
+])
+def test_soql_template_strips_literals(soql, template):
+    assert soql_template(soql) == template
+
+
+def test_url_template_replaces_ids_and_version():
+    url = 'https://x.my.salesforce.com/services/data/v59.0/jobs/query/750000000000001AAA/results?maxRecords=5'
+    assert url_template(url) == 'jobs/query/{id}/results'
+    assert url_template('sobjects/Account/001000000000001') == 'sobjects/Account/{id}'
+
+
+def test_calls_are_grouped_by_template():
+    metrics = Metrics()
+    records = [{'Id': f"001{number:012d}AAA", 'Name': f"Account {number}"} for number in range(5)]
+    sf = instrument(FakeSalesforce({'Account': records}, page_size=2), metrics)
+
+    assert len(sf.query_all("SELECT Id, Name FROM Account")['records']) == 5
+    sf.query("SELECT Id FROM Account WHERE Id IN ('001000000000001AAA')")
+    sf.query("SELECT Id FROM Account WHERE Id IN ('001000000000002AAA', '001000000000003AAA')")
+
+    api = metrics.report()['api_by_template']
+    # Every page of query_all is counted under the query that opened the cursor
+    assert {template: (entry['calls'], entry['records']) for template, entry in api.items()} == {
+        "SELECT Id, Name FROM Account": (3, 5),
+        "SELECT Id FROM Account WHERE Id IN (?)": (2, 3),
+    }
+    assert metrics.totals()[0] == 5
+
+
+def test_stage_counts_its_own_calls():
+    metrics = Metrics()
+    sf = instrument(FakeSalesforce({'Account': [{'Id': '001000000000001AAA'}]}), metrics)
+    sf.query("SELECT Id FROM Account")
+    with metrics.stage('fetch') as stage:
+        sf.query("SELECT Id FROM Account")
+        stage['rows'] = 1
+
+    assert metrics.stages[0]['stage'] == 'fetch'
+    assert metrics.stages[0]['api_calls'] == 1
+    assert metrics.stages[0]['bytes_downloaded'] > 0
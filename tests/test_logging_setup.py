@@ -0,0 +1,61 @@
+import json
+import logging
+
+import pytest
+
+from logging_setup import JsonFormatter, SampledLog
+
+
+@pytest.fixture
+def sampled_logger(caplog):
+    logger = logging.getLogger('tests.sampled')
+    caplog.set_level(logging.DEBUG, logger='tests.sampled')
+    return logger
+
+
+def events(caplog):
+    return [record.event for record in caplog.records if hasattr(record, 'event')]
+
+
+def test_logs_the_head_then_one_in_every(sampled_logger, caplog):
+    log = SampledLog(sampled_logger, logging.DEBUG, head=3, every=10)
+    for number in range(25):
+        log("event %d", number)
+
+    assert events(caplog) == [1, 2, 3, 10, 20]
+    assert [record.getMessage() for record in caplog.records][:4] == ['event 0', 'event 1', 'event 2', 'event 9']
+
+
+def test_summary_reports_the_total_and_resets(sampled_logger, caplog):
+    log = SampledLog(sampled_logger, logging.INFO, head=2, every=100)
+    for _ in range(5):
+        log("event")
+    log.summary('rows')
+
+    assert caplog.records[-1].getMessage() == "5 rows in total (first 2 and one in every 100 logged)"
+    assert log.seen == 0
+
+    caplog.clear()
+    log("event")
+    log.summary('rows')
+    # Nothing was left out, so there is no summary line
+    assert [record.getMessage() for record in caplog.records] == ['event']
+
+
+def test_disabled_level_is_not_counted(sampled_logger, caplog):
+    caplog.set_level(logging.INFO, logger='tests.sampled')
+    log = SampledLog(sampled_logger, logging.DEBUG, head=1, every=2)
+    for _ in range(10):
+        log("event")
+
+    assert log.seen == 0
+    assert caplog.records == []
+
+
+def test_sampled_lines_carry_the_event_count_in_json():
+    record = logging.LogRecord('tests.sampled', logging.INFO, __file__, 1, "event %d", (7,), None)
+    record.event = 7
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry['message'] == 'event 7'
+    assert entry['event'] == 7
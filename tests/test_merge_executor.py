@@ -0,0 +1,117 @@
+import json
+
+import pandas as pd
+
+from fake_salesforce import FakeSalesforce
+from merge_executor import execute_merge, rollback_merge
+
+LOOKUPS = [('Contact', 'AccountId'), ('Opportunity', 'AccountId'), ('Invoice', 'AccountId')]
+
+
+class FailingQueries(FakeSalesforce):
+    """Fails every query on the sObjects in ``failures`` with the given error text."""
+
+    def __init__(self, records, failures):
+        super().__init__(records)
+        self.failures = failures
+
+    def query(self, soql, include_deleted=False):
+        for sobject, error in self.failures.items():
+            if f" FROM {sobject} " in soql:
+                raise Exception(error)
+        return super().query(soql, include_deleted=include_deleted)
+
+
+def mapping(*pairs):
+    rows = []
+    for loser, survivor in pairs:
+        rows.append({'Id': survivor, 'Survivor_Id': survivor, 'Is_Survivor': True})
+        rows.append({'Id': loser, 'Survivor_Id': survivor, 'Is_Survivor': False})
+    return pd.DataFrame(rows)
+
+
+def org():
+    return {
+        'Account': [{'Id': account_id} for account_id in ('001A', '001B', '001C', '001D')],
+        'Contact': [{'Id': '003A', 'AccountId': '001B'}, {'Id': '003B', 'AccountId': '001D'}],
+        'Opportunity': [{'Id': '006A', 'AccountId': '001B'}],
+    }
+
+
+def test_accounts_with_unlisted_children_are_not_deleted(tmp_path):
+    sf = FailingQueries(org(), {
+        'Opportunity': "UNABLE_TO_LOCK_ROW: unable to obtain exclusive access",
+        'Invoice': "INVALID_TYPE: sObject type 'Invoice' is not supported",
+    })
+    summary = execute_merge(sf, mapping(('001B', '001A'), ('001D', '001C')), dry_run=False,
+                            journal_path=str(tmp_path / 'journal.jsonl'), max_workers=1, lookups=LOOKUPS)
+
+    # The Contact lookup still ran after the Opportunity failure, but no loser was deleted
+    assert {row['Id']: row['AccountId'] for row in sf.records['Contact']} == {'003A': '001A', '003B': '001C'}
+    assert {row['Id'] for row in sf.records['Account']} == {'001A', '001B', '001C', '001D'}
+    assert summary['deleted'] == 0
+    assert summary['skipped_accounts'] == 2
+
+
+def test_missing_objects_do_not_block_deletes(tmp_path):
+    sf = FailingQueries(org(), {'Invoice': "INVALID_TYPE: sObject type 'Invoice' is not supported"})
+    summary = execute_merge(sf, mapping(('001B', '001A'), ('001D', '001C')), dry_run=False,
+                            journal_path=str(tmp_path / 'journal.jsonl'), max_workers=1, lookups=LOOKUPS)
+
+    assert {row['Id'] for row in sf.records['Account']} == {'001A', '001C'}
+    assert sf.records['Opportunity'] == [{'Id': '006A', 'AccountId': '001A'}]
+    assert summary['deleted'] == 2
+
+
+def test_dry_run_changes_nothing():
+    sf = FakeSalesforce(org())
+    summary = execute_merge(sf, mapping(('001B', '001A'), ('001D', '001C')), dry_run=True, lookups=LOOKUPS[:2])
+
+    assert summary['dry_run'] is True
+    assert summary['accounts_to_delete'] == 2
+    assert {(c['sobject'], c['id'], c['new']) for c in summary['changes']} == {
+        ('Contact', '003A', '001A'), ('Contact', '003B', '001C'), ('Opportunity', '006A', '001A'),
+    }
+    assert sf.rest_calls == []
+    assert sf.records == org()
+
+
+def test_children_move_before_accounts_are_deleted(tmp_path):
+    sf = FakeSalesforce(org())
+    journal_path = tmp_path / 'journal.jsonl'
+    execute_merge(sf, mapping(('001B', '001A'), ('001D', '001C')), dry_run=False, journal_path=str(journal_path),
+                  max_workers=1, lookups=LOOKUPS[:2])
+
+    methods = [method for method, _, _ in sf.rest_calls]
+    assert methods == ['PATCH', 'PATCH', 'DELETE']
+    assert {row['Id'] for row in sf.records['Account']} == {'001A', '001C'}
+
+    entries = [json.loads(line) for line in journal_path.read_text().splitlines()]
+    assert [entry['action'] for entry in entries] == ['reparent'] * 3 + ['delete'] * 2
+    assert {(e['id'], e['old'], e['new']) for e in entries[:3]} == {
+        ('003A', '001B', '001A'), ('003B', '001D', '001C'), ('006A', '001B', '001A'),
+    }
+    assert {(e['id'], e['survivor']) for e in entries[3:]} == {('001B', '001A'), ('001D', '001C')}
+
+
+def test_failed_reparent_keeps_the_account(tmp_path):
+    sf = FakeSalesforce(org())
+    sf.rest_errors['003A'] = 'UNABLE_TO_LOCK_ROW'
+    summary = execute_merge(sf, mapping(('001B', '001A'), ('001D', '001C')), dry_run=False,
+                            journal_path=str(tmp_path / 'journal.jsonl'), max_workers=1, lookups=LOOKUPS[:2])
+
+    assert {row['Id'] for row in sf.records['Account']} == {'001A', '001B', '001C'}
+    assert summary['reparented'] == 2
+    assert summary['deleted'] == 1
+
+
+def test_rollback_restores_the_original_parents(tmp_path):
+    sf = FakeSalesforce(org())
+    journal_path = str(tmp_path / 'journal.jsonl')
+    execute_merge(sf, mapping(('001B', '001A'), ('001D', '001C')), dry_run=False, journal_path=journal_path,
+                  max_workers=1, lookups=LOOKUPS[:2], delete_losers=False)
+    result = rollback_merge(sf, journal_path, max_workers=1)
+
+    assert result == {'restored': 3, 'to_restore': 3, 'deleted_accounts': []}
+    assert sf.records['Contact'] == org()['Contact']
+    assert sf.records['Opportunity'] == org()['Opportunity']
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from parallel_consolidation import consolidate_in_parallel
+
+
+def accounts(count=400, seed=7):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Id': [f"001{number:012d}" for number in range(count)],
+        'cluster_id': rng.integers(0, count // 4, count),
+        'Name': np.where(rng.random(count) < 0.3, '', [f"Account {number}" for number in range(count)]),
+        'Phone': np.where(rng.random(count) < 0.5, 'NA', '555-0100'),
+        'LastModifiedDate': pd.Timestamp('2024-01-01', tz='UTC') + pd.to_timedelta(rng.integers(0, 10, count), unit='D'),
+    })
+    # Rows out of cluster and Id order, as they come back from Salesforce
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def test_serial_and_parallel_results_are_identical():
+    df = accounts()
+    serial_golden, serial_mapping, _ = consolidate_in_parallel(df, workers=1)
+    parallel_golden, parallel_mapping, timings = consolidate_in_parallel(df, workers=2)
+
+    assert len(timings) > 1
+    pd.testing.assert_frame_equal(serial_golden, parallel_golden)
+    pd.testing.assert_frame_equal(serial_mapping, parallel_mapping)
+    assert serial_mapping[['cluster_id', 'Id']].equals(
+        serial_mapping[['cluster_id', 'Id']].sort_values(['cluster_id', 'Id'], ignore_index=True)
+    )
+
+
+def test_source_priorities_reach_every_shard():
+    df = accounts()
+    df['AccountSource'] = np.where(df.index % 3 == 0, 'Web', 'Partner')
+    options = {'rules': ('source_priority',), 'source_priority': ['Web'], 'field_source_priority': {'Phone': ['Partner']}}
+    serial_golden, serial_mapping, _ = consolidate_in_parallel(df, workers=1, **options)
+    parallel_golden, parallel_mapping, _ = consolidate_in_parallel(df, workers=2, **options)
+
+    pd.testing.assert_frame_equal(serial_golden, parallel_golden)
+    pd.testing.assert_frame_equal(serial_mapping, parallel_mapping)
+    # Every cluster with a Web account keeps one of them as survivor, whichever process built it
+    sources = df.set_index('Id')['AccountSource']
+    has_web = df.groupby('cluster_id')['AccountSource'].agg(lambda values: 'Web' in set(values))
+    golden = parallel_golden.set_index('cluster_id')
+    assert (sources[golden['Id']].to_numpy() == 'Web').tolist() == has_web[golden.index].tolist()
+    default_golden, _, _ = consolidate_in_parallel(df, workers=2, rules=('source_priority',))
+    assert not default_golden['Id'].equals(parallel_golden['Id'])
@@ -0,0 +1,24 @@
+import pandas as pd
+from openpyxl import load_workbook
+
+import pipeline
+from artifacts import save_artifact
+from fake_salesforce import FakeSalesforce
+
+
+class Context:
+    sf = FakeSalesforce()
+
+
+def test_links_stage_keeps_one_link_column(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pipeline, 'INSTANCE_URL', None)
+    counts = pd.DataFrame({'Id': ['001A'], 'Oportunidades': [2], 'Salesforce Link': ['https://old/001A']})
+    save_artifact(counts, pipeline.NO_INFO_OUTPUT)
+
+    assert pipeline.links_stage(Context()) == 1
+    wb = load_workbook(pipeline.LINKS_FILE, read_only=True)
+    header, row = wb.active.iter_rows(values_only=True)
+    wb.close()
+    assert header == ('Id', 'Oportunidades', 'Salesforce Link')
+    assert row[2] == '=HYPERLINK("https://fake.my.salesforce.com/001A", "https://fake.my.salesforce.com/001A")'
@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from reconciliation import EXISTS, MISSING, reconcile_accounts, to_18_char_ids
+
+# 15-character IDs and their 18-character form, including mixed-case, all-upper and all-digit blocks
+KNOWN_IDS = [
+    ('001D000000IqhSL', '001D000000IqhSLIAZ'),
+    ('00300000003T2PG', '00300000003T2PGAA0'),
+    ('a0B5e00000ZZZZZ', 'a0B5e00000ZZZZZEA5'),
+    ('001abcdeFGHIJkl', '001abcdeFGHIJklAYH'),
+    ('00Q000000000000', '00Q000000000000EAA'),
+]
+
+
+@pytest.mark.parametrize('short, full', KNOWN_IDS)
+def test_15_character_ids_get_their_checksum(short, full):
+    assert to_18_char_ids([short]).tolist() == [full]
+
+
+@pytest.mark.parametrize('short, full', KNOWN_IDS)
+def test_18_character_ids_are_kept(short, full):
+    assert to_18_char_ids([full]).tolist() == [full]
+
+
+def test_mixed_input_in_one_call():
+    ids = pd.Series(['001D000000IqhSL', '001D000000IqhSLIAZ', ' 00300000003T2PG ', '123', '', None], index=list('abcdef'))
+    result = to_18_char_ids(ids)
+    assert result.index.tolist() == list('abcdef')
+    assert result.tolist() == ['001D000000IqhSLIAZ', '001D000000IqhSLIAZ', '00300000003T2PGAA0', None, None, None]
+
+
+def test_reconcile_matches_15_and_18_character_ids_in_any_case():
+    sheet = pd.DataFrame({'Account_18_Digit_ID__c': ['001D000000IqhSL', '00300000003T2PGAA0', '001abcdeFGHIJkl']})
+    salesforce = pd.DataFrame({'Id': ['001D000000IQHSLIAZ', '00300000003T2PG', '00Q000000000000EAA']})
+    result, new_accounts = reconcile_accounts(sheet, salesforce)
+
+    # Upper-casing the full ID keeps its checksum, so 001D...IQHSLIAZ still matches 001D...IqhSL
+    assert result['Account Exists'].tolist() == [EXISTS, EXISTS, MISSING]
+    assert new_accounts['Id'].tolist() == ['00Q000000000000EAA']
@@ -0,0 +1,144 @@
+import logging
+import os
+
+import pandas as pd
+import pytest
+
+from checkpoints import CountCheckpoint, checkpoint_path
+from fake_salesforce import FakeSalesforce
+from process_accounts import count_accounts_one_by_one, process_accounts
+from related_counts import build_aggregate_query, count_related_objects
+from soql_batching import MAX_AGGREGATE_ROWS, chunk_ids
+
+QUERIES = {
+    'Contatos': "SELECT count() FROM Contact WHERE AccountId = '{account_id}'",
+    'Campanhas': "SELECT count() FROM Campaign WHERE AccountId = '{account_id}'",
+}
+ACCOUNTS = ['001A', '001B']
+
+
+class FlakyOrg(FakeSalesforce):
+    """Campaign has no AccountId field; Contact queries fail ``transient`` times before they work."""
+
+    def __init__(self, transient=0):
+        super().__init__({'Contact': [{'Id': '003A', 'AccountId': '001A'}, {'Id': '003B', 'AccountId': '001A'}]})
+        self.transient = transient
+        self.sent = []
+
+    def query(self, soql, include_deleted=False):
+        self.sent.append(soql)
+        if ' FROM Campaign ' in soql:
+            raise Exception("INVALID_FIELD: No such column 'AccountId' on entity 'Campaign'")
+        if ' FROM Contact ' in soql and self.transient:
+            self.transient -= 1
+            raise Exception("UNKNOWN_EXCEPTION: try again")
+        return super().query(soql, include_deleted=include_deleted)
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    checkpoint = CountCheckpoint(str(tmp_path / 'counts.sqlite'))
+    yield checkpoint
+    checkpoint.close()
+
+
+def test_batched_missing_field_counts_zero_and_is_not_retried(checkpoint):
+    sf = FlakyOrg()
+    counts = count_related_objects(sf, ACCOUNTS, QUERIES, checkpoint=checkpoint)
+
+    assert counts == {'Contatos': [2, 0], 'Campanhas': [0, 0]}
+    assert len(checkpoint.completed()) == 2
+
+
+def test_batched_transient_failure_stays_pending(checkpoint):
+    with pytest.raises(RuntimeError):
+        count_related_objects(FlakyOrg(transient=1), ACCOUNTS, QUERIES, checkpoint=checkpoint)
+    assert len(checkpoint.completed()) == 1
+
+    sf = FlakyOrg()
+    counts = count_related_objects(sf, ACCOUNTS, QUERIES, checkpoint=checkpoint)
+    assert counts == {'Contatos': [2, 0], 'Campanhas': [0, 0]}
+    # Only the failed Contact batch is sent again; the Campaign batch was saved as 0
+    assert len(sf.sent) == 1 and ' FROM Contact ' in sf.sent[0]
+
+
+def test_one_by_one_follows_the_same_rules(checkpoint, monkeypatch):
+    monkeypatch.setattr('process_accounts.RELATED_OBJECT_QUERIES', QUERIES)
+
+    with pytest.raises(RuntimeError):
+        count_accounts_one_by_one(FlakyOrg(transient=1), ACCOUNTS, None, 1, checkpoint)
+    assert len(checkpoint.completed()) == 1
+
+    sf = FlakyOrg()
+    counts = count_accounts_one_by_one(sf, ACCOUNTS, None, 1, checkpoint)
+    assert counts == {'Contatos': [2, 0], 'Campanhas': [0, 0]}
+    # Only the failed account is counted again, and Campaign is dropped after its first error
+    assert len(sf.sent) == 2
+
+
+def test_aggregate_counts_match_per_account_counts():
+    accounts = [f"001{number:012d}AAA" for number in range(3000)]
+    children = {
+        'Contact': [{'Id': f"003{n:015d}", 'AccountId': accounts[n % 700]} for n in range(2000)],
+        'Campaign': [],
+    }
+    sf = FakeSalesforce(children)
+    # 15-character IDs in the input still match the 18-character lookups, and repeated IDs are counted once
+    requested = [account[:15] for account in accounts[:10]] + accounts + accounts[:5]
+    counts = count_related_objects(sf, requested, QUERIES, max_workers=4)
+
+    expected = {account: sum(1 for c in children['Contact'] if c['AccountId'] == account) for account in accounts}
+    assert counts['Contatos'] == [expected[account] for account in accounts[:10] + accounts + accounts[:5]]
+    assert counts['Campanhas'] == [0] * len(requested)
+    # One aggregate query per URI-sized chunk and object, instead of one count() per account and object
+    template, _ = build_aggregate_query(QUERIES['Contatos'])
+    chunks = chunk_ids(list(dict.fromkeys(requested)), template, max_ids=MAX_AGGREGATE_ROWS)
+    assert len(sf.queries) == 2 * len(chunks) < len(accounts)
+    assert all('GROUP BY' in query for query in sf.queries)
+
+
+def test_malformed_query_is_not_saved_as_zero(checkpoint):
+    class MalformedCampaigns(FlakyOrg):
+        def query(self, soql, include_deleted=False):
+            if ' FROM Campaign ' in soql:
+                raise Exception("MALFORMED_QUERY: query is too long")
+            return super().query(soql, include_deleted=include_deleted)
+
+    with pytest.raises(RuntimeError):
+        count_related_objects(MalformedCampaigns(), ACCOUNTS, QUERIES, checkpoint=checkpoint)
+    # Only the Contact batch is done; the Campaign batch is retried on the next run
+    assert len(checkpoint.completed()) == 1
+
+
+def test_resume_in_the_other_mode_does_not_mix_checkpoints(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr('process_accounts.RELATED_OBJECT_QUERIES', QUERIES)
+    accounts = pd.DataFrame({'Id': ['001A00000000001AAA', '001A00000000002AAA']})
+    sf = FlakyOrg()
+    sf.records['Contact'] = [{'Id': '003A', 'AccountId': '001A00000000001AAA'}]
+
+    sf.transient = 1
+    assert process_accounts(sf, accounts, 'data/counts.xlsx', batched=True, max_workers=1) is None
+    batched, per_account = checkpoint_path('data/counts.xlsx', 'batched'), checkpoint_path('data/counts.xlsx', 'per_account')
+    assert os.path.exists(batched) and not os.path.exists(per_account)
+
+    # The per-account run neither reads nor removes the batched checkpoint
+    assert process_accounts(sf, accounts, 'data/counts.xlsx', batched=False, max_workers=1) == 'data/counts.xlsx'
+    assert pd.read_parquet('data/counts.parquet')['Contatos'].tolist() == [1, 0]
+    assert os.path.exists(batched) and not os.path.exists(per_account)
+
+
+def test_every_failed_object_is_summarised(caplog, monkeypatch):
+    monkeypatch.setattr('process_accounts.RELATED_OBJECT_QUERIES', QUERIES)
+    # Per-account errors are sampled out entirely; the summary still reports them
+    monkeypatch.setattr('process_accounts.count_error_log.head', 0)
+
+    with caplog.at_level(logging.ERROR):
+        count_accounts_one_by_one(FlakyOrg(transient=2), ACCOUNTS, None, 1)
+        count_related_objects(FlakyOrg(transient=1), ACCOUNTS, QUERIES)
+
+    summaries = [record.getMessage() for record in caplog.records if 'last error' in record.getMessage()]
+    assert summaries == [
+        "Contatos: 2 accounts failed (2 accounts left without counts); last error: UNKNOWN_EXCEPTION: try again",
+        "Contatos: 1 batches failed (2 accounts left without counts); last error: UNKNOWN_EXCEPTION: try again",
+    ]
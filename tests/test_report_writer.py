@@ -0,0 +1,35 @@
+import pandas as pd
+from openpyxl import load_workbook
+
+from report_writer import copy_with_links, record_link, write_frame
+
+LINK = record_link('https://example.my.salesforce.com')
+
+
+def sheet_rows(path):
+    wb = load_workbook(path, read_only=True)
+    try:
+        return [list(row) for row in wb.active.iter_rows(values_only=True)]
+    finally:
+        wb.close()
+
+
+def test_links_are_added_once(tmp_path):
+    first, second = str(tmp_path / 'first.xlsx'), str(tmp_path / 'second.xlsx')
+    write_frame(first, pd.DataFrame({'Id': ['001A', None], 'Name': ['Acme', 'Blank']}), links=[LINK])
+    copy_with_links(first, second, [LINK])
+
+    rows = sheet_rows(second)
+    assert rows[0] == ['Id', 'Name', 'Salesforce Link']
+    assert rows[1][2] == '=HYPERLINK("https://example.my.salesforce.com/001A", "https://example.my.salesforce.com/001A")'
+    assert rows[2][2:] in ([], [None])
+
+
+def test_existing_link_column_is_overwritten_in_place(tmp_path):
+    path = str(tmp_path / 'links.csv')
+    df = pd.DataFrame({'Salesforce Link': ['stale'], 'Id': ['001A']})
+    write_frame(path, df, links=[LINK])
+
+    assert pd.read_csv(path).to_dict('records') == [
+        {'Salesforce Link': 'https://example.my.salesforce.com/001A', 'Id': '001A'},
+    ]
@@ -0,0 +1,36 @@
+from urllib.parse import quote_plus
+
+import pytest
+
+from soql_batching import MAX_QUERY_URI_LENGTH, URI_OVERHEAD, chunk_ids, quote_ids
+
+TEMPLATE = "SELECT AccountId, COUNT(Id) total FROM Contact WHERE AccountId IN ({ids}) GROUP BY AccountId"
+
+
+def test_chunks_keep_every_id_in_order_within_the_uri_limit():
+    ids = [f"001{number:015d}" for number in range(5000)]
+    chunks = chunk_ids(ids, TEMPLATE)
+
+    assert len(chunks) > 1
+    assert [record_id for chunk in chunks for record_id in chunk] == ids
+    for chunk in chunks:
+        assert len(quote_plus(TEMPLATE.format(ids=quote_ids(chunk)))) + URI_OVERHEAD <= MAX_QUERY_URI_LENGTH
+
+
+def test_chunks_are_filled_up_to_the_limit():
+    ids = [f"001{number:015d}" for number in range(5000)]
+    chunks = chunk_ids(ids, TEMPLATE)
+    # Equal-length IDs give equal chunks, each too full to take one more ID (counted with its separator)
+    assert len({len(chunk) for chunk in chunks[:-1]}) == 1
+    one_more = quote_ids(chunks[0] + chunks[1][:1]) + ', '
+    assert len(quote_plus(TEMPLATE.format(ids=one_more))) + URI_OVERHEAD > MAX_QUERY_URI_LENGTH
+
+
+def test_max_ids_caps_the_chunk_size():
+    chunks = chunk_ids([f"001{number:015d}" for number in range(25)], TEMPLATE, max_ids=10)
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+
+
+def test_template_longer_than_the_limit_is_rejected():
+    with pytest.raises(ValueError):
+        chunk_ids(['001'], TEMPLATE, max_length=100)
@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+import source_accounts
+from source_accounts import load_source_accounts, load_source_partitions
+
+
+@pytest.fixture
+def workbook(tmp_path, monkeypatch):
+    monkeypatch.setattr(source_accounts, '_frames', {})
+    monkeypatch.setattr(source_accounts, '_partitions', {})
+    path = str(tmp_path / 'contas.xlsx')
+    pd.DataFrame({'Id': ['001A', '001B'], 'STATUS': ['NO INFO', 'OK'], 'Name': ['Acme', 'Beta']}).to_excel(path, index=False)
+    return path
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    calls = []
+    read_excel = pd.read_excel
+
+    def counting_read_excel(*args, **kwargs):
+        usecols = kwargs.get('usecols')
+        # The columns of the test workbook that the parse kept
+        calls.append(usecols and [column for column in ['Id', 'STATUS', 'Name'] if usecols(column)])
+        return read_excel(*args, **kwargs)
+
+    monkeypatch.setattr(source_accounts.pd, 'read_excel', counting_read_excel)
+    return calls
+
+
+def test_subset_sidecar_does_not_serve_all_columns(workbook, parses):
+    assert list(load_source_accounts(workbook, columns=['Id', 'STATUS']).columns) == ['Id', 'STATUS']
+    source_accounts._frames.clear()
+
+    assert list(load_source_accounts(workbook, columns=()).columns) == ['Id', 'STATUS', 'Name']
+    assert parses == [['Id', 'STATUS'], None]
+
+
+def test_full_sidecar_serves_any_subset(workbook, parses):
+    load_source_accounts(workbook, columns=())
+    source_accounts._frames.clear()
+
+    assert list(load_source_accounts(workbook, columns=['Name', 'Id']).columns) == ['Name', 'Id']
+    source_accounts._frames.clear()
+    assert len(load_source_accounts(workbook, columns=()).columns) == 3
+    assert parses == [None]
+
+
+def test_listed_columns_missing_from_the_sheet_are_skipped(workbook, parses):
+    df = load_source_accounts(workbook, columns=['Id', 'NEO_Cpfcnpj__c', 'STATUS'])
+    assert list(df.columns) == ['Id', 'STATUS']
+    assert parses == [['Id', 'STATUS']]
+
+
+def test_partitions_are_split_once_per_workbook_version(workbook):
+    no_info, other = load_source_partitions(workbook)
+    assert no_info['Id'].tolist() == ['001A'] and other['Id'].tolist() == ['001B']
+
+    again = load_source_partitions(workbook)
+    assert again[0] is no_info and again[1] is other